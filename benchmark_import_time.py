@@ -0,0 +1,115 @@
+"""
+Import-time benchmark for opendeepsearch.
+
+Measures cold imports of the package and of the modules applications import
+(the agent and the source processor) in fresh interpreter processes. Exits
+with a non-zero status if a median exceeds its budget or if any heavy
+dependency is loaded eagerly. Intended for CI and for checking that new code
+keeps its heavy imports lazy.
+
+Usage:
+    python benchmark_import_time.py --runs 5
+    python benchmark_import_time.py --module opendeepsearch.ods_agent --budget 1.5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Dependencies that must only be imported on first use
+HEAVY_MODULES = [
+    "litellm",
+    "smolagents",
+    "crawl4ai",
+    "torch",
+    "transformers",
+    "langchain",
+    "langchain_text_splitters",
+    "fasttext",
+    "vllm",
+]
+
+# Modules measured by default, with their median import time budget in seconds
+DEFAULT_BUDGETS = {
+    "opendeepsearch": 0.5,
+    "opendeepsearch.ods_agent": 0.5,
+    "opendeepsearch.context_building.process_sources_pro": 0.5,
+}
+
+# Heavy dependencies a module may load because it needs them at import time
+ALLOWED_HEAVY: dict = {}
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure(module: str) -> dict:
+    """Import a module in a fresh interpreter and report the time and heavy modules loaded"""
+    heavy = [name for name in HEAVY_MODULES if name not in ALLOWED_HEAVY.get(module, ())]
+    probe = PROBE.format(module=module, heavy=heavy)
+    output = subprocess.run(
+        [sys.executable, "-c", probe],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check(module: str, budget: float, runs: int) -> bool:
+    """Measure one module and print the result; returns whether it is within its limits"""
+    try:
+        results = [measure(module) for _ in range(runs)]
+    except subprocess.CalledProcessError as e:
+        error = (e.stderr or "").strip().splitlines()
+        print(f"FAIL: import {module} raised: {error[-1] if error else e}")
+        return False
+    median = statistics.median(result["seconds"] for result in results)
+    heavy = sorted({name for result in results for name in result["heavy"]})
+
+    print(f"import {module}: median {median * 1000:.1f} ms over {runs} runs (budget {budget * 1000:.0f} ms)")
+    passed = True
+    if median > budget:
+        print(f"FAIL: import time exceeds the budget by {(median - budget) * 1000:.1f} ms")
+        passed = False
+    if heavy:
+        print(f"FAIL: heavy dependencies imported eagerly: {', '.join(heavy)}")
+        passed = False
+    return passed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fail if importing opendeepsearch is too slow.")
+    parser.add_argument(
+        "--module",
+        action="append",
+        help=f"Module to import; may be repeated (default: {', '.join(DEFAULT_BUDGETS)})"
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=None,
+        help="Maximum median import time in seconds for every module (default: per-module budgets)"
+    )
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold imports to measure")
+    args = parser.parse_args()
+
+    modules = args.module or list(DEFAULT_BUDGETS)
+    failed = False
+    for module in modules:
+        budget = args.budget if args.budget is not None else DEFAULT_BUDGETS.get(module, 0.5)
+        failed = not check(module, budget, args.runs) or failed
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
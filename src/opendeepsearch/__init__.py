@@ -1,4 +1,27 @@
-from .ods_agent import OpenDeepSearchAgent
-from .ods_tool import OpenDeepSearchTool
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .ods_agent import OpenDeepSearchAgent
+    from .ods_tool import OpenDeepSearchTool
 
 __all__ = ['OpenDeepSearchAgent', 'OpenDeepSearchTool']
+
+# Public classes are imported on first access so that `import opendeepsearch`
+# does not load litellm, smolagents, crawl4ai or the ranking models up front.
+_LAZY_ATTRIBUTES = {
+    'OpenDeepSearchAgent': '.ods_agent',
+    'OpenDeepSearchTool': '.ods_tool',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
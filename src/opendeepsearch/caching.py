@@ -0,0 +1,385 @@
+"""
+Caches that let OpenDeepSearchAgent skip repeated work for repeated questions.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?.!]+$")
+
+# Queries whose answers change within minutes or hours
+_NEWS_PATTERN = re.compile(
+    r"\b(today|tonight|now|currently|current|latest|breaking|news|live|score|scores|"
+    r"weather|forecast|price|prices|stock|stocks|this week|yesterday|right now|"
+    r"recent|recently|upcoming|election)\b"
+)
+# Queries about settled facts
+_EVERGREEN_PATTERN = re.compile(
+    r"\b(history|historical|definition|define|meaning|etymology|invented|discovered|"
+    r"born|died|founded|formula|how to|how does|why do|why does|explain)\b"
+)
+
+DEFAULT_TTLS: Dict[str, float] = {
+    "news": 15 * 60,
+    "default": 6 * 60 * 60,
+    "evergreen": 7 * 24 * 60 * 60,
+}
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query for exact cache lookups.
+
+    Only case, Unicode form, runs of whitespace and trailing "?", "." and "!"
+    are normalized. Punctuation inside the query is kept, since it can change
+    the meaning ("2+2" vs "2-2", "C++" vs "C#").
+    """
+    query = unicodedata.normalize("NFKC", query).lower()
+    query = _TRAILING_PUNCTUATION.sub("", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def classify_freshness(query: str) -> str:
+    """
+    Classify how quickly the answer to a query goes stale.
+
+    Returns:
+        "news" for time-sensitive queries, "evergreen" for settled facts and
+        "default" otherwise
+    """
+    normalized = normalize_query(query)
+    if _NEWS_PATTERN.search(normalized):
+        return "news"
+    if _EVERGREEN_PATTERN.search(normalized):
+        return "evergreen"
+    return "default"
+
+
+@dataclass
+class CacheStats:
+    """Hit and miss counters of a cache."""
+    exact_hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    expirations: int = 0
+    evictions: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.exact_hits + self.semantic_hits
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+        }
+
+
+@dataclass
+class _AnswerEntry:
+    answer: str
+    freshness: str
+    expires_at: float
+    embedding: Optional[np.ndarray] = field(default=None, repr=False)
+
+
+class AnswerCache:
+    """
+    In-memory cache of final answers keyed by normalized query and agent configuration.
+
+    Lookups first try an exact match on the normalized query. When an ``embed``
+    function is configured, a semantic tier then compares the query embedding
+    with the embeddings of cached queries of the same configuration and
+    freshness class, and returns the answer of the closest one if its cosine
+    similarity reaches ``similarity_threshold``. Entries expire after the TTL of
+    their freshness class.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttls: Optional[Dict[str, float]] = None,
+        semantic: bool = True,
+        similarity_threshold: float = 0.92,
+        embed: Optional[Callable[[str], np.ndarray]] = None,
+        freshness_classifier: Callable[[str], str] = classify_freshness
+    ):
+        """
+        Args:
+            max_entries: Maximum number of cached answers; least recently used are evicted
+            ttls: Seconds to keep an answer per freshness class ("news", "default",
+                "evergreen"); missing classes use DEFAULT_TTLS
+            semantic: Whether to match paraphrased queries by embedding similarity
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            embed: Function returning the embedding of a single query
+            freshness_classifier: Function mapping a query to a freshness class
+        """
+        self.max_entries = max_entries
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        self.embed = embed
+        self.freshness_classifier = freshness_classifier
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[tuple, _AnswerEntry]" = OrderedDict()
+        # Embeddings of recently looked-up queries, so a miss followed by store() embeds once
+        self._recent_embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _query_embedding(self, query: str) -> Optional[np.ndarray]:
+        if not (self.semantic and self.embed):
+            return None
+        embedding = self._recent_embeddings.get(query)
+        if embedding is not None:
+            return embedding
+        try:
+            embedding = np.asarray(self.embed(query), dtype=np.float32).reshape(-1)
+        except Exception as e:
+            print(f"Error embedding query for the answer cache: {str(e)}")
+            return None
+        embedding = embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+        with self._lock:
+            self._recent_embeddings[query] = embedding
+            while len(self._recent_embeddings) > 64:
+                self._recent_embeddings.popitem(last=False)
+        return embedding
+
+    def _purge_expired(self, now: float) -> None:
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        self.stats.expirations += len(expired)
+
+    def lookup(self, query: str, namespace: str = "") -> Optional[str]:
+        """
+        Return the cached answer for a query, or None on a miss.
+
+        Args:
+            query: The user query
+            namespace: Identifier of the model and configuration that produced the answer
+        """
+        key = (namespace, normalize_query(query))
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats.exact_hits += 1
+                return entry.answer
+            semantic_candidates = self.semantic and self.embed and any(
+                k[0] == namespace and e.embedding is not None for k, e in self._entries.items()
+            )
+            if not semantic_candidates:
+                self.stats.misses += 1
+                return None
+
+        # Embedding may call a remote server, so do it outside the lock
+        embedding = self._query_embedding(query)
+        freshness = self.freshness_classifier(query)
+        with self._lock:
+            best_key, best_score = None, self.similarity_threshold
+            for candidate_key, entry in self._entries.items():
+                if (
+                    candidate_key[0] != namespace
+                    or entry.freshness != freshness
+                    or entry.embedding is None
+                    or embedding is None
+                    or entry.embedding.shape != embedding.shape
+                ):
+                    continue
+                score = float(entry.embedding @ embedding)
+                if score >= best_score:
+                    best_key, best_score = candidate_key, score
+            if best_key is not None:
+                self._entries.move_to_end(best_key)
+                self.stats.semantic_hits += 1
+                return self._entries[best_key].answer
+            self.stats.misses += 1
+            return None
+
+    def store(self, query: str, answer: str, namespace: str = "") -> None:
+        """
+        Cache an answer.
+
+        Args:
+            query: The user query
+            answer: The generated answer
+            namespace: Identifier of the model and configuration that produced the answer
+        """
+        freshness = self.freshness_classifier(query)
+        ttl = self.ttls.get(freshness, self.ttls["default"])
+        if ttl <= 0:
+            return
+        embedding = self._query_embedding(query)
+        key = (namespace, normalize_query(query))
+        with self._lock:
+            self._entries[key] = _AnswerEntry(answer, freshness, time.time() + ttl, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every cached answer."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ContextCache:
+    """
+    Cache of retrieval results: the processed sources and the context built from them.
+
+    Keys are computed by the caller from the query and every setting that affects
+    retrieval, so re-asking a question with a different LLM or prompt reuses the
+    search, scraping and reranking. Entries live in an in-memory LRU and, when
+    ``path`` is given, in an SQLite file shared across processes and restarts.
+    Entries expire after the TTL of the query's freshness class.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttls: Optional[Dict[str, float]] = None,
+        path: Optional[str] = None,
+        freshness_classifier: Callable[[str], str] = classify_freshness
+    ):
+        """
+        Args:
+            max_entries: Maximum number of entries kept in memory
+            ttls: Seconds to keep an entry per freshness class; missing classes use DEFAULT_TTLS
+            path: Optional SQLite file for the on-disk store
+            freshness_classifier: Function mapping a query to a freshness class
+        """
+        self.max_entries = max_entries
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.path = path
+        self.freshness_classifier = freshness_classifier
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._db = None
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS contexts "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM contexts WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+
+    def _remember(self, key: str, expires_at: float, value: Dict[str, Any]) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached entry for a key, or None on a miss.
+
+        Returns:
+            Dictionary with the processed ``sources`` data and the built ``context``
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.stats.exact_hits += 1
+                    return value
+                del self._entries[key]
+                self.stats.expirations += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM contexts WHERE key = ? AND expires_at > ?",
+                    (key, now)
+                ).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.stats.exact_hits += 1
+                    return value
+
+            self.stats.misses += 1
+            return None
+
+    def put(self, key: str, query: str, sources: Dict[str, Any], context: str) -> None:
+        """
+        Cache the processed sources and context built for a query.
+
+        Args:
+            key: Cache key computed by the caller
+            query: The query, used to choose the TTL
+            sources: Processed sources data (the dictionary passed to build_context)
+            context: The context built from ``sources``
+        """
+        freshness = self.freshness_classifier(query)
+        ttl = self.ttls.get(freshness, self.ttls["default"])
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        value = {"sources": sources, "context": context}
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                try:
+                    # Scores may be NumPy scalars, which json cannot encode on its own
+                    encoded = json.dumps(value, default=float)
+                except (TypeError, ValueError) as e:
+                    print(f"Error serializing context cache entry: {str(e)}")
+                    return
+                self._db.execute(
+                    "INSERT OR REPLACE INTO contexts (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, encoded, expires_at)
+                )
+                self._db.commit()
+
+    def clear(self) -> None:
+        """Drop every cached entry, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM contexts")
+                self._db.commit()
+
+    def close(self) -> None:
+        """Close the on-disk store."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,6 +1,18 @@
-from typing import List, Dict, Optional
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, List, Dict, Optional, Tuple
 from loguru import logger
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+
+def format_result_header(item: Dict) -> str:
+    """Format the title, date, link and snippet of an organic search result."""
+    return '\n'.join([
+        f"title: {item.get('title', 'N/A')}",
+        f"date authored: {item.get('date', 'N/A')}",
+        f"link: {item.get('link', 'N/A')}",
+        f"snippet: {item['snippet']}"
+    ])
 
 
 def extract_information(organic_results: List[Dict]) -> List[str]:
@@ -8,12 +20,7 @@ def extract_information(organic_results: List[Dict]) -> List[str]:
     formatted_results = []
     for item in organic_results:
         if 'snippet' in item:
-            result_parts = [
-                f"title: {item.get('title', 'N/A')}",
-                f"date authored: {item.get('date', 'N/A')}",
-                f"link: {item.get('link', 'N/A')}",
-                f"snippet: {item['snippet']}"
-            ]
+            result_parts = [format_result_header(item)]
             
             if 'html' in item:
                 result_parts.append(f"additional information: {item['html']}")
@@ -46,6 +53,50 @@ def extract_answer_box(
     
     return results
 
+def extract_knowledge_graph(graph: Optional[Dict]) -> List[str]:
+    """Extract title, type, description and attributes from a knowledge graph."""
+    if not graph:
+        return []
+
+    results = []
+    for key in ['title', 'type', 'description']:
+        if graph.get(key):
+            results.append(f"{key}: {graph[key]}")
+    for name, value in (graph.get('attributes') or {}).items():
+        results.append(f"{name}: {value}")
+    return results
+
+def _words(text: str) -> set:
+    return set(re.findall(r"\w+", text.lower()))
+
+def has_confident_serp_answer(sources_result: Optional[Dict], query: str) -> bool:
+    """
+    Decide whether SERP structured data alone answers the query.
+
+    True when the answer box holds a direct answer or a highlighted featured
+    snippet, or when the knowledge graph is about an entity named in the query
+    and has an attribute the query asks for (e.g. "Born" for "when was Ada
+    Lovelace born"). A matching entity with only a description is not enough,
+    since the question may be about anything related to it.
+    """
+    if not sources_result:
+        return False
+
+    answer_box = sources_result.get('answerBox') or {}
+    if answer_box.get('answer') or answer_box.get('snippetHighlighted'):
+        return True
+
+    graph = sources_result.get('graph') or {}
+    query_words = _words(query)
+    title_words = _words(graph.get('title', ''))
+    if not title_words or not title_words <= query_words:
+        return False
+    for name, value in (graph.get('attributes') or {}).items():
+        name_words = _words(name)
+        if value and name_words and name_words <= query_words:
+            return True
+    return False
+
 def build_context(
     sources_result: Dict,
 ) -> str:
@@ -65,6 +116,7 @@ def build_context(
         answer_box = extract_answer_box(
             sources_result.get('answerBox')
         )
+        knowledge_graph = extract_knowledge_graph(sources_result.get('graph'))
         
         # Combine all results into a single string
         context_parts = []
@@ -74,6 +126,12 @@ def build_context(
             context_parts.append("ANSWER BOX:")
             context_parts.extend(answer_box)
             context_parts.append("")  # Empty line for separation
+
+        # Add knowledge graph if available
+        if knowledge_graph:
+            context_parts.append("KNOWLEDGE GRAPH:")
+            context_parts.extend(knowledge_graph)
+            context_parts.append("")  # Empty line for separation
         
         # Add organic results
         if organic_results:
@@ -92,3 +150,161 @@ def build_context(
     except Exception as e:
         logger.exception(f"An error occurred while building context: {e}")
         return ""  # Return empty string in case of error
+
+
+@dataclass
+class BudgetedContext:
+    """Result of building a context under a token budget."""
+    text: str
+    tokens: int
+    budget: int
+    dropped: List[Dict[str, Any]] = field(default_factory=list)
+
+
+@lru_cache(maxsize=65_536)
+def count_tokens(text: str, model: str) -> int:
+    """Count tokens of ``text`` for ``model`` with LiteLLM's tokenizer, caching per text."""
+    from litellm import token_counter
+    return token_counter(model=model, text=text)
+
+
+def _source_chunks(item: Dict) -> List[Tuple[str, float]]:
+    """
+    Return the reranked chunks of a source with a relevance weight in [0, 1] for each.
+
+    Raw scores can be negative (cross-encoder logits, unnormalized similarities)
+    and softmax scores are normalized per source, so they are not comparable
+    across sources. Scores are therefore min-max scaled within the source; without
+    scores the weight comes from the chunk's position in the reranked list.
+    """
+    chunks = item.get('html_chunks')
+    if chunks is None:
+        # Sources processed without scores: chunks are newline-joined in rank order
+        chunks = [{"document": line, "score": None} for line in item.get('html', '').split('\n')]
+    chunks = [chunk for chunk in chunks if chunk['document'].strip()]
+    scores = [chunk.get('score') for chunk in chunks]
+    scored = all(score is not None for score in scores)
+    if scored and scores:
+        low, high = min(scores), max(scores)
+    weighted = []
+    for position, chunk in enumerate(chunks):
+        if not scored:
+            relevance = 1.0 / (position + 1)
+        elif high > low:
+            relevance = (chunk['score'] - low) / (high - low)
+        else:
+            relevance = 1.0
+        weighted.append((chunk['document'].strip(), relevance))
+    return weighted
+
+
+def build_budgeted_context(
+    sources_result: Dict,
+    token_budget: int,
+    model: str,
+) -> BudgetedContext:
+    """
+    Build context from search results without exceeding a token budget.
+
+    Content is admitted greedily by priority: the answer box and knowledge
+    graph first, then the header (title, date, link, snippet) of each organic
+    result in rank order, then reranked page chunks weighted by relevance score
+    and source rank, and finally top stories. Page content is only ever cut at chunk boundaries.
+
+    Args:
+        sources_result: Dictionary containing search results
+        token_budget: Maximum number of tokens for the returned context
+        model: LiteLLM model identifier whose tokenizer is used for counting
+
+    Returns:
+        BudgetedContext with the context text, its token count and a list of
+        dropped items ({"kind", "link", "tokens"})
+    """
+    organic = [item for item in sources_result.get('organic', []) if 'snippet' in item]
+    answer_box = extract_answer_box(sources_result.get('answerBox'))
+    knowledge_graph = extract_knowledge_graph(sources_result.get('graph'))
+    top_stories = extract_top_stories(sources_result.get('topStories'))
+
+    # Candidate items as (priority, kind, source index, text); lower priority sorts first
+    items = []
+    for text in answer_box:
+        items.append(((0, 0.0), "answer_box", None, text))
+    for position, text in enumerate(knowledge_graph):
+        items.append(((0, 1.0 + position), "knowledge_graph", None, text))
+    for rank, item in enumerate(organic):
+        items.append(((1, rank), "header", rank, format_result_header(item)))
+        for position, (text, score) in enumerate(_source_chunks(item)):
+            items.append(((2, -score / (rank + 1), rank, position), "chunk", rank, text))
+    for position, text in enumerate(top_stories):
+        items.append(((3, position), "top_story", None, text))
+    items.sort(key=lambda entry: entry[0])
+
+    def render(included: List[Tuple]) -> str:
+        chosen = set(id(entry) for entry in included)
+        parts = []
+        boxes = [entry[3] for entry in items if entry[1] == "answer_box" and id(entry) in chosen]
+        if boxes:
+            parts.extend(["ANSWER BOX:", *boxes, ""])
+        graph = [entry[3] for entry in items if entry[1] == "knowledge_graph" and id(entry) in chosen]
+        if graph:
+            parts.extend(["KNOWLEDGE GRAPH:", *graph, ""])
+        results = []
+        for rank, item in enumerate(organic):
+            header = [entry for entry in items if entry[1] == "header" and entry[2] == rank and id(entry) in chosen]
+            if not header:
+                continue
+            result = header[0][3]
+            chunks = [entry[3] for entry in items if entry[1] == "chunk" and entry[2] == rank and id(entry) in chosen]
+            if chunks:
+                # Keep the reranker's order within a source
+                order = {text: i for i, (text, _) in enumerate(_source_chunks(item))}
+                chunks.sort(key=lambda text: order.get(text, 0))
+                result += "\nadditional information: " + "\n".join(chunks)
+            results.append(result)
+        if results:
+            parts.extend(["SEARCH RESULTS:", *results, ""])
+        stories = [entry[3] for entry in items if entry[1] == "top_story" and id(entry) in chosen]
+        if stories:
+            parts.extend(["TOP STORIES:", *stories])
+        return "\n".join(parts)
+
+    def describe(entry: Tuple, tokens: int) -> Dict[str, Any]:
+        link = organic[entry[2]].get('link') if entry[2] is not None else None
+        return {"kind": entry[1], "link": link, "tokens": tokens}
+
+    # Section labels and separators are charged up front
+    used = count_tokens("ANSWER BOX:\n\nKNOWLEDGE GRAPH:\n\nSEARCH RESULTS:\n\nTOP STORIES:\n", model)
+    included, dropped = [], []
+    sizes: Dict[int, int] = {}
+    for entry in items:
+        kind, rank = entry[1], entry[2]
+        tokens = count_tokens(entry[3], model) + 1
+        sizes[id(entry)] = tokens
+        if kind == "chunk" and not any(e[1] == "header" and e[2] == rank for e in included):
+            dropped.append(describe(entry, tokens))
+        elif used + tokens <= token_budget:
+            included.append(entry)
+            used += tokens
+        else:
+            dropped.append(describe(entry, tokens))
+
+    # Token counts are not additive across joins; if the text is still over budget, drop
+    # lowest-priority items by their precounted size and only recount once the estimate fits
+    text = render(included)
+    tokens = count_tokens(text, model)
+    while tokens > token_budget and included:
+        excess = tokens - token_budget
+        while excess > 0 and included:
+            entry = included.pop()
+            removed = [entry]
+            if entry[1] == "header":
+                removed += [e for e in included if e[1] == "chunk" and e[2] == entry[2]]
+                removed_ids = {id(e) for e in removed}
+                included = [e for e in included if id(e) not in removed_ids]
+            for e in removed:
+                dropped.append(describe(e, sizes[id(e)]))
+                excess -= sizes[id(e)]
+        text = render(included)
+        tokens = count_tokens(text, model)
+
+    return BudgetedContext(text=text, tokens=tokens, budget=token_budget, dropped=dropped)
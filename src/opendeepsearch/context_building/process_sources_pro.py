@@ -1,9 +1,7 @@
-from dataclasses import dataclass
-from typing import List, Optional, Tuple
-from opendeepsearch.context_scraping.crawl4ai_scraper import WebScraper
-from opendeepsearch.ranking_models.infinity_rerank import InfinitySemanticSearcher
-from opendeepsearch.ranking_models.jina_reranker import JinaReranker
-from opendeepsearch.ranking_models.chunker import Chunker 
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from opendeepsearch.deadline import Deadline, remaining_time
 
 @dataclass
 class Source:
@@ -11,38 +9,133 @@ class Source:
     html: str = ""
     # Add other relevant fields here
 
+@dataclass
+class ProcessingReport:
+    """What went wrong while processing sources; degraded results should not be cached"""
+    failed_links: List[str] = field(default_factory=list)  # Pages that failed or timed out
+    rerank_fallback: bool = False  # Reranking failed or ran out of time for some page
+    error: Optional[str] = None  # Processing was skipped or aborted
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.failed_links or self.rerank_fallback or self.error)
+
 class SourceProcessor:
     def __init__(
         self, 
         top_results: int = 5,
         strategies: List[str] = ["no_extraction"],
         filter_content: bool = True,
-        reranker: str = "infinity"
+        reranker: str = "infinity",
+        reranker_config: Optional[Dict[str, Any]] = None,
+        chunk_unit: Literal["characters", "tokens"] = "characters",
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        tokenizer_name: Optional[str] = None,
+        dedup_chunks: bool = True,
+        dedup_threshold: float = 0.8,
+        cross_encoder: Optional[str] = None,
+        cross_encoder_config: Optional[Dict[str, Any]] = None,
+        cross_encoder_candidates: int = 20,
+        selection: Literal["topk", "mmr"] = "topk",
+        mmr_lambda: float = 0.7,
+        merge_adjacent: bool = False,
+        scrape_time_share: float = 0.7,
+        fetch_mode: Literal["browser", "http"] = "browser",
+        fetch_limits: Optional[Dict[str, Any]] = None,
+        extract_documents: bool = True,
+        max_document_pages: int = 20,
+        wikipedia_store: Optional[str] = None
     ):
+        # Scraper, reranker and chunker pull in heavy dependencies (crawl4ai,
+        # langchain, tokenizers), so they are only imported when a processor is built
+        from opendeepsearch.context_scraping.crawl4ai_scraper import WebScraper
+        from opendeepsearch.context_scraping.fetch import FetchLimits
+        from opendeepsearch.ranking_models.chunker import Chunker
+        from opendeepsearch.ranking_models.dedup import ChunkDeduplicator
+
         self.strategies = strategies
         self.filter_content = filter_content
+        wikipedia_fetcher = None
+        if wikipedia_store:
+            from opendeepsearch.context_scraping.wikipedia import WikipediaFetcher
+            from opendeepsearch.context_scraping.wikipedia_store import LocalWikipediaStore
+            wikipedia_fetcher = WikipediaFetcher(local_store=LocalWikipediaStore(wikipedia_store))
         self.scraper = WebScraper(
             strategies=self.strategies, 
-            filter_content=self.filter_content
+            filter_content=self.filter_content,
+            fetch_limits=FetchLimits(**(fetch_limits or {})),
+            fetch_mode=fetch_mode,
+            extract_documents=extract_documents,
+            max_document_pages=max_document_pages,
+            wikipedia_fetcher=wikipedia_fetcher
         )
         self.top_results = top_results
-        self.chunker = Chunker()
+        # Fraction of the remaining deadline given to scraping; the rest is for reranking
+        self.scrape_time_share = scrape_time_share
         
         # Initialize the appropriate reranker
+        reranker_config = reranker_config or {}
         if reranker.lower() == "jina":
-            self.semantic_searcher = JinaReranker()
+            from opendeepsearch.ranking_models.jina_reranker import JinaReranker
+            self.semantic_searcher = JinaReranker(**reranker_config)
             print("Using Jina Reranker")
         else:  # default to infinity
-            self.semantic_searcher = InfinitySemanticSearcher()
+            from opendeepsearch.ranking_models.infinity_rerank import InfinitySemanticSearcher
+            self.semantic_searcher = InfinitySemanticSearcher(**reranker_config)
             print("Using Infinity Reranker")
 
+        # Optional second stage that re-scores the top bi-encoder candidates
+        if cross_encoder:
+            from opendeepsearch.ranking_models.cross_encoder import create_cross_encoder
+            self.semantic_searcher.cross_encoder = create_cross_encoder(
+                cross_encoder, **(cross_encoder_config or {})
+            )
+            self.semantic_searcher.cross_encoder_candidates = cross_encoder_candidates
+            print(f"Using {cross_encoder} cross-encoder on top {cross_encoder_candidates} candidates")
+
+        # Chunk selection: plain top-k or MMR, optionally merging neighbouring chunks
+        self.semantic_searcher.selection = selection
+        self.semantic_searcher.mmr_lambda = mmr_lambda
+        self.semantic_searcher.merge_adjacent = merge_adjacent
+
+        # Token-sized chunks use the reranker's own tokenizer unless overridden
+        if chunk_unit == "tokens":
+            self.chunker = Chunker(
+                chunk_size=chunk_size or 128,
+                chunk_overlap=chunk_overlap if chunk_overlap is not None else 16,
+                length_unit="tokens",
+                tokenizer_name=tokenizer_name or self.semantic_searcher.tokenizer_name
+            )
+        else:
+            self.chunker = Chunker(
+                chunk_size=chunk_size or 150,
+                chunk_overlap=chunk_overlap if chunk_overlap is not None else 50
+            )
+
+        self.deduplicator = ChunkDeduplicator(threshold=dedup_threshold) if dedup_chunks else None
+
     async def process_sources(
         self, 
         sources: List[dict], 
         num_elements: int, 
         query: str, 
-        pro_mode: bool = False
+        pro_mode: bool = False,
+        deadline: Optional[Deadline] = None,
+        report: Optional[ProcessingReport] = None
     ) -> List[dict]:
+        """
+        Scrape, chunk and rerank the top sources, adding their content under 'html'.
+
+        With a deadline, scraping gets ``scrape_time_share`` of the remaining time and
+        sources that do not finish are left snippet-only. If reranking does not finish
+        in time, the leading chunks of each page are used instead. If the deadline has
+        already passed, the SERP results are returned unchanged.
+
+        Pass a ProcessingReport to learn whether the result was degraded this way
+        (or by failed fetches and errors), e.g. to avoid caching it.
+        """
+        report = report if report is not None else ProcessingReport()
         try:
             valid_sources = self._get_valid_sources(sources, num_elements)
             if not valid_sources:
@@ -57,47 +150,150 @@ class SourceProcessor:
                 # If Wikipedia article exists, only process that
                 valid_sources = wiki_sources[:1]  # Take only the first Wikipedia source
 
-            html_contents = await self._fetch_html_contents([s[1]['link'] for s in valid_sources])
-            return self._update_sources_with_content(sources.data, valid_sources, html_contents, query)
+            if deadline is not None and deadline.expired:
+                print("Deadline reached before scraping, using SERP snippets only")
+                report.error = "Deadline reached before scraping"
+                return sources.data
+
+            scrape_deadline = deadline.share(self.scrape_time_share) if deadline is not None else None
+            html_contents = await self._fetch_html_contents(
+                [s[1]['link'] for s in valid_sources],
+                scrape_deadline,
+                query,
+                report
+            )
+
+            # Chunking and embedding are blocking; keep the event loop free for other work
+            chunk_lists, position_lists = await asyncio.to_thread(self._chunk_html_contents, html_contents)
+            try:
+                # The reranker gets the deadline too, so it stops sending embedding
+                # batches once the time is up instead of running on in the background
+                ranked_chunks = await asyncio.wait_for(
+                    asyncio.to_thread(self._rerank_chunk_lists, chunk_lists, query, position_lists, deadline, report),
+                    timeout=remaining_time(deadline)
+                )
+            except asyncio.TimeoutError:
+                print("Deadline reached during reranking, using leading chunks")
+                report.rerank_fallback = True
+                ranked_chunks = [self._leading_chunks(documents) for documents in chunk_lists]
+            return self._update_sources_with_content(sources.data, valid_sources, ranked_chunks)
         except Exception as e:
             print(f"Error in process_sources: {e}")
+            report.error = str(e) or type(e).__name__
             return sources
 
+    def close(self) -> None:
+        """Release the reranker's connections and the scraper's worker processes."""
+        self.semantic_searcher.close()
+        self.scraper.close()
+
     def _get_valid_sources(self, sources: List[dict], num_elements: int) -> List[Tuple[int, dict]]:
         return [(i, source) for i, source in enumerate(sources.data['organic'][:num_elements]) if source]
 
-    async def _fetch_html_contents(self, links: List[str]) -> List[str]:
-        raw_contents = await self.scraper.scrape_many(links)
-        return [x['no_extraction'].content for x in raw_contents.values()]
+    async def _fetch_html_contents(
+        self,
+        links: List[str],
+        deadline: Optional[Deadline] = None,
+        query: Optional[str] = None,
+        report: Optional[ProcessingReport] = None
+    ) -> List[str]:
+        raw_contents = await self.scraper.scrape_many(links, deadline=deadline, query=query)
+        results = [raw_contents[link]['no_extraction'] for link in links]
+        if report is not None:
+            # Failed results include pages cut off by the scrape deadline ("Deadline exceeded")
+            report.failed_links.extend(link for link, result in zip(links, results) if not result.success)
+        return [result.content for result in results]
 
-    def _process_html_content(self, html: str, query: str) -> str:
+    def _chunk_html_content(self, html: str) -> List[str]:
         if not html:
-            return ""
+            return []
         try:
             # Split the HTML content into chunks
-            documents = self.chunker.split_text(html)
-            
-            # Rerank the chunks based on the query
-            reranked_content = self.semantic_searcher.get_reranked_documents(
-                query,
-                documents,
-                top_k=self.top_results
-            )
-            
-            return reranked_content
+            return self.chunker.split_text(html)
+        except Exception as e:
+            print(f"Error in content chunking: {e}")
+            return []
+
+    def _leading_chunks(self, documents: List[str]) -> List[dict]:
+        """Fallback when reranking runs out of time: the first chunks of the page, unscored"""
+        top_k = max(1, self.top_results // 2)
+        return [{"document": document, "score": None} for document in documents[:top_k]]
+
+    def _rerank_chunks(
+        self,
+        documents: List[str],
+        query: str,
+        positions: Optional[List[int]] = None,
+        deadline: Optional[Deadline] = None,
+        report: Optional[ProcessingReport] = None
+    ) -> List[dict]:
+        if not documents:
+            return []
+        try:
+            # Rerank the chunks based on the query; positions let merged passages skip
+            # over chunks removed by deduplication
+            options: Dict[str, Any] = {}
+            if positions is not None and self.semantic_searcher.merge_adjacent:
+                options["positions"] = positions
+            if deadline is not None:
+                options["deadline"] = deadline
+            reranked = self.semantic_searcher.rerank(query, documents, self.top_results, **options)
+
+            # Rerankers that return plain strings carry no relevance scores
+            return [
+                item if isinstance(item, dict) else {"document": item, "score": None}
+                for item in reranked
+            ]
         
+        except TimeoutError:
+            print("Deadline reached during reranking, using leading chunks")
+            if report is not None:
+                report.rerank_fallback = True
+            return self._leading_chunks(documents)
         except Exception as e:
             print(f"Error in content processing: {e}")
-            return ""
+            if report is not None:
+                report.rerank_fallback = True
+            return []
+
+    def _chunk_html_contents(self, html_contents: List[str]) -> Tuple[List[List[str]], List[List[int]]]:
+        """Chunk every page, returning the chunks and their original positions in the page"""
+        chunk_lists = [self._chunk_html_content(html) for html in html_contents]
+        position_lists = [list(range(len(chunks))) for chunks in chunk_lists]
+
+        # Drop boilerplate and syndicated text repeated within or across sources
+        if self.deduplicator is not None:
+            total = sum(len(chunks) for chunks in chunk_lists)
+            position_lists = self.deduplicator.kept_positions(chunk_lists)
+            chunk_lists = [
+                [chunks[position] for position in positions]
+                for chunks, positions in zip(chunk_lists, position_lists)
+            ]
+            print(f"Deduplicated chunks: kept {sum(len(chunks) for chunks in chunk_lists)} of {total}")
+        return chunk_lists, position_lists
+
+    def _rerank_chunk_lists(
+        self,
+        chunk_lists: List[List[str]],
+        query: str,
+        position_lists: Optional[List[List[int]]] = None,
+        deadline: Optional[Deadline] = None,
+        report: Optional[ProcessingReport] = None
+    ) -> List[List[dict]]:
+        position_lists = position_lists or [None] * len(chunk_lists)
+        return [
+            self._rerank_chunks(documents, query, positions, deadline, report)
+            for documents, positions in zip(chunk_lists, position_lists)
+        ]
 
     def _update_sources_with_content(
         self, 
         sources: List[dict],
         valid_sources: List[Tuple[int, dict]], 
-        html_contents: List[str],
-        query: str
+        ranked_chunks: List[List[dict]]
     ) -> List[dict]:
-        for (i, source), html in zip(valid_sources, html_contents):
-            source['html'] = self._process_html_content(html, query)
+        for (i, source), chunks in zip(valid_sources, ranked_chunks):
+            source['html'] = "\n".join(chunk['document'].strip() for chunk in chunks)
+            source['html_chunks'] = chunks
             # sources[i] = source
-        return sources
\ No newline at end of file
+        return sources
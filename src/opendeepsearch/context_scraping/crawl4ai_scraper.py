@@ -4,9 +4,10 @@ Supports multiple extraction strategies including LLM, CSS, and XPath.
 """
 
 import asyncio
+import dataclasses
 import os
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, List, Literal, Optional
 
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from crawl4ai.content_filter_strategy import PruningContentFilter
@@ -15,6 +16,10 @@ from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
 from opendeepsearch.context_scraping.extraction_result import ExtractionResult, print_extraction_result
 from opendeepsearch.context_scraping.basic_web_scraper import ExtractionConfig
 from opendeepsearch.context_scraping.strategy_factory import StrategyFactory
+from opendeepsearch.context_scraping.fetch import FetchedPage, FetchLimits, fetch_page, probe_page, truncate_text
+from opendeepsearch.context_scraping.documents import DOCUMENT_CONTENT_TYPES, DocumentExtractor, detect_document_type, url_extension
+from opendeepsearch.context_scraping.wikipedia import WikipediaFetcher, get_wikipedia_fetcher, is_wikipedia_url
+from opendeepsearch.deadline import Deadline, remaining_time
 
 class WebScraper:
     """Unified scraper that encapsulates all extraction strategies and configuration"""
@@ -25,8 +30,59 @@ class WebScraper:
         llm_instruction: str = "Extract relevant content from the provided text, only return the text, no markdown formatting, remove all footnotes, citations, and other metadata and only keep the main content",
         user_query: Optional[str] = None,
         debug: bool = False,
-        filter_content: bool = False
+        filter_content: bool = False,
+        fetch_limits: Optional[FetchLimits] = None,
+        fetch_mode: Literal["browser", "http"] = "browser",
+        extract_documents: bool = True,
+        max_document_pages: int = 20,
+        wikipedia_fetcher: Optional[WikipediaFetcher] = None
     ):
+        """
+        Args:
+            browser_config: Crawl4AI browser configuration
+            strategies: Extraction strategies to run on every page
+            llm_instruction: Instruction for the LLM strategies
+            user_query: Optional query used by the content filter
+            debug: Print debugging information
+            filter_content: Drop low-quality paragraphs with the fastText filter
+            fetch_limits: Byte, time and content-type limits per page
+            fetch_mode: "browser" routes URLs by their extension: document
+                extensions go to the bounded HTTP download, other extensions (.html,
+                .php, ...) straight to the headless browser. Extensionless URLs are
+                first probed with a ranged GET, which rejects content types off the
+                allowlist and streams pages that announce more than max_bytes through
+                the bounded HTTP download. Browser loads use a page timeout and the
+                extracted content is truncated to max_bytes, but pages that are not
+                probed or do not announce their size are loaded whole, bounded only by
+                max_seconds; use "http" where the byte cap must hold for every page. "http" streams the raw
+                HTML with the limits enforced during download and hands it to
+                Crawl4AI without a browser page load
+            extract_documents: Route PDF, plain text and JSON responses to a text
+                extractor running in a process pool instead of the browser. In
+                browser mode probed URLs are also routed on their Content-Type and
+                leading bytes; documents are downloaded
+                with fetch_limits.max_document_bytes as their byte cap
+            max_document_pages: Maximum number of PDF pages read per document
+            wikipedia_fetcher: Fetcher for Wikipedia articles, closed with the scraper;
+                defaults to the shared one, which stays open for other scrapers
+        """
+        if fetch_mode not in ("browser", "http"):
+            raise ValueError(f"Invalid fetch mode: {fetch_mode}")
+        self.fetch_limits = fetch_limits or FetchLimits()
+        self.fetch_mode = fetch_mode
+        self.extract_documents = extract_documents
+        self.document_extractor = DocumentExtractor(max_pages=max_document_pages)
+        self.wikipedia = wikipedia_fetcher or get_wikipedia_fetcher()
+        self._owns_wikipedia = wikipedia_fetcher is not None
+        # With document extraction, downloads accept the document content types on top of
+        # the page allowlist, and known documents get their own byte cap
+        self.page_limits = dataclasses.replace(
+            self.fetch_limits,
+            allowed_content_types=tuple(dict.fromkeys(
+                self.fetch_limits.allowed_content_types + tuple(DOCUMENT_CONTENT_TYPES)
+            ))
+        ) if extract_documents else self.fetch_limits
+        self.document_limits = dataclasses.replace(self.page_limits, max_bytes=self.fetch_limits.max_document_bytes)
         self.browser_config = browser_config or BrowserConfig(headless=True, verbose=True)
         self.debug = debug
         self.factory = StrategyFactory()
@@ -57,23 +113,76 @@ class WebScraper:
         content_filter = PruningContentFilter(user_query=self.user_query) if self.user_query else PruningContentFilter()
         return CrawlerRunConfig(
             cache_mode=CacheMode.BYPASS,
+            page_timeout=int(self.fetch_limits.max_seconds * 1000),
             markdown_generator=DefaultMarkdownGenerator(
                 content_filter=content_filter
             )
         )
 
-    async def scrape(self, url: str) -> Dict[str, ExtractionResult]:
+    def _failed_results(self, error: str) -> Dict[str, ExtractionResult]:
+        return {
+            strategy_name: ExtractionResult(
+                name=strategy_name,
+                success=False,
+                error=error
+            ) for strategy_name in self.strategies
+        }
+
+    async def _scrape_document(self, page: FetchedPage, kind: str) -> Dict[str, ExtractionResult]:
+        """Extract the text of a PDF, plain text or JSON document for every strategy"""
+        if kind == "pdf" and page.truncation_reason:
+            # The cross-reference table sits at the end of a PDF; a cut-off file cannot be parsed
+            return self._failed_results(f"PDF truncated ({page.truncation_reason}) before it could be parsed")
+        try:
+            document = await self.document_extractor.extract(kind, page.body, page.encoding)
+        except Exception as e:
+            if self.debug:
+                print(f"Debug: {kind} extraction failed for {page.url}: {str(e)}")
+            return self._failed_results(f"{kind} extraction failed: {str(e) or type(e).__name__}")
+
+        content, truncated = truncate_text(document.text, self.fetch_limits.max_bytes)
+        truncation_reason = page.truncation_reason or ("max_pages" if document.truncated else None)
+        if truncated and truncation_reason is None:
+            truncation_reason = "max_bytes"
+        if self.debug:
+            print(f"Debug: Extracted {len(content)} chars from {kind} document {page.url}"
+                  + (f" ({document.pages} pages)" if kind == "pdf" else ""))
+
+        results = {}
+        for strategy_name in self.strategies:
+            # LLM, CSS and XPath strategies target HTML, so all strategies share the document text
+            result = ExtractionResult(
+                name=strategy_name,
+                success=bool(content),
+                content=content or None,
+                error=None if content else f"No text extracted from {kind} document"
+            )
+            result.raw_markdown_length = len(content)
+            if truncation_reason:
+                result.truncated = True
+                result.truncation_reason = truncation_reason
+            results[strategy_name] = result
+        return results
+
+    async def scrape(self, url: str, session=None, query: Optional[str] = None) -> Dict[str, ExtractionResult]:
         """
         Scrape URL using configured strategies
         
         Args:
             url: Target URL to scrape
+            session: Optional aiohttp.ClientSession reused for "http" fetches
+            query: Search query used to pick the relevant sections of Wikipedia
+                articles; defaults to user_query
         """
         # Handle Wikipedia URLs
-        if 'wikipedia.org/wiki/' in url:
-            from src.opendeepsearch.context_scraping.utils import get_wikipedia_content
+        if is_wikipedia_url(url):
             try:
-                content = get_wikipedia_content(url)
+                content = await asyncio.to_thread(self.wikipedia.get_content, url, query or self.user_query)
+            except Exception as e:
+                content = None
+                if self.debug:
+                    print(f"Debug: Wikipedia extraction failed: {str(e)}")
+            if content:
                 # Create same result for all strategies since we're using Wikipedia content
                 return {
                     strategy_name: ExtractionResult(
@@ -82,45 +191,139 @@ class WebScraper:
                         content=content
                     ) for strategy_name in self.strategies
                 }
-            except Exception as e:
-                if self.debug:
-                    print(f"Debug: Wikipedia extraction failed: {str(e)}")
-                # If Wikipedia extraction fails, fall through to normal scraping
+            # If Wikipedia extraction fails, fall through to normal scraping
         
         # Normal scraping for non-Wikipedia URLs or if Wikipedia extraction failed
+        target = url
+        fetched: Optional[FetchedPage] = None
+        document_kind = detect_document_type(url) if self.extract_documents else None
+        oversized = False
+        if self.fetch_mode == "browser" and not url_extension(url):
+            # The browser only honours a page timeout, so check the content type and
+            # announced size first. Routing on the Content-Type and magic bytes also
+            # sends extensionless document links (e.g. arXiv /pdf/ URLs) around the
+            # browser. URLs with an extension are routed on it without the extra round trip
+            probe = await probe_page(url, self.fetch_limits, session)
+            if probe.success:
+                if not self.page_limits.allows(probe.content_type):
+                    return self._failed_results(f"Unsupported content type: {probe.content_type}")
+                if self.extract_documents:
+                    document_kind = detect_document_type(url, probe.content_type, probe.head)
+                oversized = probe.content_length is not None and probe.content_length > self.fetch_limits.max_bytes
+            elif self.debug:
+                # Some sites refuse plain HTTP clients; the browser may still get through
+                print(f"Debug: Probe failed for {url}: {probe.error}")
+
+        if self.fetch_mode == "http" or document_kind or oversized:
+            # Download once with the limits enforced, then let every strategy work on the raw HTML
+            limits = self.document_limits if document_kind else self.page_limits
+            fetched = await fetch_page(url, limits, session)
+            if not fetched.success:
+                return self._failed_results(fetched.error)
+            if self.extract_documents:
+                document_kind = detect_document_type(url, fetched.content_type, fetched.body[:5])
+                if document_kind and fetched.truncation_reason == "max_bytes" and limits is not self.document_limits:
+                    # Only the response revealed a document; download it again under the document cap
+                    fetched = await fetch_page(url, self.document_limits, session)
+                    if not fetched.success:
+                        return self._failed_results(fetched.error)
+            if fetched.truncated and self.debug:
+                print(f"Debug: {url} truncated at {len(fetched.body)} bytes ({fetched.truncation_reason})")
+            if document_kind:
+                return await self._scrape_document(fetched, document_kind)
+            target = "raw:" + fetched.text
+
         results = {}
         for strategy_name in self.strategies:
             config = ExtractionConfig(
                 name=strategy_name,
                 strategy=self.strategy_map[strategy_name]()
             )
-            result = await self.extract(config, url)
+            result = await self.extract(config, target)
+            if fetched is not None and fetched.truncated:
+                result.truncated = True
+                result.truncation_reason = fetched.truncation_reason
             results[strategy_name] = result
             
         return results
     
-    async def scrape_many(self, urls: List[str]) -> Dict[str, Dict[str, ExtractionResult]]:
+    async def scrape_many(
+        self,
+        urls: List[str],
+        deadline: Optional[Deadline] = None,
+        query: Optional[str] = None
+    ) -> Dict[str, Dict[str, ExtractionResult]]:
         """
         Scrape multiple URLs using configured strategies in parallel
+
+        Wikipedia articles are fetched together in one batch before their
+        sections are selected.
         
         Args:
             urls: List of target URLs to scrape
+            deadline: Optional deadline. URLs not scraped by then are cancelled and
+                reported as failed results
+            query: Search query used to pick the relevant sections of Wikipedia articles
             
         Returns:
             Dictionary mapping URLs to their extraction results
         """
-        # Create tasks for all URLs
-        tasks = [self.scrape(url) for url in urls]
-        # Run all tasks concurrently
-        results_list = await asyncio.gather(*tasks)
+        if not urls:
+            return {}
+
+        import aiohttp
+        from opendeepsearch.context_scraping.fetch import DEFAULT_USER_AGENT
+        session = aiohttp.ClientSession(headers={"User-Agent": DEFAULT_USER_AGENT})
+
+        # Warm the Wikipedia cache with one batched fetch; Wikipedia URLs are scraped
+        # once it finishes, everything else starts right away
+        wiki_urls = [url for url in urls if is_wikipedia_url(url)]
+        prefetch = asyncio.ensure_future(asyncio.to_thread(self.wikipedia.fetch_many, wiki_urls)) if len(wiki_urls) > 1 else None
+
+        async def scrape_after_prefetch(url: str) -> Dict[str, ExtractionResult]:
+            try:
+                await asyncio.shield(prefetch)
+            except Exception as e:
+                if self.debug:
+                    print(f"Debug: Wikipedia batch fetch failed: {str(e)}")
+            return await self.scrape(url, session, query)
+
+        # Create tasks for all URLs and run them concurrently
+        tasks = [
+            asyncio.ensure_future(
+                scrape_after_prefetch(url) if prefetch is not None and url in wiki_urls
+                else self.scrape(url, session, query)
+            )
+            for url in urls
+        ]
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=remaining_time(deadline))
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+        finally:
+            await session.close()
         
         # Build results dictionary
         results = {}
-        for url, result in zip(urls, results_list):
-            results[url] = result
+        for url, task in zip(urls, tasks):
+            if task in done:
+                results[url] = task.result()
+            else:
+                if self.debug:
+                    print(f"Debug: Deadline reached before scraping finished: {url}")
+                results[url] = self._failed_results("Deadline exceeded")
             
         return results
 
+    def close(self) -> None:
+        """Shut down the document extraction worker processes and a Wikipedia fetcher passed in"""
+        self.document_extractor.close()
+        if self._owns_wikipedia:
+            # Its HTTP session, and the mmap and SQLite handles of its local store
+            self.wikipedia.close()
+
     async def extract(self, extraction_config: ExtractionConfig, url: str) -> ExtractionResult:
         """Internal method to perform extraction using specified strategy"""
         try:
@@ -146,6 +349,7 @@ class WebScraper:
 
             # Handle different result formats based on strategy
             content = None
+            truncated = False
             if result.success:
                 if extraction_config.name in ['no_extraction', 'cosine']:
                     # For strategies that return a list of dictionaries
@@ -158,15 +362,16 @@ class WebScraper:
                             content = '\n'.join(item.get('content', '') for item in result.extracted_content)
                         else:
                             content = result.extracted_content
-                    
-                    if self.filter_content and content:
-                        from src.opendeepsearch.context_scraping.utils import filter_quality_content
-                        content = filter_quality_content(content)
                 else:
                     content = result.extracted_content
-                    if self.filter_content and content:
-                        from src.opendeepsearch.context_scraping.utils import filter_quality_content
-                        content = filter_quality_content(content)
+
+                # Bound the text that filtering, chunking and reranking have to process
+                if content:
+                    content, truncated = truncate_text(content, self.fetch_limits.max_bytes)
+                if self.filter_content and content:
+                    from opendeepsearch.context_scraping.utils import filter_quality_content
+                    # fastText scoring is CPU-bound; keep it off the event loop
+                    content = await asyncio.to_thread(filter_quality_content, content)
 
             if self.debug:
                 print(f"Debug: Processed content: {content[:200] if content else None}")
@@ -177,6 +382,9 @@ class WebScraper:
                 content=content,
                 error=getattr(result, 'error', None)  # Capture error if available
             )
+            if truncated:
+                extraction_result.truncated = True
+                extraction_result.truncation_reason = "max_bytes"
             
             if result.success:
                 extraction_result.raw_markdown_length = len(result.markdown_v2.raw_markdown)
@@ -0,0 +1,172 @@
+"""
+Text extraction for non-HTML search results: PDF, plain text and JSON.
+
+These documents are routed around the browser. Their bytes are downloaded
+with the usual fetch limits and parsed in a process pool, so that slow PDF
+parsing never blocks the event loop or holds the GIL of the serving process.
+"""
+
+import asyncio
+import io
+import json
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, List, Optional
+from urllib.parse import urlparse
+
+# Content types handled here, mapped to the extractor that reads them
+DOCUMENT_CONTENT_TYPES = {
+    "application/pdf": "pdf",
+    "application/x-pdf": "pdf",
+    "text/plain": "text",
+    "text/markdown": "text",
+    "text/csv": "text",
+    "application/json": "json",
+    "application/ld+json": "json",
+}
+
+_EXTENSIONS = {
+    ".pdf": "pdf",
+    ".txt": "text",
+    ".md": "text",
+    ".csv": "text",
+    ".json": "json",
+}
+_EXTENSION_PATTERN = re.compile(r"\.[a-z][a-z0-9]{0,5}$")
+
+
+def detect_document_type(url: str, content_type: str = "", head: bytes = b"") -> Optional[str]:
+    """
+    Decide whether a URL is a document handled here rather than an HTML page.
+
+    The Content-Type header wins when known, then the leading bytes (PDF magic
+    number), then the URL extension.
+
+    Returns:
+        "pdf", "text" or "json", or None for HTML and anything else
+    """
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type in DOCUMENT_CONTENT_TYPES:
+        return DOCUMENT_CONTENT_TYPES[media_type]
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if media_type:
+        return None
+    return _EXTENSIONS.get(url_extension(url))
+
+
+def url_extension(url: str) -> str:
+    """
+    Lower-cased extension of the last path segment of a URL (e.g. ".pdf"), or "" if it has none.
+
+    Only short suffixes starting with a letter count, so identifiers such as the
+    arXiv "1706.03762" are not mistaken for extensions.
+    """
+    segment = urlparse(url).path.rsplit("/", 1)[-1].lower()
+    match = _EXTENSION_PATTERN.search(segment)
+    return match.group(0) if match else ""
+
+
+@dataclass
+class ExtractedDocument:
+    """Text of a document, and whether the page limit cut it short"""
+    text: str
+    pages: int = 0
+    truncated: bool = False
+
+
+def _flatten_json(value: Any, prefix: str, lines: List[str]) -> None:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten_json(item, f"{prefix}.{key}" if prefix else str(key), lines)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            _flatten_json(item, f"{prefix}[{index}]", lines)
+    elif value is not None and value != "":
+        lines.append(f"{prefix}: {value}" if prefix else str(value))
+
+
+def extract_pdf_text(data: bytes, max_pages: int) -> ExtractedDocument:
+    """Extract the text of the first max_pages pages of a PDF"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    total = len(reader.pages)
+    texts = []
+    for index in range(min(total, max_pages)):
+        try:
+            texts.append(reader.pages[index].extract_text() or "")
+        except Exception:
+            # A single malformed page should not lose the rest of the document
+            continue
+    return ExtractedDocument(
+        text="\n\n".join(text.strip() for text in texts if text.strip()),
+        pages=min(total, max_pages),
+        truncated=total > max_pages
+    )
+
+
+def extract_document(kind: str, data: bytes, encoding: str = "utf-8", max_pages: int = 20) -> ExtractedDocument:
+    """
+    Extract text from document bytes. Runs in a worker process.
+
+    Args:
+        kind: "pdf", "text" or "json"
+        data: Document bytes
+        encoding: Text encoding for "text" and "json"
+        max_pages: Maximum number of PDF pages to read
+    """
+    if kind == "pdf":
+        return extract_pdf_text(data, max_pages)
+
+    text = data.decode(encoding, errors="replace")
+    if kind == "json":
+        try:
+            lines: List[str] = []
+            _flatten_json(json.loads(text), "", lines)
+            return ExtractedDocument(text="\n".join(lines))
+        except json.JSONDecodeError:
+            # Truncated or invalid JSON is still useful as plain text
+            pass
+    return ExtractedDocument(text=text.strip())
+
+
+class DocumentExtractor:
+    """
+    Runs document extraction in a lazily created process pool.
+
+    Attributes:
+        max_pages (int): Maximum number of PDF pages read per document
+        max_workers (int): Number of worker processes
+    """
+
+    def __init__(self, max_pages: int = 20, max_workers: int = 2):
+        self.max_pages = max_pages
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def extract(self, kind: str, data: bytes, encoding: str = "utf-8") -> ExtractedDocument:
+        """Extract text from document bytes without blocking the event loop"""
+        if kind == "text" and len(data) < 1_000_000:
+            # Decoding small text is cheaper than shipping it to another process
+            return extract_document(kind, data, encoding, self.max_pages)
+        if self._pool is None:
+            # The scraping process runs the event loop, worker and browser threads;
+            # forking it could copy locks held by those threads into the workers
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(method)
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool, extract_document, kind, data, encoding, self.max_pages
+        )
+
+    def close(self) -> None:
+        """Shut down the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,368 @@
+"""
+Extraction backends used by FastWebScraper to turn fetched HTML into clean content.
+
+- VLLMBackend runs ReaderLM with vLLM and needs a GPU.
+- TransformersBackend runs a reader model with Hugging Face transformers. It
+  works on CPU, but slowly.
+- HeuristicBackend needs no model. It is a readability-style extractor that
+  runs anywhere.
+
+Models are built on first use, so creating a scraper is cheap and imports
+neither vLLM nor transformers.
+"""
+
+import html as html_lib
+import json
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from opendeepsearch.context_scraping.utils import clean_html, extract_main_content
+
+@dataclass
+class LLMConfig:
+    """Configuration for LLM-based extraction"""
+    model_name: str = 'jinaai/ReaderLM-v2'
+    max_model_len: int = 512_000
+    temperature: float = 0.0
+    top_k: int = 1
+    presence_penalty: float = 0.25
+    frequency_penalty: float = 0.25
+    repetition_penalty: float = 1.13
+    max_tokens: int = 16_384
+    max_concurrent_fetches: int = 8  # Pages fetched in parallel by scrape_many
+    max_input_tokens: int = 32_768  # Cap on prompt tokens per page; prefill cost grows with it
+    main_content_window: bool = True  # Keep only the densest text region of each page
+
+@dataclass
+class ExtractedPage:
+    """Content extracted from one page, with the size of the prompt that produced it"""
+    content: str
+    prompt_tokens: int = 0
+    dropped_chars: int = 0
+    truncated: bool = False
+
+
+class ExtractionBackend(ABC):
+    """Turns a batch of HTML pages into extracted content"""
+
+    # Name reported in ExtractionResult.name
+    name: str = "llm_extraction"
+
+    @abstractmethod
+    def extract(self, htmls: List[str], instruction: Optional[str] = None) -> List[ExtractedPage]:
+        """
+        Extract content from a batch of pages.
+
+        Called from a single dedicated worker thread, so implementations may block
+        and need not be thread-safe.
+
+        Args:
+            htmls: Raw HTML of each page
+            instruction: Optional custom instruction for model-based backends
+
+        Returns:
+            One ExtractedPage per input page, in input order
+        """
+        pass
+
+
+class PromptedLLMBackend(ExtractionBackend):
+    """
+    Base class for backends that prompt a ReaderLM-style model with cleaned HTML.
+
+    Subclasses provide the tokenizer and a batched ``_generate``. Prompts are
+    bounded by ``LLMConfig.max_input_tokens`` after main-content windowing.
+    """
+
+    def __init__(
+        self,
+        llm_config: Optional[LLMConfig] = None,
+        json_schema: Optional[Dict[str, Any]] = None,
+        debug: bool = False
+    ):
+        self.llm_config = llm_config or LLMConfig()
+        self.json_schema = json_schema
+        self.debug = debug
+
+    @property
+    @abstractmethod
+    def tokenizer(self):
+        """Hugging Face tokenizer of the model"""
+        pass
+
+    @abstractmethod
+    def _generate(self, prompts: List[str]) -> List[str]:
+        """Generate one completion per prompt, in prompt order"""
+        pass
+
+    def _create_prompt(self, text: str, instruction: Optional[str] = None) -> str:
+        """Create a prompt for the LLM"""
+        if not instruction:
+            instruction = "Extract the main content and convert to structured format."
+
+        if self.json_schema:
+            instruction = "Extract information according to the schema and return JSON."
+            prompt = f"{instruction}\n```html\n{text}\n```\nSchema:```json\n{json.dumps(self.json_schema, indent=2)}\n```"
+        else:
+            prompt = f"{instruction}\n```html\n{text}\n```"
+
+        messages = [{"role": "user", "content": prompt}]
+        return self.tokenizer.apply_chat_template(
+            messages, tokenize=False, add_generation_prompt=True
+        )
+
+    def _html_token_budget(self, instruction: Optional[str] = None) -> int:
+        """Tokens left for page HTML once the template and the generated output fit"""
+        overhead = len(self.tokenizer.encode(self._create_prompt("", instruction), add_special_tokens=False))
+        limit = min(self.llm_config.max_input_tokens, self.llm_config.max_model_len - self.llm_config.max_tokens)
+        return max(0, limit - overhead)
+
+    def _truncate_to_tokens(self, text: str, max_tokens: int) -> Tuple[str, bool]:
+        """Cut text to at most max_tokens tokens, at a token boundary"""
+        # Tokenizing multi-megabyte pages is itself slow; no token is longer than
+        # a few dozen characters, so anything beyond that bound cannot survive
+        clipped = text[:max_tokens * 32]
+        encoded = self.tokenizer(clipped, add_special_tokens=False, return_offsets_mapping=True)
+        ids = encoded["input_ids"]
+        if len(ids) <= max_tokens:
+            # Still truncated if the character bound cut anything off
+            return clipped, len(clipped) < len(text)
+        if max_tokens == 0:
+            return "", True
+        return clipped[:encoded["offset_mapping"][max_tokens - 1][1]], True
+
+    def _build_prompt(self, html: str, instruction: Optional[str] = None) -> Tuple[str, ExtractedPage]:
+        """Clean a page, keep its main content within the token budget and wrap it in a prompt"""
+        cleaned_html = clean_html(html, clean_svg=True, clean_base64=True)
+        original_chars = len(cleaned_html)
+        if self.llm_config.main_content_window:
+            cleaned_html = extract_main_content(cleaned_html)
+        cleaned_html, truncated = self._truncate_to_tokens(cleaned_html, self._html_token_budget(instruction))
+
+        prompt = self._create_prompt(cleaned_html, instruction)
+        page = ExtractedPage(
+            content="",
+            prompt_tokens=len(self.tokenizer.encode(prompt, add_special_tokens=False)),
+            dropped_chars=original_chars - len(cleaned_html),
+            truncated=truncated
+        )
+        if self.debug:
+            print(f"Debug: Prompt tokens: {page.prompt_tokens}, dropped chars: {page.dropped_chars}, truncated: {truncated}")
+        return prompt, page
+
+    def _parse_llm_output(self, text: str) -> str:
+        """
+        Parse LLM output, handling both single dictionaries and lists of dictionaries.
+        Returns the content field from the most appropriate dictionary.
+        """
+        try:
+            # Strip any markdown code block markers
+            text = text.strip()
+            if text.startswith('```') and text.endswith('```'):
+                text = text.split('```')[1]
+                if text.startswith('json'):
+                    text = text[4:]
+
+            data = json.loads(text.strip())
+
+            if isinstance(data, dict):
+                return data.get('content', '')
+
+            if isinstance(data, list):
+                # First try to find a dictionary with non-empty content
+                for item in data:
+                    if isinstance(item, dict) and item.get('content'):
+                        return item['content']
+
+                # If no content found, return content from last item or empty string
+                last_item = data[-1]
+                return last_item.get('content', '') if isinstance(last_item, dict) else ''
+
+            return ''
+
+        except json.JSONDecodeError:
+            # If JSON parsing fails, return the original text
+            return text.strip()
+        except Exception:
+            return ''
+
+    def extract(self, htmls: List[str], instruction: Optional[str] = None) -> List[ExtractedPage]:
+        if not htmls:
+            return []
+        built = [self._build_prompt(html, instruction) for html in htmls]
+        raw_texts = self._generate([prompt for prompt, _ in built])
+        for raw_text, (_, page) in zip(raw_texts, built):
+            page.content = self._parse_llm_output(raw_text)
+        return [page for _, page in built]
+
+
+class VLLMBackend(PromptedLLMBackend):
+    """ReaderLM on vLLM; all pages of a batch go through one generate call"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._llm = None
+        self._sampling_params = None
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            from vllm import LLM, SamplingParams
+
+            self._sampling_params = SamplingParams(
+                temperature=self.llm_config.temperature,
+                top_k=self.llm_config.top_k,
+                presence_penalty=self.llm_config.presence_penalty,
+                repetition_penalty=self.llm_config.repetition_penalty,
+                max_tokens=self.llm_config.max_tokens,
+                frequency_penalty=self.llm_config.frequency_penalty
+            )
+            self._llm = LLM(
+                model=self.llm_config.model_name,
+                max_model_len=self.llm_config.max_model_len,
+                dtype='float16'
+            )
+        return self._llm
+
+    @property
+    def tokenizer(self):
+        return self.llm.get_tokenizer()
+
+    def _generate(self, prompts: List[str]) -> List[str]:
+        llm = self.llm
+        # vLLM returns outputs in prompt order
+        outputs = llm.generate(prompts, self._sampling_params, use_tqdm=False)
+        return [output.outputs[0].text for output in outputs]
+
+
+class TransformersBackend(PromptedLLMBackend):
+    """
+    Reader model on Hugging Face transformers, for nodes without vLLM or a GPU.
+
+    Greedy decoding mirrors the vLLM defaults. On CPU, set a smaller
+    ``max_input_tokens`` and ``max_tokens`` in the LLMConfig.
+    """
+
+    def __init__(self, *args, device: str = "cpu", batch_size: int = 4, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.device = device
+        self.batch_size = batch_size
+        self._model = None
+        self._tokenizer = None
+
+    def _load(self) -> None:
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        self._tokenizer = AutoTokenizer.from_pretrained(self.llm_config.model_name, padding_side="left")
+        if self._tokenizer.pad_token is None:
+            self._tokenizer.pad_token = self._tokenizer.eos_token
+        self._model = AutoModelForCausalLM.from_pretrained(self.llm_config.model_name).to(self.device)
+        self._model.eval()
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            self._load()
+        return self._tokenizer
+
+    def _generate(self, prompts: List[str]) -> List[str]:
+        import torch
+
+        if self._model is None:
+            self._load()
+        texts = []
+        for offset in range(0, len(prompts), self.batch_size):
+            batch = prompts[offset:offset + self.batch_size]
+            inputs = self._tokenizer(batch, return_tensors="pt", padding=True, add_special_tokens=False).to(self.device)
+            with torch.inference_mode():
+                outputs = self._model.generate(
+                    **inputs,
+                    max_new_tokens=self.llm_config.max_tokens,
+                    do_sample=False,
+                    repetition_penalty=self.llm_config.repetition_penalty,
+                    pad_token_id=self._tokenizer.pad_token_id
+                )
+            generated = outputs[:, inputs["input_ids"].shape[1]:]
+            texts.extend(self._tokenizer.batch_decode(generated, skip_special_tokens=True))
+        return texts
+
+
+_BLOCK_BREAK_PATTERN = re.compile(r"</?(?:p|div|section|article|main|br|tr|table|ul|ol|blockquote|pre|figure|dl|dd|dt)\b[^>]*>", re.IGNORECASE)
+_HEADING_PATTERN = re.compile(r"<h([1-6])\b[^>]*>(.*?)</h\1\s*>", re.IGNORECASE | re.DOTALL)
+_LIST_ITEM_PATTERN = re.compile(r"<li\b[^>]*>", re.IGNORECASE)
+_TAG_PATTERN = re.compile(r"<[^>]*>")
+
+
+class HeuristicBackend(ExtractionBackend):
+    """
+    Readability-style extraction without a model.
+
+    Keeps the densest text region of the page (see utils.extract_main_content)
+    and converts it to markdown-like text, with headings as ``#`` lines and list
+    items as ``-`` bullets. Lines shorter than ``min_line_chars`` that are not
+    headings are dropped.
+    """
+
+    name = "heuristic_extraction"
+
+    def __init__(self, min_line_chars: int = 20):
+        self.min_line_chars = min_line_chars
+
+    def _to_text(self, html: str) -> str:
+        html = _HEADING_PATTERN.sub(
+            lambda match: f"\n\n{'#' * int(match.group(1))} {_TAG_PATTERN.sub('', match.group(2)).strip()}\n\n",
+            html
+        )
+        html = _LIST_ITEM_PATTERN.sub("\n- ", html)
+        html = _BLOCK_BREAK_PATTERN.sub("\n\n", html)
+        text = html_lib.unescape(_TAG_PATTERN.sub("", html))
+
+        lines = []
+        for line in text.split("\n"):
+            line = re.sub(r"[ \t]+", " ", line).strip()
+            if line.startswith("#") or len(line) >= self.min_line_chars:
+                lines.append(line)
+        return "\n\n".join(lines)
+
+    def extract(self, htmls: List[str], instruction: Optional[str] = None) -> List[ExtractedPage]:
+        pages = []
+        for html in htmls:
+            cleaned_html = clean_html(html, clean_svg=True, clean_base64=True)
+            main = extract_main_content(cleaned_html)
+            pages.append(ExtractedPage(
+                content=self._to_text(main),
+                dropped_chars=len(cleaned_html) - len(main)
+            ))
+        return pages
+
+
+def create_extraction_backend(
+    name: str,
+    llm_config: Optional[LLMConfig] = None,
+    json_schema: Optional[Dict[str, Any]] = None,
+    debug: bool = False,
+    **kwargs
+) -> ExtractionBackend:
+    """
+    Factory function to create an extraction backend.
+
+    Args:
+        name: "vllm", "transformers" or "heuristic"
+        llm_config: Model configuration for the model-based backends
+        json_schema: Optional JSON schema for model-based extraction
+        debug: Print prompt statistics
+        **kwargs: Extra arguments for the selected backend
+
+    Raises:
+        ValueError: If an invalid backend is specified
+    """
+    if name.lower() == "vllm":
+        return VLLMBackend(llm_config, json_schema, debug, **kwargs)
+    elif name.lower() == "transformers":
+        return TransformersBackend(llm_config, json_schema, debug, **kwargs)
+    elif name.lower() == "heuristic":
+        return HeuristicBackend(**kwargs)
+    else:
+        raise ValueError(f"Invalid extraction backend: {name}. Must be 'vllm', 'transformers' or 'heuristic'")
@@ -13,6 +13,12 @@ class ExtractionResult:
         self.error = error
         self.raw_markdown_length = 0
         self.citations_markdown_length = 0
+        # Set by LLM-based extraction
+        self.prompt_tokens = 0
+        self.dropped_chars = 0
+        self.truncated = False
+        # Set when a fetch limit cut the page short ("max_bytes" or "max_seconds")
+        self.truncation_reason = None
 
 def print_extraction_result(result: ExtractionResult):
     """Utility function to print extraction results"""
@@ -21,5 +27,9 @@ def print_extraction_result(result: ExtractionResult):
         print(f"Extracted Content: {result.content}")
         print(f"Raw Markdown Length: {result.raw_markdown_length}")
         print(f"Citations Markdown Length: {result.citations_markdown_length}")
+        if result.prompt_tokens:
+            print(f"Prompt Tokens: {result.prompt_tokens} (dropped {result.dropped_chars} chars, truncated: {result.truncated})")
+        if result.truncation_reason:
+            print(f"Page truncated: {result.truncation_reason}")
     else:
         print(f"Error in {result.name}: {result.error}") 
\ No newline at end of file
@@ -1,30 +1,24 @@
 """
-Enhanced web scraping implementation using Crawl4AI and vLLM.
-Supports multiple extraction strategies with LLM-powered content processing.
+Enhanced web scraping implementation using Crawl4AI and a pluggable extraction backend.
+Supports LLM-powered extraction with vLLM or transformers, and a model-free heuristic extractor.
 """
 
 import asyncio
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Any
-import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple, Union
 
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig
-from vllm import LLM, SamplingParams
 
+from opendeepsearch.context_scraping.extraction_backends import (
+    ExtractedPage,
+    ExtractionBackend,
+    LLMConfig,
+    create_extraction_backend
+)
 from opendeepsearch.context_scraping.extraction_result import ExtractionResult
-from opendeepsearch.context_scraping.utils import clean_html, get_wikipedia_content
-
-@dataclass
-class LLMConfig:
-    """Configuration for LLM-based extraction"""
-    model_name: str = 'jinaai/ReaderLM-v2'
-    max_model_len: int = 512_000
-    temperature: float = 0.0
-    top_k: int = 1
-    presence_penalty: float = 0.25
-    frequency_penalty: float = 0.25
-    repetition_penalty: float = 1.13
-    max_tokens: int = 16_384
+from opendeepsearch.context_scraping.fetch import FetchLimits, truncate_text
+from opendeepsearch.context_scraping.utils import get_wikipedia_content
+from opendeepsearch.context_scraping.wikipedia import is_wikipedia_url
 
 # DEFAULT_SCHEMA = """
 # {
@@ -54,91 +48,54 @@ class FastWebScraper:
         llm_config: Optional[LLMConfig] = None,
         browser_config: Optional[BrowserConfig] = None,
         json_schema: Optional[Dict[str, Any]] = None,
-        debug: bool = False
+        debug: bool = False,
+        backend: Union[str, ExtractionBackend] = "vllm",
+        backend_config: Optional[Dict[str, Any]] = None,
+        fetch_limits: Optional[FetchLimits] = None
     ):
+        """
+        Args:
+            llm_config: Model and prompt settings for model-based backends
+            browser_config: Crawl4AI browser configuration
+            json_schema: Optional JSON schema for model-based extraction
+            debug: Print debugging information
+            backend: "vllm" (GPU), "transformers" (local model, CPU capable),
+                "heuristic" (no model) or an ExtractionBackend instance.
+                Models are loaded on first extraction.
+            backend_config: Extra keyword arguments for the backend, e.g. device
+            fetch_limits: Page load timeout (max_seconds) and HTML size cap (max_bytes)
+        """
         self.debug = debug
         self.browser_config = browser_config or BrowserConfig(headless=True, verbose=debug)
         self.llm_config = llm_config or LLMConfig()
+        self.fetch_limits = fetch_limits or FetchLimits()
         self.json_schema = None #json_schema or json.loads(DEFAULT_SCHEMA)
-        
-        # Initialize LLM
-        self.sampling_params = SamplingParams(
-            temperature=self.llm_config.temperature,
-            top_k=self.llm_config.top_k,
-            presence_penalty=self.llm_config.presence_penalty,
-            repetition_penalty=self.llm_config.repetition_penalty,
-            max_tokens=self.llm_config.max_tokens,
-            frequency_penalty=self.llm_config.frequency_penalty
-        )
-        
-        self.llm = LLM(
-            model=self.llm_config.model_name,
-            max_model_len=self.llm_config.max_model_len,
-            dtype='float16'
-        )
-        
-        self.tokenizer = self.llm.get_tokenizer()
 
-    def _create_prompt(self, text: str, instruction: Optional[str] = None) -> str:
-        """Create a prompt for the LLM"""
-        if not instruction:
-            instruction = "Extract the main content and convert to structured format."
-        
-        if self.json_schema:
-            instruction = "Extract information according to the schema and return JSON."
-            prompt = f"{instruction}\n```html\n{text}\n```\nSchema:```json\n{json.dumps(self.json_schema, indent=2)}\n```"
+        if isinstance(backend, ExtractionBackend):
+            self.backend = backend
         else:
-            prompt = f"{instruction}\n```html\n{text}\n```"
+            self.backend = create_extraction_backend(
+                backend, self.llm_config, self.json_schema, debug, **(backend_config or {})
+            )
 
-        messages = [{"role": "user", "content": prompt}]
-        return self.tokenizer.apply_chat_template(
-            messages, tokenize=False, add_generation_prompt=True
-        )
+        # Model engines are not thread-safe; all extraction goes through this single
+        # worker so batches never overlap and the event loop is never blocked
+        self._llm_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="extraction")
 
-    async def _extract_content(self, html: str, instruction: Optional[str] = None) -> str:
-        """Extract content using LLM"""
-        cleaned_html = clean_html(html, clean_svg=True, clean_base64=True)
-        prompt = self._create_prompt(cleaned_html, instruction)
-        
-        outputs = self.llm.generate(prompt, self.sampling_params)
-        raw_text = outputs[0].outputs[0].text
-        return self._parse_llm_output(raw_text)
+    def close(self):
+        """Shut down the generation worker"""
+        self._llm_executor.shutdown(wait=False)
 
-    def _parse_llm_output(self, text: str) -> str:
-        """
-        Parse LLM output, handling both single dictionaries and lists of dictionaries.
-        Returns the content field from the most appropriate dictionary.
-        """
-        try:
-            # Strip any markdown code block markers
-            text = text.strip()
-            if text.startswith('```') and text.endswith('```'):
-                text = text.split('```')[1]
-                if text.startswith('json'):
-                    text = text[4:]
-            
-            data = json.loads(text.strip())
-            
-            if isinstance(data, dict):
-                return data.get('content', '')
-            
-            if isinstance(data, list):
-                # First try to find a dictionary with non-empty content
-                for item in data:
-                    if isinstance(item, dict) and item.get('content'):
-                        return item['content']
-                
-                # If no content found, return content from last item or empty string
-                last_item = data[-1]
-                return last_item.get('content', '') if isinstance(last_item, dict) else ''
-            
-            return ''
-            
-        except json.JSONDecodeError:
-            # If JSON parsing fails, return the original text
-            return text.strip()
-        except Exception:
-            return ''
+    async def _extract_contents(self, htmls: List[str], instruction: Optional[str] = None) -> List[ExtractedPage]:
+        """Extract content from several pages with a single batched backend call"""
+        if not htmls:
+            return []
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._llm_executor, self.backend.extract, htmls, instruction)
+
+    async def _extract_content(self, html: str, instruction: Optional[str] = None) -> str:
+        """Extract content using the backend"""
+        return (await self._extract_contents([html], instruction))[0].content
 
     async def scrape(self, url: str, instruction: Optional[str] = None) -> ExtractionResult:
         """
@@ -148,43 +105,50 @@ class FastWebScraper:
             url: Target URL to scrape
             instruction: Optional custom instruction for the LLM
         """
+        return (await self.scrape_many([url], instruction))[url]
+
+    async def _fetch(
+        self,
+        crawler: AsyncWebCrawler,
+        url: str,
+        semaphore: asyncio.Semaphore
+    ) -> Tuple[Optional[str], Optional[ExtractionResult], bool]:
+        """
+        Fetch a page, returning either its HTML for LLM extraction or a finished result,
+        and whether the HTML was truncated to the byte limit.
+        """
         try:
             if self.debug:
                 print(f"Debug: Processing URL: {url}")
 
             # Handle Wikipedia URLs
-            if 'wikipedia.org/wiki/' in url:
-                try:
-                    content = get_wikipedia_content(url)
-                    return ExtractionResult(
+            if is_wikipedia_url(url):
+                content = await asyncio.to_thread(get_wikipedia_content, url)
+                if content:
+                    return None, ExtractionResult(
                         name="llm_extraction",
                         success=True,
                         content=content
-                    )
-                except Exception as e:
-                    if self.debug:
-                        print(f"Debug: Wikipedia extraction failed: {str(e)}")
-                    # If Wikipedia extraction fails, fall through to normal scraping
+                    ), False
+                if self.debug:
+                    print(f"Debug: Wikipedia extraction failed for {url}")
+                # If Wikipedia extraction fails, fall through to normal scraping
 
             # Fetch HTML
-            async with AsyncWebCrawler(config=self.browser_config) as crawler:
-                result = await crawler.arun(url=url, config=CrawlerRunConfig())
-                
+            async with semaphore:
+                result = await crawler.arun(
+                    url=url,
+                    config=CrawlerRunConfig(page_timeout=int(self.fetch_limits.max_seconds * 1000))
+                )
+
             if not result.success:
-                return ExtractionResult(
+                return None, ExtractionResult(
                     name="llm_extraction",
                     success=False,
                     error="Failed to fetch HTML"
-                )
-
-            # Process with LLM
-            content = await self._extract_content(result.html, instruction)
-            
-            return ExtractionResult(
-                name="llm_extraction",
-                success=True,
-                content=content
-            )
+                ), False
+            html, truncated = truncate_text(result.html, self.fetch_limits.max_bytes)
+            return html, None, truncated
 
         except Exception as e:
             if self.debug:
@@ -192,21 +156,57 @@ class FastWebScraper:
                 print(f"Debug: Exception during scraping:")
                 print(traceback.format_exc())
             
-            return ExtractionResult(
+            return None, ExtractionResult(
                 name="llm_extraction",
                 success=False,
                 error=str(e)
-            )
+            ), False
 
     async def scrape_many(self, urls: List[str], instruction: Optional[str] = None) -> Dict[str, ExtractionResult]:
         """
         Scrape multiple URLs
+
+        Pages are fetched concurrently with one shared browser, then every fetched
+        page is extracted in a single batched LLM call.
         
         Args:
             urls: List of target URLs
             instruction: Optional custom instruction for the LLM
         """
-        results = {}
-        for url in urls:
-            results[url] = await self.scrape(url, instruction)
+        urls = list(dict.fromkeys(urls))
+        semaphore = asyncio.Semaphore(self.llm_config.max_concurrent_fetches)
+        async with AsyncWebCrawler(config=self.browser_config) as crawler:
+            fetched = await asyncio.gather(*(self._fetch(crawler, url, semaphore) for url in urls))
+
+        results = {url: result for url, (_, result, _) in zip(urls, fetched) if result is not None}
+        pending = [(url, html) for url, (html, result, _) in zip(urls, fetched) if result is None]
+        truncated_urls = {url for url, (_, _, truncated) in zip(urls, fetched) if truncated}
+        if not pending:
+            return results
+
+        try:
+            pages = await self._extract_contents([html for _, html in pending], instruction)
+            for (url, _), page in zip(pending, pages):
+                result = ExtractionResult(
+                    name=self.backend.name,
+                    success=True,
+                    content=page.content
+                )
+                result.prompt_tokens = page.prompt_tokens
+                result.dropped_chars = page.dropped_chars
+                result.truncated = page.truncated or url in truncated_urls
+                if url in truncated_urls:
+                    result.truncation_reason = "max_bytes"
+                results[url] = result
+        except Exception as e:
+            if self.debug:
+                import traceback
+                print(f"Debug: Exception during LLM extraction:")
+                print(traceback.format_exc())
+            for url, _ in pending:
+                results[url] = ExtractionResult(
+                    name=self.backend.name,
+                    success=False,
+                    error=str(e)
+                )
         return results
@@ -0,0 +1,212 @@
+"""
+Bounded HTTP page download for the scraping layer.
+
+Pages are streamed and cut off as soon as they exceed a byte or time limit,
+and responses whose content type is not on the allowlist are rejected from
+their headers alone. This keeps a single huge (or endless) response from
+exhausting worker memory or CPU in cleaning, filtering and chunking.
+"""
+
+import asyncio
+import codecs
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+_CHARSET_PATTERN = re.compile(r"charset=([\w-]+)", re.IGNORECASE)
+_CONTENT_RANGE_PATTERN = re.compile(r"/(\d+)\s*$")
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/122.0 Safari/537.36"
+)
+
+
+@dataclass
+class FetchLimits:
+    """Limits applied to every page download"""
+    max_bytes: int = 5_000_000  # Body bytes kept per page; the rest is discarded
+    max_seconds: float = 30.0  # Wall-clock time per page, including the browser's page load
+    max_document_bytes: int = 50_000_000  # Byte cap for PDF, text and JSON documents
+    allowed_content_types: Tuple[str, ...] = (
+        "text/html",
+        "application/xhtml+xml",
+        "text/plain",
+    )
+    chunk_size: int = 64 * 1024
+
+    def allows(self, content_type: str) -> bool:
+        """Whether a Content-Type header value is on the allowlist (missing types are allowed)"""
+        media_type = content_type.split(";", 1)[0].strip().lower()
+        return not media_type or media_type in self.allowed_content_types
+
+
+@dataclass
+class FetchedPage:
+    """Result of a bounded page download"""
+    url: str
+    status: int = 0
+    content_type: str = ""
+    body: bytes = field(default=b"", repr=False)
+    truncation_reason: Optional[str] = None  # "max_bytes" or "max_seconds"
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+    @property
+    def truncated(self) -> bool:
+        return self.truncation_reason is not None
+
+    @property
+    def encoding(self) -> str:
+        """Charset from the headers if it is a known codec, otherwise UTF-8"""
+        match = _CHARSET_PATTERN.search(self.content_type)
+        if match:
+            try:
+                return codecs.lookup(match.group(1)).name
+            except LookupError:
+                pass
+        return "utf-8"
+
+    @property
+    def text(self) -> str:
+        """Body decoded with the charset from the headers, falling back to UTF-8"""
+        return self.body.decode(self.encoding, errors="replace")
+
+
+async def fetch_page(url: str, limits: Optional[FetchLimits] = None, session=None) -> FetchedPage:
+    """
+    Download a page, streaming the body and stopping at the configured limits.
+
+    Args:
+        url: Page URL
+        limits: Byte, time and content-type limits; defaults to FetchLimits()
+        session: Optional aiohttp.ClientSession to reuse connections across pages
+
+    Returns:
+        FetchedPage with the (possibly truncated) body, or an error
+    """
+    import aiohttp
+
+    limits = limits or FetchLimits()
+    page = FetchedPage(url=url)
+    start = time.monotonic()
+    own_session = session is None
+    if own_session:
+        session = aiohttp.ClientSession(headers={"User-Agent": DEFAULT_USER_AGENT})
+
+    chunks = []
+    received = 0
+    try:
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=limits.max_seconds, sock_read=limits.max_seconds)
+        async with session.get(url, timeout=timeout, allow_redirects=True) as response:
+            page.status = response.status
+            page.content_type = response.headers.get("Content-Type", "")
+            if response.status >= 400:
+                page.error = f"HTTP {response.status}"
+                return page
+            if not limits.allows(page.content_type):
+                page.error = f"Unsupported content type: {page.content_type}"
+                return page
+
+            iterator = response.content.iter_chunked(limits.chunk_size).__aiter__()
+            while True:
+                remaining = limits.max_seconds - (time.monotonic() - start)
+                if remaining <= 0:
+                    page.truncation_reason = "max_seconds"
+                    break
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout=remaining)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    page.truncation_reason = "max_seconds"
+                    break
+                if received + len(chunk) > limits.max_bytes:
+                    chunks.append(chunk[:limits.max_bytes - received])
+                    received = limits.max_bytes
+                    page.truncation_reason = "max_bytes"
+                    break
+                chunks.append(chunk)
+                received += len(chunk)
+    except Exception as e:
+        page.error = f"Fetch failed: {str(e) or type(e).__name__}"
+    finally:
+        if own_session:
+            await session.close()
+        page.body = b"".join(chunks)
+        page.elapsed = time.monotonic() - start
+    return page
+
+
+@dataclass
+class PageProbe:
+    """Headers and leading bytes of a page, read before deciding how to fetch it"""
+    url: str
+    status: int = 0
+    content_type: str = ""
+    content_length: Optional[int] = None  # Full size if the server announced it
+    head: bytes = field(default=b"", repr=False)
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+async def probe_page(url: str, limits: Optional[FetchLimits] = None, session=None, head_bytes: int = 1024) -> PageProbe:
+    """
+    Read the Content-Type, size and first bytes of a page with a ranged GET.
+
+    Servers that ignore the Range header send the whole body, but only the first
+    ``head_bytes`` are read before the connection is released.
+
+    Args:
+        url: Page URL
+        limits: Limits whose max_seconds bounds the probe (a fifth of it is used)
+        session: Optional aiohttp.ClientSession to reuse connections across pages
+        head_bytes: Number of leading bytes to read, e.g. for magic numbers
+
+    Returns:
+        PageProbe with the headers and leading bytes, or an error
+    """
+    import aiohttp
+
+    limits = limits or FetchLimits()
+    probe = PageProbe(url=url)
+    own_session = session is None
+    if own_session:
+        session = aiohttp.ClientSession(headers={"User-Agent": DEFAULT_USER_AGENT})
+    try:
+        timeout = aiohttp.ClientTimeout(total=max(1.0, limits.max_seconds / 5))
+        headers = {"Range": f"bytes=0-{head_bytes - 1}"}
+        async with session.get(url, headers=headers, timeout=timeout, allow_redirects=True) as response:
+            probe.status = response.status
+            probe.content_type = response.headers.get("Content-Type", "")
+            if response.status >= 400:
+                probe.error = f"HTTP {response.status}"
+                return probe
+            content_range = _CONTENT_RANGE_PATTERN.search(response.headers.get("Content-Range", ""))
+            if content_range:
+                probe.content_length = int(content_range.group(1))
+            elif response.status == 200 and response.headers.get("Content-Length", "").isdigit():
+                probe.content_length = int(response.headers["Content-Length"])
+            probe.head = await response.content.read(head_bytes)
+    except Exception as e:
+        probe.error = f"Probe failed: {str(e) or type(e).__name__}"
+    finally:
+        if own_session:
+            await session.close()
+    return probe
+
+
+def truncate_text(text: str, max_bytes: int) -> Tuple[str, bool]:
+    """Cut text to at most max_bytes UTF-8 bytes without splitting a character"""
+    encoded = text.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return text, False
+    return encoded[:max_bytes].decode("utf-8", errors="ignore"), True
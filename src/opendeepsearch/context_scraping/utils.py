@@ -1,8 +1,8 @@
 import re
 import os
-from typing import List, Tuple
+import threading
+from typing import List, Optional, Tuple
 import logging
-from opendeepsearch.context_scraping.fasttext_fallback import load_fasttext_or_fallback
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -14,9 +14,28 @@ def predict_fallback(text, k=1):
     # Return a default prediction that allows the system to continue
     return [['__label__2']], [[1.0]]
 
-# Load pre-trained model with fallback
-model = load_fasttext_or_fallback("lid.176.bin")
-logging.info("FastText model or fallback loaded successfully")
+# The pre-trained model is loaded on first use, not at import time
+_model = None
+_model_lock = threading.Lock()
+
+
+def _get_model():
+    """Load the FastText model (or its fallback) once, on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from opendeepsearch.context_scraping.fasttext_fallback import load_fasttext_or_fallback
+                _model = load_fasttext_or_fallback("lid.176.bin")
+                logging.info("FastText model or fallback loaded successfully")
+    return _model
+
+
+def __getattr__(name: str):
+    # Keep `utils.model` working for callers that used the eagerly loaded model
+    if name == "model":
+        return _get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def clean_markdown_links(text: str, min_quality_score: float = 0.2) -> Tuple[str, float]:
@@ -112,7 +131,7 @@ def predict_educational_value(text_list: List[str]) -> List[float]:
     Returns a list of scores between 0 and 2.
     """
     text_list = [replace_newlines(text) for text in text_list]
-    pred = model.predict(text_list, k=-1)
+    pred = _get_model().predict(text_list, k=-1)
     score_list = []
     for l, s in zip(*pred):
         score = 0
@@ -121,25 +140,21 @@ def predict_educational_value(text_list: List[str]) -> List[float]:
         score_list.append(float(score))
     return score_list
 
-def get_wikipedia_content(url: str) -> str | None:
+def get_wikipedia_content(url: str, query: Optional[str] = None) -> str | None:
     """
     Extract content from a Wikipedia URL.
 
     Args:
         url: Wikipedia URL to scrape
+        query: Optional search query; only the sections most relevant to it are returned
 
     Returns:
         str: Page content if found, None otherwise
     """
-    wiki = wikipediaapi.Wikipedia(user_agent="opendeepsearch", language='en')
+    from opendeepsearch.context_scraping.wikipedia import get_wikipedia_fetcher
 
-    # Extract the page title from URL (everything after /wiki/)
     try:
-        title = url.split('/wiki/')[-1]
-        page = wiki.page(title)
-        if page.exists():
-            return page.text
-        return None
+        return get_wikipedia_fetcher().get_content(url, query)
     except Exception:
         return None
 
@@ -202,6 +217,82 @@ def clean_html(html: str, clean_svg: bool = False, clean_base64: bool = False):
 
     return html.strip()
 
+BLOCK_START_PATTERN = re.compile(
+    r"(?=<(?:p|div|section|article|main|aside|h[1-6]|li|ul|ol|table|tr|blockquote|pre|dl|figure)\b)",
+    re.IGNORECASE
+)
+TAG_PATTERN = re.compile(r"<[^>]*>")
+ANCHOR_PATTERN = re.compile(r"<a\b[^>]*>(.*?)</a>", re.IGNORECASE | re.DOTALL)
+MAIN_PATTERN = re.compile(r"<(article|main)\b[^>]*>.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+TITLE_PATTERN = re.compile(r"<title\b[^>]*>.*?</title\s*>", re.IGNORECASE | re.DOTALL)
+
+
+def _text_length(html: str) -> int:
+    return len(TAG_PATTERN.sub("", html).strip())
+
+
+def extract_main_content(html: str, markup_weight: float = 0.5, min_main_share: float = 0.5) -> str:
+    """
+    Keep the article body of a cleaned HTML page, dropping low text-density regions.
+
+    If the page has an <article> or <main> element holding at least
+    ``min_main_share`` of the page text, that element is kept. Otherwise the page
+    is split into block-level elements, each scored by its text length minus
+    ``markup_weight`` times its markup and link-text length, and the contiguous
+    run of blocks with the highest total score is kept (navigation, link lists
+    and sidebars score negative). The page <title> is always preserved.
+
+    Args:
+        html: HTML, ideally already passed through clean_html
+        markup_weight: Penalty per character of markup or link text
+        min_main_share: Minimum share of the page text an <article>/<main> must hold
+
+    Returns:
+        The selected HTML fragment, or the input if no better window is found
+    """
+    page_text = _text_length(html)
+    if page_text == 0:
+        return html
+
+    title_match = TITLE_PATTERN.search(html)
+    title = title_match.group(0) if title_match else ""
+
+    mains = [match.group(0) for match in MAIN_PATTERN.finditer(html)]
+    if mains:
+        main = max(mains, key=_text_length)
+        if _text_length(main) >= min_main_share * page_text:
+            return title + main
+
+    blocks = [block for block in BLOCK_START_PATTERN.split(html) if block]
+    if len(blocks) < 3:
+        return html
+
+    scores = []
+    for block in blocks:
+        text = _text_length(block)
+        link_text = sum(len(TAG_PATTERN.sub("", anchor)) for anchor in ANCHOR_PATTERN.findall(block))
+        markup = len(block) - text
+        scores.append(text - link_text - markup_weight * (markup + link_text))
+
+    # Maximum-sum contiguous window of blocks (Kadane)
+    best_sum, best_start, best_end = float("-inf"), 0, len(blocks)
+    running, start = 0.0, 0
+    for index, score in enumerate(scores):
+        if running <= 0:
+            running, start = score, index
+        else:
+            running += score
+        if running > best_sum:
+            best_sum, best_start, best_end = running, start, index + 1
+
+    if best_sum <= 0:
+        return html
+    window = "".join(blocks[best_start:best_end])
+    if title and title not in window:
+        window = title + window
+    return window
+
+
 JSON_SCHEMA = """
 {
   "type": "object",
@@ -0,0 +1,400 @@
+"""
+Wikipedia fast path for the scrapers.
+
+Articles are read from the MediaWiki API instead of being rendered in a
+browser. One pooled HTTP session serves all requests, titles and redirects
+for many URLs are resolved in a single batched query, article extracts are
+fetched concurrently and cached, and only the sections most relevant to the
+query are returned so that less text has to be chunked and embedded.
+"""
+
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+if TYPE_CHECKING:
+    from opendeepsearch.context_scraping.wikipedia_store import LocalWikipediaStore
+
+WIKIPEDIA_URL_PATTERN = re.compile(
+    r"^https?://([a-z0-9-]+)\.(?:m\.)?wikipedia\.org/wiki/([^?#]+)(?:\?[^#]*)?(?:#(.*))?$",
+    re.IGNORECASE
+)
+_HEADING_PATTERN = re.compile(r"^(={2,6})\s*(.*?)\s*\1\s*$", re.MULTILINE)
+_TERM_PATTERN = re.compile(r"\w+")
+
+# Back matter that never answers a question
+SKIPPED_SECTIONS = {
+    "see also", "references", "external links", "further reading", "notes",
+    "bibliography", "sources", "citations", "footnotes", "notes and references",
+}
+_STOPWORDS = {
+    "the", "and", "for", "are", "was", "were", "what", "who", "whom", "when", "where",
+    "which", "why", "how", "does", "did", "with", "from", "that", "this", "these",
+    "those", "into", "about", "has", "have", "had", "its", "his", "her", "their",
+}
+
+# The API accepts at most 50 titles per query
+_TITLES_PER_QUERY = 50
+
+
+def parse_wikipedia_url(url: str) -> Optional[Tuple[str, str, Optional[str]]]:
+    """
+    Split a Wikipedia article URL into its language, title and section anchor.
+
+    Returns:
+        (language, title, anchor) with underscores in the title replaced by
+        spaces, or None if the URL is not a Wikipedia article
+    """
+    match = WIKIPEDIA_URL_PATTERN.match(url.strip())
+    if not match:
+        return None
+    language, title, anchor = match.groups()
+    title = unquote(title).replace("_", " ").strip()
+    anchor = unquote(anchor).replace("_", " ").strip() if anchor else None
+    return language.lower(), title, anchor or None
+
+
+def is_wikipedia_url(url: str) -> bool:
+    return parse_wikipedia_url(url) is not None
+
+
+@dataclass
+class WikipediaSection:
+    """A section of an article; the lead section has an empty title and level 1"""
+    title: str
+    level: int
+    text: str
+
+
+@dataclass
+class WikipediaPage:
+    """Plain-text article split into sections"""
+    language: str
+    title: str
+    sections: List[WikipediaSection] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return render_sections(self.sections)
+
+
+def split_sections(extract: str) -> List[WikipediaSection]:
+    """Split a plain-text extract with "== Heading ==" markers into sections"""
+    sections = []
+    title, level, start = "", 1, 0
+    for match in _HEADING_PATTERN.finditer(extract):
+        sections.append(WikipediaSection(title, level, extract[start:match.start()].strip()))
+        title, level, start = match.group(2), len(match.group(1)), match.end()
+    sections.append(WikipediaSection(title, level, extract[start:].strip()))
+    return [section for section in sections if section.text]
+
+
+def render_sections(sections: List[WikipediaSection]) -> str:
+    """Join sections back into text, keeping their headings"""
+    parts = []
+    for section in sections:
+        if section.title:
+            parts.append(f"{'#' * section.level} {section.title}\n\n{section.text}")
+        else:
+            parts.append(section.text)
+    return "\n\n".join(parts)
+
+
+def _terms(text: str) -> List[str]:
+    return [term for term in _TERM_PATTERN.findall(text.lower()) if len(term) > 2 and term not in _STOPWORDS]
+
+
+def rank_sections(
+    sections: List[WikipediaSection],
+    query: str,
+    max_sections: int,
+    anchor: Optional[str] = None
+) -> List[WikipediaSection]:
+    """
+    Select the lead section and the sections that best match a query.
+
+    Sections are scored by TF-IDF over the query terms, with heading matches
+    counting double. The section named by the URL anchor is always kept and
+    back matter (references, external links, ...) is always dropped.
+
+    Args:
+        sections: Sections of an article, in document order
+        query: Search query
+        max_sections: Maximum number of sections returned, including the lead
+        anchor: Section title from the URL fragment, if any
+
+    Returns:
+        The selected sections, in document order
+    """
+    candidates = [
+        (index, section) for index, section in enumerate(sections)
+        if section.title.lower() not in SKIPPED_SECTIONS
+    ]
+    query_terms = set(_terms(query))
+    section_terms = [Counter(_terms(section.text)) for _, section in candidates]
+    heading_terms = [set(_terms(section.title)) for _, section in candidates]
+    document_frequency = Counter(term for terms in section_terms for term in query_terms & terms.keys())
+
+    def score(position: int) -> float:
+        total = 0.0
+        for term in query_terms:
+            tf = section_terms[position][term] + 2 * (term in heading_terms[position])
+            if tf:
+                idf = math.log(1 + len(candidates) / (1 + document_frequency[term]))
+                total += (1 + math.log(tf)) * idf
+        return total
+
+    keep = set()
+    for position, (index, section) in enumerate(candidates):
+        if not section.title or (anchor and section.title.lower() == anchor.lower()):
+            keep.add(index)
+    scored = sorted(
+        ((score(position), index) for position, (index, _) in enumerate(candidates) if index not in keep),
+        reverse=True
+    )
+    for value, index in scored:
+        if len(keep) >= max_sections or value <= 0:
+            break
+        keep.add(index)
+    return [sections[index] for index in sorted(keep)]
+
+
+class WikipediaFetcher:
+    """
+    Fetches Wikipedia articles through the MediaWiki API.
+
+    Thread-safe; a single instance is shared by default (see get_wikipedia_fetcher).
+    With a local store, articles in the store's language are read from it first
+    and the API is only used for articles the store does not have.
+
+    Attributes:
+        max_sections (int): Sections returned per article when a query is given
+        ttl (float): Seconds a cached article stays valid
+    """
+
+    API_URL = "https://{language}.wikipedia.org/w/api.php"
+
+    def __init__(
+        self,
+        user_agent: str = "opendeepsearch (https://github.com/sentient-agi/OpenDeepSearch)",
+        max_sections: int = 6,
+        max_cached_pages: int = 512,
+        ttl: float = 24 * 60 * 60,
+        timeout: float = 10.0,
+        max_workers: int = 8,
+        local_store: Optional["LocalWikipediaStore"] = None,
+        local_only: bool = False
+    ):
+        self.max_sections = max_sections
+        self.max_cached_pages = max_cached_pages
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.local_store = local_store
+        # Never call the API for the store's language, e.g. when running offline
+        self.local_only = local_only
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=max_workers))
+        # (language, title) -> (stored_at, page); requested and resolved titles share an entry,
+        # and missing articles are cached as None
+        self._pages: "OrderedDict[Tuple[str, str], Tuple[float, Optional[WikipediaPage]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, key: Tuple[str, str]) -> Tuple[bool, Optional[WikipediaPage]]:
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is None:
+                return False, None
+            if time.time() - entry[0] > self.ttl:
+                del self._pages[key]
+                return False, None
+            self._pages.move_to_end(key)
+            return True, entry[1]
+
+    def _store(self, keys: List[Tuple[str, str]], page: Optional[WikipediaPage]) -> None:
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                self._pages[key] = (now, page)
+                self._pages.move_to_end(key)
+            while len(self._pages) > self.max_cached_pages:
+                self._pages.popitem(last=False)
+
+    def _query(self, language: str, **params) -> dict:
+        params.update(action="query", format="json", formatversion=2, redirects=1)
+        response = self.session.get(self.API_URL.format(language=language), params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get("query", {})
+
+    def resolve_titles(self, language: str, titles: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Resolve title normalisation and redirects for many titles in batched queries.
+
+        Returns:
+            Mapping of each requested title to its canonical title, or None if
+            the article does not exist
+        """
+        resolved: Dict[str, Optional[str]] = {}
+        for start in range(0, len(titles), _TITLES_PER_QUERY):
+            batch = titles[start:start + _TITLES_PER_QUERY]
+            result = self._query(language, titles="|".join(batch))
+            mapping = {item["from"]: item["to"] for item in result.get("normalized", [])}
+            redirects = {item["from"]: item["to"] for item in result.get("redirects", [])}
+            existing = {page["title"] for page in result.get("pages", []) if not page.get("missing") and not page.get("invalid")}
+            for title in batch:
+                target = mapping.get(title, title)
+                target = redirects.get(target, target)
+                resolved[title] = target if target in existing else None
+        return resolved
+
+    def _fetch_page(self, language: str, title: str) -> Optional[WikipediaPage]:
+        result = self._query(language, titles=title, prop="extracts", explaintext=1, exsectionformat="wiki")
+        pages = result.get("pages", [])
+        if not pages or pages[0].get("missing") or not pages[0].get("extract"):
+            return None
+        return WikipediaPage(language=language, title=pages[0]["title"], sections=split_sections(pages[0]["extract"]))
+
+    def fetch_many(self, urls: List[str]) -> Dict[str, Optional[WikipediaPage]]:
+        """
+        Fetch the articles behind many Wikipedia URLs.
+
+        Cached articles are returned directly; the rest are resolved in one batched
+        title query per language and their extracts downloaded concurrently.
+
+        Returns:
+            Mapping of each URL to its article, or None if it could not be fetched
+        """
+        requested: Dict[str, Tuple[str, str]] = {}
+        missing: Dict[str, List[str]] = {}
+        for url in urls:
+            parsed = parse_wikipedia_url(url)
+            if parsed is None:
+                continue
+            language, title, _ = parsed
+            requested[url] = (language, title)
+            found, _ = self._cached((language, title))
+            if found:
+                continue
+            if self.local_store is not None and language == self.local_store.language:
+                page = self.local_store.get_page(title)
+                if page is not None or self.local_only:
+                    self._store([(language, title)], page)
+                    continue
+            if title not in missing.setdefault(language, []):
+                missing[language].append(title)
+
+        to_fetch: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        for language, titles in missing.items():
+            if not titles:
+                continue
+            try:
+                resolved = self.resolve_titles(language, titles)
+            except Exception as e:
+                print(f"Error resolving Wikipedia titles: {e}")
+                continue
+            for title, target in resolved.items():
+                if target is None:
+                    self._store([(language, title)], None)
+                    continue
+                found, page = self._cached((language, target))
+                if found:
+                    self._store([(language, title)], page)
+                else:
+                    to_fetch.setdefault((language, target), []).append((language, title))
+
+        if to_fetch:
+            def fetch(key: Tuple[str, str]) -> None:
+                try:
+                    page = self._fetch_page(*key)
+                except Exception as e:
+                    print(f"Error fetching Wikipedia article {key[1]}: {e}")
+                    return
+                self._store([key] + to_fetch[key], page)
+
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(to_fetch))) as executor:
+                list(executor.map(fetch, to_fetch))
+
+        return {url: self._cached(key)[1] for url, key in requested.items()}
+
+    def fetch(self, url: str) -> Optional[WikipediaPage]:
+        """Fetch the article behind a Wikipedia URL"""
+        return self.fetch_many([url]).get(url)
+
+    def get_content(self, url: str, query: Optional[str] = None, max_sections: Optional[int] = None) -> Optional[str]:
+        """
+        Get the text of a Wikipedia article, restricted to the sections relevant to a query.
+
+        Args:
+            url: Wikipedia article URL
+            query: Search query used to rank sections; the whole article is returned without one
+            max_sections: Overrides the fetcher's max_sections
+
+        Returns:
+            Article text with section headings, or None if the article could not be fetched
+        """
+        page = self.fetch(url)
+        if page is None:
+            return None
+        _, _, anchor = parse_wikipedia_url(url)
+        if not query and not anchor:
+            return page.text
+        sections = rank_sections(page.sections, query or "", max_sections or self.max_sections, anchor)
+        return render_sections(sections)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+
+    def close(self) -> None:
+        """Close the pooled HTTP session and the local store"""
+        self.session.close()
+        if self.local_store is not None:
+            self.local_store.close()
+
+
+_fetcher: Optional[WikipediaFetcher] = None
+_fetcher_lock = threading.Lock()
+
+
+def get_wikipedia_fetcher() -> WikipediaFetcher:
+    """
+    Return the process-wide WikipediaFetcher, creating it on first use.
+
+    If the WIKIPEDIA_STORE_PATH environment variable names a store built with
+    wikipedia_store, articles are read from it before falling back to the API
+    (or never, if WIKIPEDIA_LOCAL_ONLY is set to "1" or "true").
+    """
+    global _fetcher
+    if _fetcher is None:
+        with _fetcher_lock:
+            if _fetcher is None:
+                local_store = None
+                store_path = os.getenv("WIKIPEDIA_STORE_PATH")
+                if store_path:
+                    from opendeepsearch.context_scraping.wikipedia_store import LocalWikipediaStore
+                    local_store = LocalWikipediaStore(store_path)
+                _fetcher = WikipediaFetcher(
+                    local_store=local_store,
+                    local_only=os.getenv("WIKIPEDIA_LOCAL_ONLY", "").lower() in ("1", "true")
+                )
+    return _fetcher
+
+
+def close_wikipedia_fetcher() -> None:
+    """Close the process-wide WikipediaFetcher, if one was created; the next call creates a new one."""
+    global _fetcher
+    with _fetcher_lock:
+        fetcher, _fetcher = _fetcher, None
+    if fetcher is not None:
+        fetcher.close()
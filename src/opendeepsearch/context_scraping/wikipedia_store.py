@@ -0,0 +1,320 @@
+"""
+Offline Wikipedia store built from a MediaWiki XML dump.
+
+A dump (e.g. enwiki-latest-pages-articles.xml.bz2) is streamed once and each
+article is converted to plain-text sections, compressed and appended to a
+data file. An SQLite index maps titles and redirects to byte ranges in that
+file, which is memory-mapped at lookup time, so an article is resolved with
+one indexed query and one decompression and no network access.
+
+Build a store:
+    python -m opendeepsearch.context_scraping.wikipedia_store build \\
+        enwiki-latest-pages-articles.xml.bz2 ./wikipedia-en --language en
+
+Look up an article:
+    python -m opendeepsearch.context_scraping.wikipedia_store lookup ./wikipedia-en "Albert Einstein"
+"""
+
+import argparse
+import bz2
+import gzip
+import json
+import mmap
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from opendeepsearch.context_scraping.wikipedia import WikipediaPage, WikipediaSection, split_sections
+
+DATA_FILE = "sections.bin"
+INDEX_FILE = "index.sqlite"
+
+_COMMENT_PATTERN = re.compile(r"<!--.*?-->", re.DOTALL)
+_REF_PATTERN = re.compile(r"<ref[^>]*/>|<ref[^>]*>.*?</ref\s*>", re.DOTALL | re.IGNORECASE)
+_BLOCK_TAG_PATTERN = re.compile(
+    r"<(gallery|math|timeline|score|syntaxhighlight|source|imagemap|mapframe)\b[^>]*>.*?</\1\s*>",
+    re.DOTALL | re.IGNORECASE
+)
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+_TEMPLATE_PATTERN = re.compile(r"\{\{[^{}]*\}\}")
+_TABLE_PATTERN = re.compile(r"\{\|.*?\|\}", re.DOTALL)
+_FILE_LINK_PATTERN = re.compile(r"\[\[(?:File|Image|Category|[a-z]{2,3}(?:-[a-z]+)?):[^\[\]]*(?:\[\[[^\[\]]*\]\][^\[\]]*)*\]\]", re.IGNORECASE)
+_INTERNAL_LINK_PATTERN = re.compile(r"\[\[(?:[^|\[\]]*\|)?([^\[\]]*)\]\]")
+_EXTERNAL_LINK_PATTERN = re.compile(r"\[(?:https?:)?//[^\s\]]+\s*([^\]]*)\]")
+_EMPHASIS_PATTERN = re.compile(r"'{2,}")
+_MAGIC_WORD_PATTERN = re.compile(r"__[A-Z]+__")
+_LIST_MARKER_PATTERN = re.compile(r"^[*#:;]+\s*", re.MULTILINE)
+_BLANK_LINES_PATTERN = re.compile(r"\n\s*\n\s*(\n\s*)+")
+
+
+def normalize_title(title: str) -> str:
+    """Normalise a title the way MediaWiki does: spaces for underscores, first letter upper case"""
+    title = re.sub(r"[\s_]+", " ", title).strip()
+    return title[:1].upper() + title[1:]
+
+
+def wikitext_to_text(wikitext: str) -> str:
+    """
+    Convert wikitext to plain text, keeping "== Heading ==" lines.
+
+    Templates, tables, references, files and categories are dropped and links
+    are replaced by their label. This is a fast approximation of rendering,
+    good enough for retrieval.
+    """
+    text = _COMMENT_PATTERN.sub("", wikitext)
+    text = _REF_PATTERN.sub("", text)
+    text = _BLOCK_TAG_PATTERN.sub("", text)
+    # Templates nest; remove the innermost ones until none are left
+    for _ in range(10):
+        text, count = _TEMPLATE_PATTERN.subn("", text)
+        if not count:
+            break
+    text = _TABLE_PATTERN.sub("", text)
+    text = _FILE_LINK_PATTERN.sub("", text)
+    text = _INTERNAL_LINK_PATTERN.sub(r"\1", text)
+    text = _EXTERNAL_LINK_PATTERN.sub(r"\1", text)
+    text = _TAG_PATTERN.sub("", text)
+    text = _EMPHASIS_PATTERN.sub("", text)
+    text = _MAGIC_WORD_PATTERN.sub("", text)
+    text = _LIST_MARKER_PATTERN.sub("", text)
+    return _BLANK_LINES_PATTERN.sub("\n\n", text).strip()
+
+
+def _open_dump(path: str):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_dump_pages(path: str) -> Iterator[Tuple[str, Optional[str], str]]:
+    """
+    Stream the main-namespace pages of a MediaWiki XML dump.
+
+    Yields:
+        (title, redirect_target, wikitext); redirect_target is None for articles
+    """
+    with _open_dump(path) as dump:
+        context = ElementTree.iterparse(dump, events=("start", "end"))
+        _, root = next(context)
+        for event, element in context:
+            if event != "end" or not element.tag.endswith("}page"):
+                continue
+            namespace = "{" + element.tag[1:].split("}", 1)[0] + "}"
+            if element.findtext(f"{namespace}ns") == "0":
+                redirect = element.find(f"{namespace}redirect")
+                yield (
+                    element.findtext(f"{namespace}title") or "",
+                    redirect.get("title") if redirect is not None else None,
+                    element.findtext(f"{namespace}revision/{namespace}text") or ""
+                )
+            # Drop parsed pages so memory stays flat over a multi-gigabyte dump
+            root.clear()
+
+
+class LocalWikipediaStore:
+    """
+    Read-only, memory-mapped store of Wikipedia articles split into sections.
+
+    Thread-safe for lookups.
+
+    Attributes:
+        path (str): Store directory
+        language (str): Wikipedia language code of the dump
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Directory created by LocalWikipediaStore.build
+        """
+        self.path = path
+        self._db = sqlite3.connect(f"file:{os.path.join(path, INDEX_FILE)}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        meta = dict(self._db.execute("SELECT key, value FROM meta").fetchall())
+        self.language = meta.get("language", "en")
+        self._file = open(os.path.join(path, DATA_FILE), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    @classmethod
+    def build(
+        cls,
+        dump_path: str,
+        path: str,
+        language: str = "en",
+        limit: Optional[int] = None,
+        min_chars: int = 200,
+        batch_size: int = 1000
+    ) -> "LocalWikipediaStore":
+        """
+        Ingest a MediaWiki XML dump into a new store.
+
+        Args:
+            dump_path: Dump file (.xml, .xml.bz2 or .xml.gz)
+            path: Output directory; an existing store there is replaced
+            language: Wikipedia language code of the dump
+            limit: Stop after this many articles
+            min_chars: Skip articles (stubs, disambiguation leftovers) with less text
+            batch_size: Articles written per index transaction
+
+        Returns:
+            The opened store
+        """
+        os.makedirs(path, exist_ok=True)
+        index_path = os.path.join(path, INDEX_FILE)
+        for name in (INDEX_FILE, DATA_FILE):
+            if os.path.exists(os.path.join(path, name)):
+                os.remove(os.path.join(path, name))
+
+        db = sqlite3.connect(index_path)
+        db.execute("PRAGMA journal_mode=OFF")
+        db.execute("PRAGMA synchronous=OFF")
+        db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        db.execute("CREATE TABLE pages (title TEXT PRIMARY KEY, offset INTEGER NOT NULL, length INTEGER NOT NULL, sections INTEGER NOT NULL)")
+        db.execute("CREATE TABLE redirects (title TEXT PRIMARY KEY, target TEXT NOT NULL)")
+
+        start = time.time()
+        articles = redirects = 0
+        page_rows, redirect_rows = [], []
+        with open(os.path.join(path, DATA_FILE), "wb") as data:
+            for title, target, wikitext in iter_dump_pages(dump_path):
+                title = normalize_title(title)
+                if target is not None:
+                    redirect_rows.append((title, normalize_title(target.split("#", 1)[0])))
+                    redirects += 1
+                else:
+                    sections = split_sections(wikitext_to_text(wikitext))
+                    if sum(len(section.text) for section in sections) < min_chars:
+                        continue
+                    blob = zlib.compress(json.dumps(
+                        [[section.title, section.level, section.text] for section in sections],
+                        ensure_ascii=False
+                    ).encode("utf-8"))
+                    page_rows.append((title, data.tell(), len(blob), len(sections)))
+                    data.write(blob)
+                    articles += 1
+
+                if len(page_rows) + len(redirect_rows) >= batch_size:
+                    db.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)", page_rows)
+                    db.executemany("INSERT OR REPLACE INTO redirects VALUES (?, ?)", redirect_rows)
+                    db.commit()
+                    page_rows, redirect_rows = [], []
+                    print(f"Ingested {articles} articles and {redirects} redirects ({time.time() - start:.0f}s)")
+                if limit is not None and articles >= limit:
+                    break
+
+        db.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)", page_rows)
+        db.executemany("INSERT OR REPLACE INTO redirects VALUES (?, ?)", redirect_rows)
+        db.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("language", language),
+            ("dump", os.path.basename(dump_path)),
+            ("articles", str(articles)),
+            ("redirects", str(redirects)),
+            ("created_at", str(int(time.time()))),
+        ])
+        db.commit()
+        db.close()
+        print(f"Built Wikipedia store with {articles} articles and {redirects} redirects in {time.time() - start:.0f}s")
+        return cls(path)
+
+    def resolve(self, title: str, max_hops: int = 3) -> Optional[Tuple[str, int, int]]:
+        """
+        Resolve a title, following redirects.
+
+        Returns:
+            (canonical_title, offset, length) of the article, or None if it is not in the store
+        """
+        title = normalize_title(title)
+        with self._lock:
+            for _ in range(max_hops + 1):
+                row = self._db.execute("SELECT offset, length FROM pages WHERE title = ?", (title,)).fetchone()
+                if row is not None:
+                    return title, row[0], row[1]
+                redirect = self._db.execute("SELECT target FROM redirects WHERE title = ?", (title,)).fetchone()
+                if redirect is None:
+                    return None
+                title = redirect[0]
+        return None
+
+    def get_page(self, title: str) -> Optional[WikipediaPage]:
+        """Return an article by title or redirect, or None if it is not in the store"""
+        resolved = self.resolve(title)
+        if resolved is None:
+            return None
+        canonical, offset, length = resolved
+        records = json.loads(zlib.decompress(self._data[offset:offset + length]))
+        return WikipediaPage(
+            language=self.language,
+            title=canonical,
+            sections=[WikipediaSection(title, level, text) for title, level, text in records]
+        )
+
+    def iter_pages(self) -> Iterator[WikipediaPage]:
+        """Iterate over all articles in the order they were ingested"""
+        with self._lock:
+            titles = [row[0] for row in self._db.execute("SELECT title FROM pages ORDER BY offset")]
+        for title in titles:
+            page = self.get_page(title)
+            if page is not None:
+                yield page
+
+    def __contains__(self, title: str) -> bool:
+        return self.resolve(title) is not None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._db.execute("SELECT key, value FROM meta").fetchall())
+
+    def close(self) -> None:
+        with self._lock:
+            if isinstance(self._data, mmap.mmap):
+                self._data.close()
+            self._file.close()
+            self._db.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build or query an offline Wikipedia store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Ingest a MediaWiki XML dump")
+    build.add_argument("dump", help="Dump file (.xml, .xml.bz2 or .xml.gz)")
+    build.add_argument("path", help="Output directory")
+    build.add_argument("--language", default="en", help="Wikipedia language code of the dump")
+    build.add_argument("--limit", type=int, default=None, help="Maximum number of articles")
+    build.add_argument("--min-chars", type=int, default=200, help="Skip articles with less text")
+
+    lookup = commands.add_parser("lookup", help="Print an article from a store")
+    lookup.add_argument("path", help="Store directory")
+    lookup.add_argument("title", help="Article title or redirect")
+    lookup.add_argument("--query", default=None, help="Only print the sections relevant to this query")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        store = LocalWikipediaStore.build(args.dump, args.path, args.language, args.limit, args.min_chars)
+        print(json.dumps(store.stats(), indent=2))
+        store.close()
+        return 0
+
+    from opendeepsearch.context_scraping.wikipedia import rank_sections, render_sections
+
+    store = LocalWikipediaStore(args.path)
+    page = store.get_page(args.title)
+    store.close()
+    if page is None:
+        print(f"Not found: {args.title}")
+        return 1
+    sections = rank_sections(page.sections, args.query, 6) if args.query else page.sections
+    print(f"# {page.title}\n\n{render_sections(sections)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,49 @@
+"""
+Deadline shared across the stages of a search so the whole request fits a latency budget.
+"""
+
+import time
+from typing import Optional
+
+
+class Deadline:
+    """
+    A point in time by which work must be finished.
+
+    Stages receive the deadline (or a share of it) and use ``remaining()`` as their
+    timeout, degrading gracefully when little time is left instead of overrunning.
+    """
+
+    def __init__(self, expires_at: float):
+        """
+        Args:
+            expires_at: Expiry time on the ``time.monotonic()`` clock
+        """
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: Optional[float]) -> Optional["Deadline"]:
+        """Create a deadline ``seconds`` from now, or None for no time limit."""
+        if seconds is None:
+            return None
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def share(self, fraction: float) -> "Deadline":
+        """A sub-deadline that leaves ``1 - fraction`` of the remaining time for later stages."""
+        return Deadline(time.monotonic() + self.remaining() * fraction)
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.3f}s)"
+
+
+def remaining_time(deadline: Optional[Deadline]) -> Optional[float]:
+    """Remaining seconds of an optional deadline, usable directly as a timeout."""
+    return None if deadline is None else deadline.remaining()
@@ -0,0 +1,104 @@
+"""
+Shared background event loop for calling the async API from synchronous code.
+
+Synchronous callers (smolagents tools run in thread pools, scripts, notebooks)
+submit coroutines to a single loop running in a daemon thread instead of each
+creating and driving their own loop. One process can then serve many
+concurrent calls on one loop, sharing connection pools and caches, while each
+caller thread only waits on a future.
+"""
+
+import asyncio
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Optional
+
+
+class BackgroundLoop:
+    """
+    An asyncio event loop running forever in a daemon thread.
+
+    Blocking work offloaded with ``asyncio.to_thread`` runs on a dedicated
+    executor of ``max_workers`` threads, sized for many concurrent searches
+    rather than the CPU-bound default.
+    """
+
+    def __init__(self, max_workers: int = 64):
+        self.max_workers = max_workers
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The running loop, started on first use."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._start()
+            return self._loop
+
+    def _start(self) -> None:
+        started = threading.Event()
+        loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ods-worker")
+        loop.set_default_executor(self._executor)
+
+        def run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.call_soon(started.set)
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="ods-event-loop", daemon=True)
+        self._thread.start()
+        started.wait()
+        self._loop = loop
+
+    def run(self, coroutine: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the background loop and wait for its result.
+
+        Safe to call from any number of threads at once, including threads that
+        are running their own event loop (e.g. Jupyter).
+
+        Args:
+            coroutine: The coroutine to run
+            timeout: Seconds to wait before cancelling the coroutine; None waits forever
+
+        Raises:
+            RuntimeError: If called from the background loop's own thread, which would deadlock
+            TimeoutError: If the coroutine does not finish within ``timeout``
+        """
+        loop = self.loop
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Cannot block on the background loop from inside it; await the coroutine instead")
+        future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stop(self) -> None:
+        """Stop the loop and its worker threads."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        if not loop.is_running():
+            loop.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+_background_loop = BackgroundLoop()
+atexit.register(_background_loop.stop)
+
+
+def run_sync(coroutine: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the shared background loop from synchronous code."""
+    return _background_loop.run(coroutine, timeout)
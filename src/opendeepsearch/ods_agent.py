@@ -1,63 +1,145 @@
-from typing import Optional, Dict, Any, Literal
-from opendeepsearch.serp_search.serp_search import create_search_api, SearchAPI
-from opendeepsearch.context_building.process_sources_pro import SourceProcessor
-from opendeepsearch.context_building.build_context import build_context
-from litellm import completion, utils
-from dotenv import load_dotenv
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Literal, AsyncIterator, Tuple
+from opendeepsearch.serp_search.serp_search import create_search_api, SearchAPI, SearchResult
+from opendeepsearch.context_building.process_sources_pro import ProcessingReport, SourceProcessor
+from opendeepsearch.context_building.build_context import (
+    build_context,
+    build_budgeted_context,
+    has_confident_serp_answer
+)
 import os
 from opendeepsearch.prompts import SEARCH_SYSTEM_PROMPT
+from opendeepsearch.deadline import Deadline, remaining_time
+from opendeepsearch.event_loop import run_sync
+from opendeepsearch.caching import AnswerCache, ContextCache, normalize_query
+import hashlib
+import json
 import asyncio
-import nest_asyncio
-load_dotenv()
+from collections import Counter
+
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    # python-dotenv only adds .env support; the process environment is used as is
+    pass
+else:
+    load_dotenv()
+
+@dataclass
+class AnswerRevision:
+    """One answer emitted by OpenDeepSearchAgent.ask_progressive."""
+    answer: str
+    stage: Literal["draft", "final"]
+    context: str
 
 class OpenDeepSearchAgent:
     def __init__(
         self,
         model: Optional[str] = None, #We use LiteLLM to call the model
         system_prompt: Optional[str] = SEARCH_SYSTEM_PROMPT,
-        search_provider: Literal["serper", "searxng"] = "serper",
+        search_provider: Literal["serper", "searxng", "local"] = "serper",
         serper_api_key: Optional[str] = None,
         searxng_instance_url: Optional[str] = None,
         searxng_api_key: Optional[str] = None,
+        local_index_path: Optional[str] = None,
         source_processor_config: Optional[Dict[str, Any]] = None,
         temperature: float = 0.2, # Slight variation while maintaining reliability
         top_p: float = 0.3, # Focus on high-confidence tokens
         reranker: Optional[str] = "None", # Optional reranker identifier
+        context_token_budget: Optional[int] = None, # Optional cap on context tokens
+        serp_fast_path: bool = False, # Answer from SERP structured data when it suffices
+        retrieval_time_share: float = 0.6, # Share of a time budget spent before the LLM call
+        answer_cache_config: Optional[Dict[str, Any]] = None, # Enables the answer cache
+        context_cache_config: Optional[Dict[str, Any]] = None, # Enables the retrieval cache
+        search_api: Optional[SearchAPI] = None, # Prebuilt search client
+        source_processor: Optional[SourceProcessor] = None, # Prebuilt source processor
     ):
         """
         Initialize an OpenDeepSearch agent that combines web search, content processing, and LLM capabilities.
 
-        This agent performs web searches using either SerperAPI or SearXNG, processes the search results to extract
+        This agent performs web searches using SerperAPI, SearXNG or a local index, processes the search results to extract
         relevant information, and uses a language model to generate responses based on the gathered context.
 
         Args:
             model (str): The identifier for the language model to use (compatible with LiteLLM).
             system_prompt (str, optional): Custom system prompt for the language model. If not provided,
                 uses a default prompt that instructs the model to answer based on context.
-            search_provider (str, optional): The search provider to use ('serper' or 'searxng'). Default is 'serper'.
+            search_provider (str, optional): The search provider to use ('serper', 'searxng' or 'local').
+                Default is 'serper'.
             serper_api_key (str, optional): API key for SerperAPI. Required if search_provider is 'serper' and
                 SERPER_API_KEY environment variable is not set.
             searxng_instance_url (str, optional): URL of the SearXNG instance. Required if search_provider is 'searxng'
                 and SEARXNG_INSTANCE_URL environment variable is not set.
             searxng_api_key (str, optional): API key for SearXNG instance. Optional even if search_provider is 'searxng'.
+            local_index_path (str, optional): Path of a local BM25 index built with serp_search.local_index.
+                Required if search_provider is 'local' and LOCAL_SEARCH_INDEX environment variable is not set.
             source_processor_config (Dict[str, Any], optional): Configuration dictionary for the
                 SourceProcessor. Supports the following options:
                 - strategies (List[str]): Content extraction strategies to use
                 - filter_content (bool): Whether to enable content filtering
                 - top_results (int): Number of top results to process
+                - chunk_unit (str): Measure chunks in "characters" (default) or in
+                  reranker model "tokens"
+                - chunk_size / chunk_overlap (int): Chunk size and overlap in chunk_unit
+                - dedup_chunks (bool): Drop exact and near-duplicate chunks across sources
+                  before reranking (default True)
+                - reranker_config (Dict[str, Any]): Keyword arguments for the reranker,
+                  e.g. scoring_backend or embedding_profile
+                  ({"dimensions": 512, "precision": "int8"})
+                - cross_encoder (str): "infinity" or "local" to re-score the top
+                  cross_encoder_candidates chunks with a cross-encoder
+                - selection (str): "topk" (default) or "mmr" to pick diverse chunks;
+                  mmr_lambda sets the relevance/diversity trade-off
+                - merge_adjacent (bool): Merge selected neighbouring chunks into passages
+                - fetch_mode (str): "browser" (default) or "http" to stream raw HTML
+                  without a browser page load
+                - fetch_limits (Dict[str, Any]): Per-page max_bytes, max_seconds and
+                  allowed_content_types
+                - extract_documents (bool): Extract text from PDF, plain text and JSON
+                  results in a process pool (default True); max_document_pages caps
+                  the PDF pages read
+                - wikipedia_store (str): Directory of an offline Wikipedia store to read
+                  articles from before calling the Wikipedia API
             temperature (float, default=0.2): Controls randomness in model outputs. Lower values make
                 the output more focused and deterministic.
             top_p (float, default=0.3): Controls nucleus sampling for model outputs. Lower values make
                 the output more focused on high-probability tokens.
             reranker (str, optional): Identifier for the reranker to use. If not provided,
                 uses the default reranker from SourceProcessor.
+            context_token_budget (int, optional): Maximum number of tokens (counted with the
+                model's tokenizer) for the context sent to the LLM. Content is admitted by
+                source rank and relevance and cut at chunk boundaries. No limit if None.
+            serp_fast_path (bool, default=False): When the SERP answer box or a knowledge graph
+                attribute the query asks for answers it, build the context from SERP data
+                alone and skip scraping and reranking. Off by default, since a shallow SERP
+                answer can miss nuance that the scraped sources would provide.
+            retrieval_time_share (float, default=0.6): When ask() is given a time_budget, the
+                fraction of it available to search, scraping and reranking. The rest is
+                reserved for the LLM call.
+            answer_cache_config (Dict[str, Any], optional): Enables caching of final answers
+                when given (use {} for the defaults). Keyword arguments for AnswerCache, e.g.
+                max_entries, ttls ({"news": 900, "default": 21600, "evergreen": 604800}),
+                semantic and similarity_threshold. Paraphrases are matched with the
+                reranker's query embeddings. Hit and miss counts are in answer_cache.stats.
+            context_cache_config (Dict[str, Any], optional): Enables caching of retrieval
+                results (processed sources and built context) when given. Keyword arguments
+                for ContextCache, e.g. max_entries, ttls and path (an SQLite file that keeps
+                entries across restarts). Asking the same query with a different model or
+                prompt then skips search, scraping and reranking.
+            search_api (SearchAPI, optional): Search client to use instead of building one
+                from search_provider and its credentials, e.g. to share a client.
+            source_processor (SourceProcessor, optional): Source processor to use instead of
+                building one from source_processor_config, e.g. to share its scraper and
+                reranker. source_processor_config should still describe it, since it is
+                part of the retrieval cache key.
         """
         # Initialize search API based on provider
-        self.serp_search = create_search_api(
+        self.serp_search = search_api or create_search_api(
             search_provider=search_provider,
             serper_api_key=serper_api_key,
             searxng_instance_url=searxng_instance_url,
-            searxng_api_key=searxng_api_key
+            searxng_api_key=searxng_api_key,
+            local_index_path=local_index_path
         )
 
         # Update source_processor_config with reranker if provided
@@ -67,26 +149,42 @@ class OpenDeepSearchAgent:
             source_processor_config['reranker'] = reranker
 
         # Initialize SourceProcessor with provided config or defaults
-        print(f"Creating SourceProcessor with config: {source_processor_config}")
-        self.source_processor = SourceProcessor(**source_processor_config)
-        print(f"SourceProcessor initialized successfully")
+        self.source_processor_config = source_processor_config
+        if source_processor is not None:
+            self.source_processor = source_processor
+        else:
+            print(f"Creating SourceProcessor with config: {source_processor_config}")
+            self.source_processor = SourceProcessor(**source_processor_config)
+            print(f"SourceProcessor initialized successfully")
 
         # Initialize LLM settings
         self.model = model if model is not None else os.getenv("LITELLM_SEARCH_MODEL_ID", os.getenv("LITELLM_MODEL_ID", "openrouter/google/gemini-2.0-flash-001"))
         self.temperature = temperature
         self.top_p = top_p
         self.system_prompt = system_prompt
+        self.context_token_budget = context_token_budget
+        self.serp_fast_path = serp_fast_path
+        self.retrieval_time_share = retrieval_time_share
+
+        self.answer_cache = None
+        if answer_cache_config is not None:
+            answer_cache_config = dict(answer_cache_config)
+            answer_cache_config.setdefault("embed", self._embed_query)
+            self.answer_cache = AnswerCache(**answer_cache_config)
+        self.context_cache = ContextCache(**context_cache_config) if context_cache_config is not None else None
 
         # Configure LiteLLM with OpenAI base URL if provided
         openai_base_url = os.environ.get("OPENAI_BASE_URL")
         if openai_base_url:
+            from litellm import utils
             utils.set_provider_config("openai", {"base_url": openai_base_url})
 
     async def search_and_build_context(
         self,
         query: str,
         max_sources: int = 2,
-        pro_mode: bool = False
+        pro_mode: bool = False,
+        deadline: Optional[Deadline] = None
     ) -> str:
         """
         Performs a web search and builds a context from the search results.
@@ -101,29 +199,162 @@ class OpenDeepSearchAgent:
                 when it's smaller.
             pro_mode (bool, default=False): When enabled, performs a deeper search and more
                 thorough content processing.
+            deadline (Deadline, optional): Time by which the context must be built. Slow
+                stages are cut short and the context degrades to fewer sources or SERP
+                snippets only.
 
         Returns:
             str: A formatted context string built from the processed search results.
         """
+        context, _ = await self._retrieve_context(query, max_sources, pro_mode, deadline)
+        return context
+
+    async def _retrieve_context(
+        self,
+        query: str,
+        max_sources: int,
+        pro_mode: bool,
+        deadline: Optional[Deadline] = None
+    ) -> Tuple[str, bool]:
+        """Build the context as search_and_build_context does; also tell whether the retrieval was complete."""
+        cache_key = self._context_cache_key(query, max_sources, pro_mode)
+        if self.context_cache is not None:
+            cached = await asyncio.to_thread(self.context_cache.get, cache_key)
+            if cached is not None:
+                # Rebuild rather than reuse the cached context, so it fits this agent's model and budget
+                return self._build_context(cached["sources"]), True
+
         # Get sources from SERP
-        sources = self.serp_search.get_sources(query)
+        sources = await self._get_sources(query, deadline)
+
+        # Structured SERP data answers factoid queries without scraping or reranking
+        if self.serp_fast_path and sources.success and has_confident_serp_answer(sources.data, query):
+            print("SERP structured data answers the query, skipping scraping")
+            context = self._build_context(sources.data)
+            complete = await self._cache_context(cache_key, query, sources.data, context, deadline)
+            return context, complete
 
         # Process sources
+        report = ProcessingReport()
         processed_sources = await self.source_processor.process_sources(
             sources,
             max_sources,
             query,
-            pro_mode
+            pro_mode,
+            deadline=deadline,
+            report=report
         )
 
         # Build and return context
-        return build_context(processed_sources)
+        context = self._build_context(processed_sources)
+        complete = sources.success and await self._cache_context(
+            cache_key, query, processed_sources, context, deadline, report.degraded
+        )
+        return context, complete
+
+    def _context_cache_key(self, query: str, max_sources: int, pro_mode: bool) -> str:
+        """
+        Identifies a retrieval: the query and every setting that changes the processed sources.
+
+        The model and token budget are left out; the context is rebuilt from the
+        cached sources for each model, so switching LLMs reuses the retrieval.
+        """
+        settings = {
+            "query": normalize_query(query),
+            "search_provider": type(self.serp_search).__name__,
+            "source_processor": self.source_processor_config,
+            "serp_fast_path": self.serp_fast_path,
+            "max_sources": max_sources,
+            "pro_mode": pro_mode,
+        }
+        # sort_keys keeps the on-disk key independent of dict insertion order
+        encoded = json.dumps(settings, sort_keys=True, default=repr)
+        return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+    async def _cache_context(
+        self,
+        cache_key: str,
+        query: str,
+        sources_data: Any,
+        context: str,
+        deadline: Optional[Deadline] = None,
+        degraded: bool = False
+    ) -> bool:
+        """
+        Store a retrieval result unless it was cut short by the deadline, degraded or failed.
+
+        Returns whether the result was complete, i.e. safe to cache answers built on it.
+        """
+        if degraded or not isinstance(sources_data, dict):
+            return False
+        if deadline is not None and deadline.expired:
+            return False
+        if self.context_cache is not None:
+            await asyncio.to_thread(self.context_cache.put, cache_key, query, sources_data, context)
+        return True
+
+    async def _store_answer(self, query: str, answer: str, namespace: str, complete: bool) -> None:
+        """Cache an answer, unless it was built on an incomplete retrieval."""
+        if self.answer_cache is not None and complete:
+            await asyncio.to_thread(self.answer_cache.store, query, answer, namespace)
+
+    async def _get_sources(self, query: str, deadline: Optional[Deadline] = None) -> SearchResult:
+        """Run the SERP request off the event loop, giving up when the deadline passes."""
+        try:
+            return await asyncio.wait_for(
+                asyncio.to_thread(self.serp_search.get_sources, query),
+                timeout=remaining_time(deadline)
+            )
+        except asyncio.TimeoutError:
+            return SearchResult(error="Search timed out before the deadline")
+
+    def _embed_query(self, query: str):
+        """Unit-length query embedding from the reranker, used for semantic cache matching."""
+        searcher = self.source_processor.semantic_searcher
+        return searcher._unit_vectors(searcher.embed([query]))[0]
+
+    def _cache_namespace(self, max_sources: int, pro_mode: bool) -> str:
+        """Identifies the settings that affect an answer, so caches never mix them."""
+        settings = (
+            self.model,
+            self.system_prompt,
+            self.temperature,
+            self.top_p,
+            self.context_token_budget,
+            self.serp_fast_path,
+            max_sources,
+            pro_mode,
+        )
+        return hashlib.sha1(repr(settings).encode("utf-8")).hexdigest()
+
+    def _build_context(self, sources_data: Dict[str, Any]) -> str:
+        """Build the LLM context, within the token budget if one is configured."""
+        if not isinstance(sources_data, dict):
+            # A timed-out search or failed processing step hands back a SearchResult
+            # instead of SERP data; build the (empty) context without it
+            sources_data = {}
+        if self.context_token_budget is not None:
+            budgeted = build_budgeted_context(
+                sources_data,
+                self.context_token_budget,
+                model=self.model
+            )
+            if budgeted.dropped:
+                kinds = Counter(item["kind"] for item in budgeted.dropped)
+                print(
+                    f"Context budget {budgeted.budget}: used {budgeted.tokens} tokens, dropped "
+                    f"{sum(item['tokens'] for item in budgeted.dropped)} tokens "
+                    f"({', '.join(f'{count} {kind}' for kind, count in sorted(kinds.items()))})"
+                )
+            return budgeted.text
+        return build_context(sources_data)
 
     async def ask(
         self,
         query: str,
         max_sources: int = 2,
         pro_mode: bool = False,
+        time_budget: Optional[float] = None,
     ) -> str:
         """
         Searches for information and generates an AI response to the query.
@@ -137,45 +368,160 @@ class OpenDeepSearchAgent:
             max_sources (int, default=2): Maximum number of sources to include in the context.
             pro_mode (bool, default=False): When enabled, performs a more comprehensive search
                 and analysis of sources.
+            time_budget (float, optional): End-to-end latency budget in seconds. Retrieval
+                gets retrieval_time_share of it and degrades gracefully when it runs out;
+                the LLM call gets the rest.
 
         Returns:
             str: An AI-generated response that answers the query based on the gathered context.
         """
+        deadline = Deadline.after(time_budget)
+        namespace = self._cache_namespace(max_sources, pro_mode)
+        if self.answer_cache is not None:
+            cached = await asyncio.to_thread(self.answer_cache.lookup, query, namespace)
+            if cached is not None:
+                return cached
+
+        retrieval_deadline = deadline.share(self.retrieval_time_share) if deadline else None
         # Get context from search results
-        context = await self.search_and_build_context(query, max_sources, pro_mode)
+        context, complete = await self._retrieve_context(query, max_sources, pro_mode, retrieval_deadline)
+        answer = await self._generate_answer(query, context, deadline)
+
+        await self._store_answer(query, answer, namespace, complete)
+        return answer
+
+    async def _generate_answer(self, query: str, context: str, deadline: Optional[Deadline] = None) -> str:
+        """Answer the query from the given context with the LLM."""
         # Prepare messages for the LLM
         messages = [
             {"role": "system", "content": self.system_prompt},
             {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {query}"}
         ]
         # Get completion from LLM
-        response = completion(
+        # litellm takes seconds to import, so load it with the first LLM call
+        from litellm import acompletion
+        response = await acompletion(
             model=self.model,
             messages=messages,
             temperature=self.temperature,
-            top_p=self.top_p
+            top_p=self.top_p,
+            timeout=remaining_time(deadline)
         )
 
         return response.choices[0].message.content
 
+    async def ask_progressive(
+        self,
+        query: str,
+        max_sources: int = 2,
+        pro_mode: bool = False,
+        time_budget: Optional[float] = None,
+    ) -> AsyncIterator[AnswerRevision]:
+        """
+        Searches for information and yields progressively better answers.
+
+        A draft answer built from the SERP snippets is yielded as soon as the search
+        returns, while the sources are scraped and reranked in the background. A
+        final answer from the enriched context follows once processing is done;
+        if processing added nothing to the context, the draft is yielded again as
+        the final answer without a second LLM call. When the SERP fast path
+        applies, only the final answer is yielded.
+
+        Args:
+            query (str): The question or query to answer.
+            max_sources (int, default=2): Maximum number of sources to include in the context.
+            pro_mode (bool, default=False): When enabled, performs a more comprehensive search
+                and analysis of sources.
+            time_budget (float, optional): Latency budget in seconds for the final answer.
+
+        Yields:
+            AnswerRevision: The "draft" answer, then the "final" answer. A cached answer
+                is yielded directly as the "final" answer with an empty context.
+
+        Example:
+            ```python
+            async for revision in agent.ask_progressive("Who founded Sentient?"):
+                print(revision.stage, revision.answer)
+            ```
+        """
+        deadline = Deadline.after(time_budget)
+        namespace = self._cache_namespace(max_sources, pro_mode)
+        if self.answer_cache is not None:
+            cached = await asyncio.to_thread(self.answer_cache.lookup, query, namespace)
+            if cached is not None:
+                yield AnswerRevision(cached, "final", "")
+                return
+
+        retrieval_deadline = deadline.share(self.retrieval_time_share) if deadline else None
+        cache_key = self._context_cache_key(query, max_sources, pro_mode)
+        if self.context_cache is not None:
+            cached = await asyncio.to_thread(self.context_cache.get, cache_key)
+            if cached is not None:
+                context = self._build_context(cached["sources"])
+                answer = await self._generate_answer(query, context, deadline)
+                await self._store_answer(query, answer, namespace, True)
+                yield AnswerRevision(answer, "final", context)
+                return
+
+        sources = await self._get_sources(query, retrieval_deadline)
+        if not sources.success:
+            context = self._build_context({})
+            yield AnswerRevision(await self._generate_answer(query, context, deadline), "final", context)
+            return
+
+        # Snapshot the snippet-only context before processing adds page content to sources
+        draft_context = self._build_context(sources.data)
+        if self.serp_fast_path and has_confident_serp_answer(sources.data, query):
+            complete = await self._cache_context(cache_key, query, sources.data, draft_context, retrieval_deadline)
+            answer = await self._generate_answer(query, draft_context, deadline)
+            await self._store_answer(query, answer, namespace, complete)
+            yield AnswerRevision(answer, "final", draft_context)
+            return
+
+        report = ProcessingReport()
+        processing = asyncio.ensure_future(
+            self.source_processor.process_sources(
+                sources, max_sources, query, pro_mode, deadline=retrieval_deadline, report=report
+            )
+        )
+        try:
+            draft = await self._generate_answer(query, draft_context, deadline)
+            yield AnswerRevision(draft, "draft", draft_context)
+            processed_sources = await processing
+        finally:
+            if not processing.done():
+                processing.cancel()
+
+        final_context = self._build_context(processed_sources)
+        complete = await self._cache_context(
+            cache_key, query, processed_sources, final_context, retrieval_deadline, report.degraded
+        )
+        if final_context == draft_context:
+            # Processing added nothing (no page scraped or kept); the draft already answers this context
+            answer = draft
+        else:
+            answer = await self._generate_answer(query, final_context, deadline)
+        await self._store_answer(query, answer, namespace, complete)
+        yield AnswerRevision(answer, "final", final_context)
+
+    def close(self) -> None:
+        """Release connection pools and the on-disk context cache."""
+        self.serp_search.close()
+        self.source_processor.close()
+        if self.context_cache is not None:
+            self.context_cache.close()
+
     def ask_sync(
         self,
         query: str,
         max_sources: int = 2,
         pro_mode: bool = False,
+        time_budget: Optional[float] = None,
     ) -> str:
         """
         Synchronous version of ask() method.
+
+        Runs ask() on the shared background event loop, so it is safe to call from
+        many threads at once and from code that already runs an event loop.
         """
-        try:
-            # Try getting the current event loop
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # If we're in a running event loop (e.g., Jupyter), use nest_asyncio
-                nest_asyncio.apply()
-        except RuntimeError:
-            # If there's no event loop, create a new one
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-        return loop.run_until_complete(self.ask(query, max_sources, pro_mode))
+        return run_sync(self.ask(query, max_sources, pro_mode, time_budget))
@@ -1,6 +1,10 @@
+import asyncio
+import threading
+import weakref
 from typing import Optional, Literal
 from smolagents import Tool
-from opendeepsearch.ods_agent import OpenDeepSearchAgent
+from opendeepsearch.registry import get_registry
+from opendeepsearch.event_loop import run_sync
 
 class OpenDeepSearchTool(Tool):
     name = "web_search"
@@ -18,10 +22,12 @@ class OpenDeepSearchTool(Tool):
         self,
         model_name: Optional[str] = None,
         reranker: str = "infinity",
-        search_provider: Literal["serper", "searxng"] = "serper",
+        search_provider: Literal["serper", "searxng", "local"] = "serper",
         serper_api_key: Optional[str] = None,
         searxng_instance_url: Optional[str] = None,
-        searxng_api_key: Optional[str] = None
+        searxng_api_key: Optional[str] = None,
+        local_index_path: Optional[str] = None,
+        time_budget: Optional[float] = None
     ):
         super().__init__()
         self.search_model_name = model_name  # LiteLLM model name
@@ -30,17 +36,44 @@ class OpenDeepSearchTool(Tool):
         self.serper_api_key = serper_api_key
         self.searxng_instance_url = searxng_instance_url
         self.searxng_api_key = searxng_api_key
+        self.local_index_path = local_index_path
+        self.time_budget = time_budget  # Seconds allowed per search, None for no limit
+        self._setup_lock = threading.Lock()
 
     def forward(self, query: str):
-        answer = self.search_tool.ask_sync(query, max_sources=2, pro_mode=True)
-        return answer
+        # Dispatch to the shared event loop instead of driving a loop in this thread
+        return run_sync(self.aforward(query))
+
+    async def aforward(self, query: str):
+        """Async entry point for callers that already run an event loop."""
+        if not self.is_initialized:
+            # Setup blocks on the registry lock and builds clients; keep it off the (shared) loop
+            await asyncio.to_thread(self._setup_once)
+        return await self.search_tool.ask(query, max_sources=2, pro_mode=True, time_budget=self.time_budget)
+
+    def _setup_once(self):
+        """Run setup unless a concurrent call already did."""
+        with self._setup_lock:
+            if not self.is_initialized:
+                self.setup()
+                self.is_initialized = True
 
     def setup(self):
-        self.search_tool = OpenDeepSearchAgent(
-            self.search_model_name,
+        # Tools with the same configuration share one warm agent (connections, caches)
+        self.close()
+        registry = get_registry()
+        self.search_tool = registry.acquire(
+            model=self.search_model_name,
             reranker=self.reranker,
             search_provider=self.search_provider,
             serper_api_key=self.serper_api_key,
             searxng_instance_url=self.searxng_instance_url,
-            searxng_api_key=self.searxng_api_key
+            searxng_api_key=self.searxng_api_key,
+            local_index_path=self.local_index_path
         )
+        self._release = weakref.finalize(self, registry.release, self.search_tool)
+
+    def close(self):
+        """Return the shared agent to the registry."""
+        if getattr(self, "_release", None) is not None:
+            self._release()
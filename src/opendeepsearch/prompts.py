@@ -1,5 +1,3 @@
-from smolagents import PromptTemplates
-
 SEARCH_SYSTEM_PROMPT = """
 You are an AI-powered search agent that takes in a user’s search query, retrieves relevant search results, and provides an accurate and concise answer based on the provided context.
 
@@ -36,7 +34,7 @@ You are an AI-powered search agent that takes in a user’s search query, retrie
 - For controversial topics, present multiple perspectives if they are available and relevant.
 """
 
-REACT_PROMPT = PromptTemplates(system_prompt="""
+_REACT_SYSTEM_PROMPT = """
 You are an expert assistant who can solve any task using tool calls. You will be given a task to solve as best you can.
 To do so, you have been given access to some tools.
 
@@ -585,4 +583,14 @@ If no tool call is needed, use final_answer tool to return your answer.
 4. Never re-do a tool call that you previously did with the exact same parameters.
 
 Now Begin! If you solve the task correctly, you will receive a reward of $1,000,000.
-""")
\ No newline at end of file
+"""
+
+
+def __getattr__(name: str):
+    # smolagents is only needed for the ReAct prompt, so SEARCH_SYSTEM_PROMPT
+    # (and with it the agent) can be imported without it
+    if name == "REACT_PROMPT":
+        from smolagents import PromptTemplates
+        globals()[name] = PromptTemplates(system_prompt=_REACT_SYSTEM_PROMPT)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
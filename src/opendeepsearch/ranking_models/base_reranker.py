@@ -1,6 +1,73 @@
 from abc import ABC, abstractmethod
-import torch
-from typing import List, Dict, Union
+from dataclasses import dataclass
+from typing import Any, List, Dict, Literal, Optional, Tuple, Union
+
+import numpy as np
+
+from opendeepsearch.deadline import Deadline
+from .cross_encoder import BaseCrossEncoder
+
+_INT8_SCALE = 127.0
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+@dataclass
+class EmbeddingProfile:
+    """
+    Post-processing applied to every embedding before it is scored or cached.
+
+    Attributes:
+        dimensions: Keep only the first ``dimensions`` components (Matryoshka
+            truncation). None keeps the full vector.
+        precision: Storage precision of the vectors:
+            - "float32": Unchanged (default)
+            - "float16": Half precision
+            - "int8": Symmetric int8 quantization of the unit vector
+            - "binary": Sign bits packed 8 per byte, scored by Hamming similarity
+        renormalize: L2-normalize after truncation. Always applied for "int8"
+            and "binary", which assume unit vectors.
+    """
+    dimensions: Optional[int] = None
+    precision: Literal["float32", "float16", "int8", "binary"] = "float32"
+    renormalize: bool = True
+
+    @classmethod
+    def coerce(cls, value: Union["EmbeddingProfile", Dict[str, Any], None]) -> Optional["EmbeddingProfile"]:
+        """Build a profile from a config dict, passing profiles and None through."""
+        if value is None or isinstance(value, cls):
+            return value
+        return cls(**value)
+
+    def apply(self, embeddings: np.ndarray) -> np.ndarray:
+        """Truncate, re-normalize and quantize a (num_texts, dim) float array."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.dimensions is not None:
+            embeddings = embeddings[:, :self.dimensions]
+
+        if self.renormalize or self.precision in ("int8", "binary"):
+            norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+
+        if self.precision == "float32":
+            return np.ascontiguousarray(embeddings)
+        if self.precision == "float16":
+            return embeddings.astype(np.float16)
+        if self.precision == "int8":
+            return np.clip(np.rint(embeddings * _INT8_SCALE), -127, 127).astype(np.int8)
+        if self.precision == "binary":
+            return np.packbits(embeddings > 0, axis=-1)
+        raise ValueError(f"Unknown embedding precision: {self.precision}")
+
+
+def _hamming_similarity(query_bits: np.ndarray, doc_bits: np.ndarray, dimensions: int) -> np.ndarray:
+    """Similarity in [-1, 1] between packed sign vectors: 1 - 2 * hamming / dimensions."""
+    xor = np.bitwise_xor(query_bits[:, None, :], doc_bits[None, :, :])
+    if hasattr(np, "bitwise_count"):
+        distances = np.bitwise_count(xor).sum(axis=-1, dtype=np.int32)
+    else:
+        distances = _POPCOUNT_TABLE[xor].sum(axis=-1, dtype=np.int32)
+    return (1.0 - 2.0 * distances / dimensions).astype(np.float32)
+
 
 class BaseSemanticSearcher(ABC):
     """
@@ -9,27 +76,162 @@ class BaseSemanticSearcher(ABC):
     This class defines the interface that all semantic searchers must implement.
     Subclasses should implement the _get_embeddings method according to their
     specific embedding source.
+
+    Subclasses may set ``tokenizer_name`` to the Hugging Face tokenizer matching
+    their embedding model so that chunks can be sized in model tokens.
+
+    Scoring runs on NumPy by default. Set ``scoring_backend = "torch"`` to score
+    with torch instead; torch is only imported when that backend is used.
+    Set ``normalize_embeddings = True`` to L2-normalize vectors before scoring,
+    which turns the dot product into cosine similarity.
+
+    An optional ``embedding_profile`` truncates and quantizes every vector
+    returned by ``embed``, so queries, documents and cached vectors share the
+    same dimension and precision.
+
+    When ``cross_encoder`` is set, ``rerank`` takes the top
+    ``cross_encoder_candidates`` bi-encoder hits and re-scores them with the
+    cross-encoder before returning the top_k. Returned scores are then
+    cross-encoder relevance scores.
+
+    ``selection = "mmr"`` replaces plain top-k with Maximal Marginal Relevance so
+    near-identical overlapping chunks are not all selected, and
+    ``merge_adjacent = True`` joins selected neighbouring chunks into passages,
+    dropping the text they share when it is at least ``merge_min_overlap_words``
+    whole words.
     """
+
+    tokenizer_name: Optional[str] = None
+    scoring_backend: Literal["numpy", "torch"] = "numpy"
+    normalize_embeddings: bool = False
+    embedding_profile: Optional[EmbeddingProfile] = None
+    cross_encoder: Optional[BaseCrossEncoder] = None
+    cross_encoder_candidates: int = 20
+    selection: Literal["topk", "mmr"] = "topk"
+    mmr_lambda: float = 0.7
+    mmr_candidate_factor: int = 4
+    merge_adjacent: bool = False
+    merge_min_overlap_words: int = 3
+
+    def close(self) -> None:
+        """Release pooled HTTP connections held by the searcher and its cross-encoder."""
+        for owner in (self, self.cross_encoder):
+            session = getattr(owner, "session", None)
+            if session is not None:
+                session.close()
     
     @abstractmethod
-    def _get_embeddings(self, texts: List[str]) -> torch.Tensor:
+    def _get_embeddings(self, texts: List[str], deadline: Optional[Deadline] = None) -> "np.ndarray":
         """
         Get embeddings for a list of texts.
         
         Args:
             texts: List of text strings to embed
+            deadline: Optional deadline. No new request is sent once it has passed;
+                TimeoutError is raised instead
             
         Returns:
-            torch.Tensor containing the embeddings shape: (num_texts, embedding_dim)
+            Array of shape (num_texts, embedding_dim) containing the embeddings.
+            numpy arrays, torch tensors and nested lists are all accepted.
         """
         pass
 
+    def embed(self, texts: List[str], **kwargs: Any) -> Any:
+        """
+        Embed texts and apply the embedding profile.
+
+        This is the single entry point used for queries, documents and caches.
+
+        Args:
+            texts: List of text strings to embed
+            **kwargs: Extra arguments forwarded to ``_get_embeddings``
+
+        Returns:
+            Array (or tensor) ready for scoring with the configured backend
+        """
+        embeddings = self._get_embeddings(texts, **kwargs)
+        if self.embedding_profile is not None:
+            if hasattr(embeddings, "detach"):
+                embeddings = embeddings.detach().cpu().numpy()
+            embeddings = self.embedding_profile.apply(embeddings)
+        return self._to_backend(embeddings)
+
+    def _to_backend(self, embeddings: Any) -> Any:
+        """Convert embeddings to a float array (or tensor) for the configured backend."""
+        if isinstance(embeddings, np.ndarray) and embeddings.dtype in (np.int8, np.uint8):
+            if self.scoring_backend == "torch":
+                raise ValueError("int8 and binary embedding profiles require the numpy scoring backend")
+            return embeddings
+
+        if self.scoring_backend == "torch":
+            import torch
+            embeddings = torch.as_tensor(embeddings, dtype=torch.float32)
+            if self.normalize_embeddings:
+                embeddings = torch.nn.functional.normalize(embeddings, dim=-1)
+            return embeddings
+        if self.scoring_backend != "numpy":
+            raise ValueError(f"Unknown scoring backend: {self.scoring_backend}")
+
+        if hasattr(embeddings, "detach"):
+            embeddings = embeddings.detach().cpu().numpy()
+        embeddings = np.asarray(embeddings)
+        if embeddings.dtype not in (np.float32, np.float16):
+            embeddings = embeddings.astype(np.float32)
+        if self.normalize_embeddings:
+            norms = np.linalg.norm(embeddings.astype(np.float32, copy=False), axis=-1, keepdims=True)
+            embeddings = (embeddings / np.maximum(norms, 1e-12)).astype(embeddings.dtype, copy=False)
+        return embeddings
+
+    def _similarity(self, query_embeddings: Any, doc_embeddings: Any) -> Any:
+        """Dot-product similarity between query and document embeddings."""
+        if self.scoring_backend == "torch":
+            return query_embeddings @ doc_embeddings.T
+        if query_embeddings.dtype == np.uint8:
+            dimensions = self.embedding_profile.dimensions or query_embeddings.shape[-1] * 8
+            return _hamming_similarity(query_embeddings, doc_embeddings, dimensions)
+        if query_embeddings.dtype == np.int8:
+            scores = query_embeddings.astype(np.float32) @ doc_embeddings.astype(np.float32).T
+            return scores / (_INT8_SCALE * _INT8_SCALE)
+        # float16 storage is upcast so the product runs on the BLAS float32 path
+        return query_embeddings.astype(np.float32, copy=False) @ doc_embeddings.astype(np.float32, copy=False).T
+
+    def _top_k(self, scores: Any, k: int) -> List[Tuple[int, float]]:
+        """Return (index, score) pairs for the k highest scores, best first."""
+        if self.scoring_backend == "torch":
+            import torch
+            top = torch.topk(scores, k, dim=0)
+            return [(idx.item(), score.item()) for score, idx in zip(top.values, top.indices)]
+
+        if k < len(scores):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(idx), float(scores[idx])) for idx in order]
+
+    def _normalize_scores(self, scores: Any, normalize: str) -> Any:
+        """Apply the requested normalization to raw similarity scores."""
+        if normalize == "softmax":
+            if self.scoring_backend == "torch":
+                import torch
+                scores = torch.softmax(scores, dim=-1)
+            else:
+                scores = np.exp(scores - scores.max(axis=-1, keepdims=True))
+                scores /= scores.sum(axis=-1, keepdims=True)
+        elif normalize == "scale":
+            scores = scores * 100
+        elif normalize == "none":
+            pass
+        else:
+            raise ValueError(f"Unknown normalization method: {normalize}")
+        return scores
+
     def calculate_scores(
         self,
         queries: List[str],
         documents: List[str],
         normalize: str = "softmax"  # Options: "softmax", "scale", "none"
-    ) -> torch.Tensor:
+    ) -> "np.ndarray":
         """
         Calculate similarity scores between queries and documents.
         
@@ -42,33 +244,125 @@ class BaseSemanticSearcher(ABC):
                       - "none": No normalization
             
         Returns:
-            torch.Tensor of shape (num_queries, num_documents) containing similarity scores
+            Array of shape (num_queries, num_documents) containing similarity scores
+            (a torch.Tensor when the torch scoring backend is selected)
         """
         # Get embeddings for queries and documents
-        query_embeddings = self._get_embeddings(queries)
-        doc_embeddings = self._get_embeddings(documents)
+        query_embeddings = self.embed(queries)
+        doc_embeddings = self.embed(documents)
         
         # Calculate similarity scores
-        scores = query_embeddings @ doc_embeddings.T
-        
-        # Apply normalization
-        if normalize == "softmax":
-            scores = torch.softmax(scores, dim=-1)
-        elif normalize == "scale":
-            scores = scores * 100
-        elif normalize == "none":
-            pass
+        scores = self._similarity(query_embeddings, doc_embeddings)
+        return self._normalize_scores(scores, normalize)
+
+    def _unit_vectors(self, embeddings: Any) -> np.ndarray:
+        """Float32 unit vectors for any stored precision, used for document-document similarity."""
+        if hasattr(embeddings, "detach"):
+            embeddings = embeddings.detach().cpu().numpy()
+        if embeddings.dtype == np.uint8:
+            bits = np.unpackbits(embeddings, axis=-1, count=self.embedding_profile.dimensions)
+            embeddings = bits.astype(np.float32) * 2 - 1
+        embeddings = embeddings.astype(np.float32, copy=False)
+        norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    def _mmr(
+        self,
+        candidates: List[Tuple[int, float]],
+        query_embedding: Any,
+        doc_embeddings: Any,
+        k: int,
+        mmr_lambda: float,
+        cross_encoded: bool = False
+    ) -> List[Tuple[int, float]]:
+        """
+        Select k candidates by Maximal Marginal Relevance.
+
+        Relevance is the query-document cosine similarity, or the cross-encoder
+        score min-max scaled to [0, 1] when candidates were cross-encoded.
+        Redundancy is the highest cosine similarity to any selected candidate.
+        """
+        if len(candidates) <= 1:
+            return candidates[:k]
+
+        indices = np.array([idx for idx, _ in candidates])
+        vectors = self._unit_vectors(doc_embeddings[indices])
+        if cross_encoded:
+            relevance = np.array([score for _, score in candidates], dtype=np.float32)
+            spread = relevance.max() - relevance.min()
+            relevance = (relevance - relevance.min()) / spread if spread > 0 else np.ones_like(relevance)
         else:
-            raise ValueError(f"Unknown normalization method: {normalize}")
-            
-        return scores
+            relevance = vectors @ self._unit_vectors(query_embedding[None])[0]
+        similarity = vectors @ vectors.T
+
+        selected: List[int] = []
+        redundancy = np.zeros(len(candidates), dtype=np.float32)
+        available = np.ones(len(candidates), dtype=bool)
+        for _ in range(min(k, len(candidates))):
+            mmr = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+            mmr[~available] = -np.inf
+            best = int(np.argmax(mmr))
+            selected.append(best)
+            available[best] = False
+            redundancy = np.maximum(redundancy, similarity[best]) if len(selected) > 1 else similarity[best]
+        return [candidates[i] for i in selected]
+
+    @staticmethod
+    def _join_overlapping(first: str, second: str, min_overlap_words: int = 3) -> str:
+        """Join two consecutive chunks, dropping the text they share through chunk overlap.
+
+        The shared text must be whole words at the end of ``first`` and the start of
+        ``second``, and at least ``min_overlap_words`` of them, so that a coincidental
+        match such as a trailing digit is not mistaken for overlap.
+        """
+        for size in range(min(len(first), len(second)), 0, -1):
+            overlap = second[:size]
+            if not first.endswith(overlap):
+                continue
+            starts_word = size == len(first) or first[-size - 1].isspace()
+            ends_word = size == len(second) or second[size].isspace()
+            if starts_word and ends_word and len(overlap.split()) >= min_overlap_words:
+                return first + second[size:]
+        return first + "\n" + second
+
+    def _merge_adjacent(
+        self,
+        documents: List[str],
+        selected: List[Tuple[int, float]],
+        positions: Optional[List[int]] = None
+    ) -> List[Dict[str, Union[str, float]]]:
+        """Merge selected chunks that are consecutive in their source into passages.
+
+        ``positions`` holds the original position of each document in its source, for
+        documents that are not contiguous any more (e.g. after deduplication); by
+        default documents are taken to be consecutive chunks.
+        """
+        positions = positions if positions is not None else list(range(len(documents)))
+        passages = []
+        for idx, score in sorted(selected, key=lambda item: positions[item[0]]):
+            if passages and passages[-1]["last"] == positions[idx] - 1:
+                passage = passages[-1]
+                passage["document"] = self._join_overlapping(
+                    passage["document"], documents[idx], self.merge_min_overlap_words
+                )
+                passage["score"] = max(passage["score"], score)
+                passage["last"] = positions[idx]
+            else:
+                passages.append({"document": documents[idx], "score": score, "last": positions[idx]})
+        passages.sort(key=lambda passage: passage["score"], reverse=True)
+        return [{"document": p["document"], "score": p["score"]} for p in passages]
 
     def rerank(
         self,
         query: Union[str, List[str]],
         documents: List[str],
         top_k: int = 5,
-        normalize: str = "softmax"
+        normalize: str = "softmax",
+        selection: Optional[Literal["topk", "mmr"]] = None,
+        mmr_lambda: Optional[float] = None,
+        merge_adjacent: Optional[bool] = None,
+        positions: Optional[List[int]] = None,
+        deadline: Optional[Deadline] = None
     ) -> List[Dict[str, Union[str, float]]]:
         """
         Rerank documents based on their semantic similarity to the query.
@@ -78,35 +372,95 @@ class BaseSemanticSearcher(ABC):
             documents: List of documents to rerank
             top_k: Number of top results to return per query
             normalize: Normalization method for scores
+            selection: "topk" for the highest scores or "mmr" for Maximal Marginal
+                Relevance, which trades relevance against redundancy. Defaults to
+                the ``selection`` attribute
+            mmr_lambda: Relevance weight for MMR in [0, 1]; 1 is plain top-k.
+                Defaults to the ``mmr_lambda`` attribute
+            merge_adjacent: Merge selected chunks that are consecutive in
+                ``documents`` into one passage. Defaults to the ``merge_adjacent``
+                attribute
+            positions: Original position of each document among its source's chunks,
+                used by ``merge_adjacent`` when some chunks were removed (e.g. by
+                deduplication). Defaults to consecutive positions
+            deadline: Optional deadline. Embedding stops sending batches once it has
+                passed and TimeoutError is raised, so a caller that gave up does not
+                leave requests running in the background
             
         Returns:
             List of dicts containing reranked documents and their scores.
             For single query: [{"document": str, "score": float}, ...]
             For multiple queries: [[{"document": str, "score": float}, ...], ...]
         """
+        selection = selection or self.selection
+        mmr_lambda = self.mmr_lambda if mmr_lambda is None else mmr_lambda
+        merge_adjacent = self.merge_adjacent if merge_adjacent is None else merge_adjacent
+        if selection not in ("topk", "mmr"):
+            raise ValueError(f"Unknown selection method: {selection}")
+
         queries = [query] if isinstance(query, str) else query
-        scores = self.calculate_scores(queries, documents, normalize=normalize)
+        query_embeddings = self.embed(queries, deadline=deadline)
+        doc_embeddings = self.embed(documents, deadline=deadline)
+        scores = self._normalize_scores(self._similarity(query_embeddings, doc_embeddings), normalize)
+
+        # With a cross-encoder or MMR, the bi-encoder only preselects candidates
+        num_candidates = top_k
+        if self.cross_encoder is not None:
+            num_candidates = max(num_candidates, self.cross_encoder_candidates)
+        if selection == "mmr":
+            num_candidates = max(num_candidates, top_k * self.mmr_candidate_factor)
+        num_candidates = min(num_candidates, len(documents))
         
         results = []
-        for query_scores in scores:
-            top_indices = torch.topk(query_scores, min(top_k, len(documents)), dim=0)
-            query_results = [
-                {
-                    "document": documents[idx.item()],
-                    "score": score.item()
-                }
-                for score, idx in zip(top_indices.values, top_indices.indices)
-            ]
+        for query_index, (query_text, query_scores) in enumerate(zip(queries, scores)):
+            candidates = self._top_k(query_scores, num_candidates)
+            if self.cross_encoder is not None:
+                if deadline is not None and deadline.expired:
+                    raise TimeoutError("Deadline passed before cross-encoding")
+                candidates = self._cross_encode(query_text, documents, candidates)
+            if selection == "mmr":
+                candidates = self._mmr(
+                    candidates,
+                    query_embeddings[query_index],
+                    doc_embeddings,
+                    top_k,
+                    mmr_lambda,
+                    cross_encoded=self.cross_encoder is not None
+                )
+            selected = candidates[:top_k]
+
+            if merge_adjacent:
+                query_results = self._merge_adjacent(documents, selected, positions)
+            else:
+                query_results = [
+                    {
+                        "document": documents[idx],
+                        "score": score
+                    }
+                    for idx, score in selected
+                ]
             results.append(query_results)
         
         return results[0] if isinstance(query, str) else results
 
+    def _cross_encode(
+        self,
+        query: str,
+        documents: List[str],
+        candidates: List[Tuple[int, float]]
+    ) -> List[Tuple[int, float]]:
+        """Re-score bi-encoder candidates with the cross-encoder, best first."""
+        indices = [idx for idx, _ in candidates]
+        scores = self.cross_encoder.score(query, [documents[idx] for idx in indices])
+        return sorted(zip(indices, scores), key=lambda item: item[1], reverse=True)
+
     def get_reranked_documents(
         self,
         query: Union[str, List[str]],
         documents: List[str],
         top_k: int = 5,
-        normalize: str = "softmax"
+        normalize: str = "softmax",
+        **kwargs: Any
     ) -> Union[List[str], List[List[str]]]:
         """
         Returns only the reranked documents without scores.
@@ -116,10 +470,12 @@ class BaseSemanticSearcher(ABC):
             documents: List of documents to rerank
             top_k: Number of top results to return per query
             normalize: Normalization method for scores
+            **kwargs: Selection options forwarded to ``rerank`` (selection,
+                mmr_lambda, merge_adjacent, positions)
             
         Returns:
             For single query: List of reranked document strings
             For multiple queries: List of lists of reranked document strings
         """
-        results = self.rerank(query, documents, top_k, normalize)
+        results = self.rerank(query, documents, top_k, normalize, **kwargs)
         return "\n".join([x['document'].strip() for x in results])
@@ -1,18 +1,115 @@
-from typing import List, Optional
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Literal, Optional, Tuple
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+class TokenCounter:
+    """Counts tokens with a Hugging Face fast tokenizer, caching the count per text.
+
+    Instances are callable so they can be used directly as a ``length_function``.
+    Uncached texts passed to ``count_batch`` are tokenized in a single batched call,
+    which is much faster than tokenizing pieces one at a time. The cache is a
+    thread-safe LRU, so one counter can be shared by agents serving several threads.
+
+    Attributes:
+        tokenizer_name (str): Name or path of the Hugging Face tokenizer.
+        cache_size (int): Maximum number of texts whose token counts are kept.
+    """
+
+    def __init__(self, tokenizer_name: str, cache_size: int = 100_000, tokenizer: Optional[Any] = None):
+        """Load the tokenizer.
+
+        Args:
+            tokenizer_name (str): Hugging Face tokenizer name or local path, usually
+                the name of the embedding model used by the reranker.
+            cache_size (int, optional): Maximum number of cached counts. Defaults to 100000.
+            tokenizer (optional): An already loaded tokenizer to use instead of loading
+                ``tokenizer_name``. It is called with a list of texts and must return
+                a mapping with their "input_ids", like a Hugging Face tokenizer.
+        """
+        self.tokenizer_name = tokenizer_name
+        self.cache_size = cache_size
+        if tokenizer is None:
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(tokenizer_name, use_fast=True)
+        self.tokenizer = tokenizer
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, text: str) -> int:
+        with self._lock:
+            count = self._cache.get(text)
+            if count is not None:
+                self._cache.move_to_end(text)
+                return count
+        return self.count_batch([text])[0]
+
+    def count_batch(self, texts: Iterable[str]) -> List[int]:
+        """Return the token count of every text, tokenizing uncached texts in one batch.
+
+        Args:
+            texts (Iterable[str]): Texts to measure.
+
+        Returns:
+            List[int]: Token counts in the same order as ``texts``.
+        """
+        texts = list(texts)
+        counts: Dict[str, int] = {}
+        missing = []
+        with self._lock:
+            for text in texts:
+                if text in counts:
+                    continue
+                cached = self._cache.get(text)
+                if cached is None:
+                    missing.append(text)
+                    counts[text] = 0
+                else:
+                    self._cache.move_to_end(text)
+                    counts[text] = cached
+
+        if missing:
+            # Tokenize outside the lock so other threads can keep reading the cache
+            encoded = self.tokenizer(
+                missing,
+                add_special_tokens=False,
+                return_attention_mask=False,
+                return_token_type_ids=False
+            )["input_ids"]
+            with self._lock:
+                for text, ids in zip(missing, encoded):
+                    counts[text] = len(ids)
+                    self._cache[text] = len(ids)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return [counts[text] for text in texts]
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(tokenizer_name: str) -> TokenCounter:
+    """Return a process-wide TokenCounter for ``tokenizer_name``, loading it once."""
+    return TokenCounter(tokenizer_name)
+
+
 class Chunker:
     """A modular text chunking class that splits text into smaller, overlapping segments.
-    
+
     This class provides a flexible way to break down large texts into smaller chunks
     while maintaining context through configurable overlap. It uses RecursiveCharacterTextSplitter
     from langchain under the hood.
-    
+
+    Chunk sizes can be measured either in characters (the default) or in tokens of the
+    embedding model's tokenizer. Token-sized chunks have a predictable cost for the
+    embedding server regardless of language or content type.
+
     Attributes:
         chunk_size (int): The target size for each text chunk.
-        chunk_overlap (int): The number of characters to overlap between chunks.
+        chunk_overlap (int): The amount of overlap between chunks.
         separators (List[str]): List of separators to use for splitting, in order of preference.
         length_function (callable): Function to measure text length (default: len).
+        length_unit (str): Either "characters" or "tokens".
     """
 
     def __init__(
@@ -20,49 +117,111 @@ class Chunker:
         chunk_size: int = 150,
         chunk_overlap: int = 50,
         separators: Optional[List[str]] = None,
-        length_function: callable = len
+        length_function: Optional[callable] = None,
+        length_unit: Literal["characters", "tokens"] = "characters",
+        tokenizer_name: Optional[str] = None
     ):
         """Initialize the Chunker with specified parameters.
-        
+
         Args:
-            chunk_size (int, optional): Target size for each chunk. Defaults to 250.
-            chunk_overlap (int, optional): Number of characters to overlap. Defaults to 50.
+            chunk_size (int, optional): Target size for each chunk. Defaults to 150.
+            chunk_overlap (int, optional): Amount of overlap between chunks. Defaults to 50.
             separators (List[str], optional): Custom separators for splitting.
-                Defaults to ["\n\n", "\n", " "].
+                Defaults to ["\n\n", "\n"].
             length_function (callable, optional): Function to measure text length.
-                Defaults to len.
+                Defaults to len, or to a cached TokenCounter when length_unit is "tokens".
+            length_unit (str, optional): "characters" or "tokens". Defaults to "characters".
+            tokenizer_name (str, optional): Hugging Face tokenizer used to count tokens.
+                Required when length_unit is "tokens" and no length_function is given.
         """
+        if length_unit not in ("characters", "tokens"):
+            raise ValueError(f"Unknown length unit: {length_unit}")
+
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.separators = separators or ["\n\n", "\n"]
+        self.length_unit = length_unit
+
+        if length_function is None:
+            if length_unit == "tokens":
+                if not tokenizer_name:
+                    raise ValueError("tokenizer_name is required for token-based chunking")
+                length_function = get_token_counter(tokenizer_name)
+            else:
+                length_function = len
         self.length_function = length_function
-        
+
         self.splitter = RecursiveCharacterTextSplitter(
             separators=self.separators,
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
             length_function=self.length_function
         )
-    
+
+    @staticmethod
+    def _split_pieces(text: str, separators: List[str]) -> Tuple[List[str], List[str]]:
+        """Split text the way RecursiveCharacterTextSplitter does at one recursion level.
+
+        The splitter uses the first separator found in the text and keeps it at the
+        start of every piece after the first.
+
+        Returns:
+            Tuple[List[str], List[str]]: The pieces and the separators left for
+                pieces that are still too long.
+        """
+        for index, separator in enumerate(separators):
+            if separator == "":
+                return list(text), []
+            if separator in text:
+                parts = text.split(separator)
+                pieces = [parts[0]] + [separator + part for part in parts[1:]]
+                return [piece for piece in pieces if piece], separators[index + 1:]
+        return [text], []
+
+    def _warm_token_cache(self, texts: List[str]) -> None:
+        """Count every piece the splitter will measure, one batched call per recursion level.
+
+        The splitter measures the empty join separator and the pieces of each level, and
+        only splits pieces of at least chunk_size tokens further, so after warming its
+        length_function calls are all cache hits.
+        """
+        level = [(text, self.separators) for text in texts]
+        self.length_function.count_batch([""])
+        while level:
+            splits = [self._split_pieces(text, separators) for text, separators in level]
+            counts = iter(self.length_function.count_batch(
+                piece for pieces, _ in splits for piece in pieces
+            ))
+            level = [
+                (piece, remaining)
+                for pieces, remaining in splits
+                for piece, count in zip(pieces, counts)
+                if count >= self.chunk_size and remaining
+            ]
+
     def split_text(self, text: str) -> List[str]:
         """Split a single text into chunks.
-        
+
         Args:
             text (str): The input text to be split into chunks.
-            
+
         Returns:
             List[str]: A list of text chunks.
         """
+        if isinstance(self.length_function, TokenCounter):
+            self._warm_token_cache([text])
         return self.splitter.split_text(text)
-    
+
     def split_texts(self, texts: List[str]) -> List[List[str]]:
         """Split multiple texts into chunks.
-        
+
         Args:
             texts (List[str]): A list of input texts to be split into chunks.
-            
+
         Returns:
             List[List[str]]: A list of lists, where each inner list contains
                 the chunks for one input text.
         """
-        return [self.split_text(text) for text in texts]
+        if isinstance(self.length_function, TokenCounter):
+            self._warm_token_cache(texts)
+        return [self.splitter.split_text(text) for text in texts]
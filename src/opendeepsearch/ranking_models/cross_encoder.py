@@ -0,0 +1,139 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+import requests
+
+
+class BaseCrossEncoder(ABC):
+    """
+    Abstract base class for cross-encoder rerankers.
+
+    A cross-encoder reads the query and a document together and returns a
+    relevance score. It is more precise than a bi-encoder dot product but too
+    expensive to run on every chunk, so it is used as a second stage on the
+    top candidates of ``BaseSemanticSearcher.rerank``.
+    """
+
+    @abstractmethod
+    def score(self, query: str, documents: List[str]) -> List[float]:
+        """
+        Score documents against a query.
+
+        Args:
+            query: Query string
+            documents: Candidate documents
+
+        Returns:
+            One relevance score per document, in input order (higher is better)
+        """
+        pass
+
+
+class InfinityCrossEncoder(BaseCrossEncoder):
+    """
+    Cross-encoder backed by the ``/rerank`` endpoint of an Infinity server.
+
+    The Infinity server must be serving a reranker model, e.g.
+    ``--model-id BAAI/bge-reranker-v2-m3``.
+    """
+
+    def __init__(
+        self,
+        rerank_endpoint: str = "http://localhost:7997/rerank",
+        model_name: str = "BAAI/bge-reranker-v2-m3",
+        batch_size: int = 64,
+        timeout: float = 30
+    ):
+        """
+        Args:
+            rerank_endpoint: URL of the Infinity rerank endpoint
+            model_name: Name of the reranker model served by Infinity
+            batch_size: Maximum number of documents per request
+            timeout: Request timeout in seconds
+        """
+        self.rerank_endpoint = rerank_endpoint
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def score(self, query: str, documents: List[str]) -> List[float]:
+        scores = [0.0] * len(documents)
+        for offset in range(0, len(documents), self.batch_size):
+            batch = documents[offset:offset + self.batch_size]
+            response = self.session.post(
+                self.rerank_endpoint,
+                json={
+                    "model": self.model_name,
+                    "query": query,
+                    "documents": batch,
+                    "return_documents": False
+                },
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            for item in response.json()["results"]:
+                scores[offset + item["index"]] = float(item["relevance_score"])
+        return scores
+
+
+class LocalCrossEncoder(BaseCrossEncoder):
+    """
+    Cross-encoder that runs a small model locally with sentence-transformers.
+
+    The model is loaded on first use. The default MiniLM model is fast enough on
+    CPU for a few dozen candidates per query.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        batch_size: int = 32,
+        device: Optional[str] = "cpu"
+    ):
+        """
+        Args:
+            model_name: Hugging Face name of the cross-encoder model
+            batch_size: Number of (query, document) pairs per forward pass
+            device: Device to run the model on
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.device = device
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+            self._model = CrossEncoder(self.model_name, device=self.device)
+        return self._model
+
+    def score(self, query: str, documents: List[str]) -> List[float]:
+        if not documents:
+            return []
+        scores = self.model.predict(
+            [(query, document) for document in documents],
+            batch_size=self.batch_size,
+            show_progress_bar=False
+        )
+        return [float(score) for score in scores]
+
+
+def create_cross_encoder(name: str, **kwargs) -> BaseCrossEncoder:
+    """
+    Factory function to create a cross-encoder.
+
+    Args:
+        name: "infinity" for an Infinity /rerank endpoint or "local" for a local model
+        **kwargs: Arguments for the selected cross-encoder
+
+    Raises:
+        ValueError: If an invalid cross-encoder is specified
+    """
+    if name.lower() == "infinity":
+        return InfinityCrossEncoder(**kwargs)
+    elif name.lower() == "local":
+        return LocalCrossEncoder(**kwargs)
+    else:
+        raise ValueError(f"Invalid cross-encoder: {name}. Must be 'infinity' or 'local'")
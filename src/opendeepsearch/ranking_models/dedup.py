@@ -0,0 +1,154 @@
+import hashlib
+import re
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_LOW_32 = np.uint64((1 << 32) - 1)
+_LOW_29 = np.uint64((1 << 29) - 1)
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def _mod_mersenne(x: np.ndarray) -> np.ndarray:
+    """Reduce uint64 values modulo 2**61 - 1 using 2**61 = 1 (mod p)"""
+    x = (x & _MERSENNE_PRIME) + (x >> np.uint64(61))
+    return np.where(x >= _MERSENNE_PRIME, x - _MERSENNE_PRIME, x)
+
+
+class ChunkDeduplicator:
+    """
+    Removes exact and near-duplicate chunks before they are embedded.
+
+    Chunks are compared across every source of a query: a chunk is dropped when an
+    earlier chunk (from the same or a higher-ranked source) has the same normalized
+    text, or when their MinHash signatures estimate a word-shingle Jaccard
+    similarity at or above ``threshold``. Candidate pairs are found with
+    locality-sensitive hashing, so the cost stays linear in the number of chunks.
+
+    Attributes:
+        threshold (float): Estimated Jaccard similarity at which chunks are duplicates
+        num_perm (int): Number of MinHash permutations
+        bands (int): Number of LSH bands; must divide num_perm
+        shingle_size (int): Number of words per shingle
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 3,
+        seed: int = 1
+    ):
+        if num_perm % bands != 0:
+            raise ValueError(f"bands ({bands}) must divide num_perm ({num_perm})")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        # Universal hashing (a * h + b) mod p with a and b drawn from the whole field
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+
+    @staticmethod
+    def _normalize(text: str) -> List[str]:
+        return _WORD_PATTERN.findall(text.lower())
+
+    def _shingle_hashes(self, words: List[str]) -> np.ndarray:
+        size = min(self.shingle_size, len(words))
+        shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+        return np.fromiter(
+            (
+                int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+                for s in shingles
+            ),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+
+    def _permute(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Compute (a * h + b) mod (2**61 - 1) for every permutation and 32-bit hash.
+
+        a * h needs up to 93 bits, so a is split into 32-bit halves: a_lo * h fits
+        in 64 bits, and a_hi * h (< 2**61) is multiplied by 2**32 modulo p by moving
+        its top 29 bits around, since 2**61 = 1 (mod p).
+        """
+        a_hi = (self._a >> np.uint64(32))[:, None]
+        a_lo = (self._a & _LOW_32)[:, None]
+        low = _mod_mersenne(a_lo * hashes)
+        high = a_hi * hashes
+        high = _mod_mersenne(((high & _LOW_29) << np.uint64(32)) + (high >> np.uint64(29)))
+        return _mod_mersenne(_mod_mersenne(low + high) + self._b[:, None])
+
+    def _signature(self, words: List[str]) -> np.ndarray:
+        return self._permute(self._shingle_hashes(words)).min(axis=1)
+
+    def deduplicate(self, chunk_lists: List[List[str]]) -> List[List[str]]:
+        """
+        Remove duplicate chunks across a ranked list of sources.
+
+        Args:
+            chunk_lists: Chunks for each source, in source rank order
+
+        Returns:
+            The same structure with duplicate chunks removed. The first occurrence
+            of each chunk is kept.
+        """
+        return [
+            [chunks[position] for position in positions]
+            for chunks, positions in zip(chunk_lists, self.kept_positions(chunk_lists))
+        ]
+
+    def kept_positions(self, chunk_lists: List[List[str]]) -> List[List[int]]:
+        """
+        Find the chunks that survive deduplication.
+
+        Args:
+            chunk_lists: Chunks for each source, in source rank order
+
+        Returns:
+            For each source, the positions of its kept chunks in ascending order,
+            so callers can tell which kept chunks were neighbours in the source
+        """
+        seen_exact: Set[bytes] = set()
+        buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        signatures: List[np.ndarray] = []
+
+        results = []
+        for chunks in chunk_lists:
+            kept = []
+            for position, chunk in enumerate(chunks):
+                words = self._normalize(chunk)
+                if not words:
+                    continue
+
+                digest = hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=16).digest()
+                if digest in seen_exact:
+                    continue
+
+                signature = self._signature(words)
+                band_keys = [
+                    (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                    for band in range(self.bands)
+                ]
+                candidates = {idx for key in band_keys for idx in buckets.get(key, ())}
+                if any(
+                    np.mean(signatures[idx] == signature) >= self.threshold
+                    for idx in candidates
+                ):
+                    continue
+
+                seen_exact.add(digest)
+                signatures.append(signature)
+                for key in band_keys:
+                    buckets.setdefault(key, []).append(len(signatures) - 1)
+                kept.append(position)
+            results.append(kept)
+
+        return results
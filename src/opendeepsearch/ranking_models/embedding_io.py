@@ -0,0 +1,73 @@
+"""
+Helpers for decoding embedding API responses into contiguous NumPy arrays.
+
+Both Infinity (OpenAI-compatible ``encoding_format="base64"``) and Jina
+(``embedding_type="base64"``) can return each embedding as base64-encoded
+little-endian float32 bytes. Decoding those straight into one buffer avoids
+materializing millions of Python floats from JSON.
+"""
+
+import base64
+import json
+from typing import Any, Dict, List
+
+import numpy as np
+import requests
+
+
+def _ordered(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Order response items by their ``index`` field when the server provides it."""
+    if items and all("index" in item for item in items):
+        return sorted(items, key=lambda item: item["index"])
+    return items
+
+
+def decode_base64_embeddings(items: List[Dict[str, Any]], dtype: Any = np.float32) -> np.ndarray:
+    """
+    Decode base64 embeddings into a single (num_texts, dim) array.
+
+    Args:
+        items: The ``data`` list of an embeddings response, each item holding a
+            base64 string under ``embedding``
+        dtype: Element type of the encoded vectors (float32 for both servers)
+
+    Returns:
+        Read-only array backed by the decoded bytes, without per-element copies
+    """
+    items = _ordered(items)
+    if not items:
+        return np.empty((0, 0), dtype=dtype)
+    buffer = b"".join(base64.b64decode(item["embedding"]) for item in items)
+    return np.frombuffer(buffer, dtype=np.dtype(dtype).newbyteorder("<")).reshape(len(items), -1)
+
+
+def read_float_embeddings(response: requests.Response) -> np.ndarray:
+    """
+    Read a JSON float embeddings response into a float32 array.
+
+    Uses ``ijson`` to stream the body when it is installed (the request should
+    be made with ``stream=True``), so the full document is never held as Python
+    objects at once. Falls back to parsing the raw bytes with ``json``.
+    """
+    try:
+        import ijson
+    except ImportError:
+        items = _ordered(json.loads(response.content)["data"])
+        return np.array([item["embedding"] for item in items], dtype=np.float32)
+
+    response.raw.decode_content = True
+    rows = {}
+    for position, item in enumerate(ijson.items(response.raw, "data.item", use_float=True)):
+        rows[item.get("index", position)] = np.asarray(item["embedding"], dtype=np.float32)
+    if not rows:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.stack([rows[key] for key in sorted(rows)])
+
+
+def read_embeddings(response: requests.Response, encoding_format: str) -> np.ndarray:
+    """Decode an embeddings response according to the requested encoding."""
+    if encoding_format == "base64":
+        return decode_base64_embeddings(json.loads(response.content)["data"])
+    if encoding_format == "float":
+        return read_float_embeddings(response)
+    raise ValueError(f"Unknown embedding encoding: {encoding_format}")
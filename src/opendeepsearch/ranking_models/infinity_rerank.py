@@ -1,8 +1,13 @@
-import torch
+import threading
+import time
 import requests
-import json
-from typing import List
-from opendeepsearch.ranking_models.base_reranker import BaseSemanticSearcher
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Literal, Optional, Tuple, Union
+
+import numpy as np
+from opendeepsearch.deadline import Deadline, remaining_time
+from opendeepsearch.ranking_models.base_reranker import BaseSemanticSearcher, EmbeddingProfile
+from opendeepsearch.ranking_models.embedding_io import read_embeddings
 
 class InfinitySemanticSearcher(BaseSemanticSearcher):
     """
@@ -15,6 +20,10 @@ class InfinitySemanticSearcher(BaseSemanticSearcher):
     The default model used is 'Alibaba-NLP/gte-Qwen2-7B-instruct', but other models
     available through the Infinity API can be specified.
     
+    Large inputs are split into micro-batches bounded by text count and estimated
+    token count, sent with bounded parallelism and reassembled in input order.
+    The batch size adapts to the latency the server shows for previous batches.
+    
     Attributes:
         embedding_endpoint (str): URL of the Infinity Embedding API endpoint
         model_name (str): Name of the embedding model to use
@@ -38,12 +47,23 @@ class InfinitySemanticSearcher(BaseSemanticSearcher):
         )
         ```
     """
+
+    MAX_TEXTS = 2048  # Per-request limit of the Infinity server
+    MIN_BATCH_SIZE = 8
     
     def __init__(
         self, 
         embedding_endpoint: str = "http://localhost:7997/embeddings",
         model_name: str = "Alibaba-NLP/gte-Qwen2-7B-instruct",
-        instruction_prefix: str = "Instruct: Given a web search query, retrieve relevant passages that answer the query\nQuery: "
+        instruction_prefix: str = "Instruct: Given a web search query, retrieve relevant passages that answer the query\nQuery: ",
+        scoring_backend: Literal["numpy", "torch"] = "numpy",
+        normalize_embeddings: bool = False,
+        encoding_format: Literal["base64", "float"] = "base64",
+        batch_size: int = 256,
+        max_batch_tokens: int = 65_536,
+        max_concurrency: int = 4,
+        target_batch_latency: float = 2.0,
+        embedding_profile: Optional[Union[EmbeddingProfile, Dict[str, Any]]] = None
     ):
         """
         Initialize the semantic search engine with Infinity Embedding API settings.
@@ -52,35 +72,128 @@ class InfinitySemanticSearcher(BaseSemanticSearcher):
             embedding_endpoint: URL of the Infinity Embedding API endpoint
             model_name: Name of the embedding model available in Infinity API
             instruction_prefix: Prefix to add to queries for better search relevance
+            scoring_backend: "numpy" (default) or "torch" for similarity scoring
+            normalize_embeddings: L2-normalize embeddings before scoring
+            encoding_format: Transport encoding for embeddings. "base64" (default) is
+                decoded straight into a float32 array; "float" uses JSON lists
+            batch_size: Initial number of texts per request; adapted at runtime
+            max_batch_tokens: Upper bound on estimated tokens per request
+            max_concurrency: Maximum number of requests in flight at once
+            target_batch_latency: Seconds per request the batch size adapts towards
+            embedding_profile: Optional EmbeddingProfile (or dict of its fields) that
+                truncates and quantizes embeddings client-side before scoring
         """
         self.embedding_endpoint = embedding_endpoint
         self.model_name = model_name
         self.instruction_prefix = instruction_prefix
+        self.tokenizer_name = model_name
+        self.scoring_backend = scoring_backend
+        self.normalize_embeddings = normalize_embeddings
+        self.encoding_format = encoding_format
+        self.embedding_profile = EmbeddingProfile.coerce(embedding_profile)
+        self.batch_size = min(batch_size, self.MAX_TEXTS)
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        self.target_batch_latency = target_batch_latency
+        self.session = requests.Session()
+        self._batch_size_lock = threading.Lock()
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Cheap token estimate (~4 characters per token) used to size batches."""
+        return len(text) // 4 + 1
+
+    def _next_batch(self, texts: List[str], start: int) -> Tuple[int, int]:
+        """Return the [start, end) range of the next batch within the size and token limits."""
+        end = start
+        tokens = 0
+        limit = min(start + self.batch_size, len(texts))
+        while end < limit:
+            tokens += self._estimate_tokens(texts[end])
+            if tokens > self.max_batch_tokens and end > start:
+                break
+            end += 1
+        return start, end
+
+    def _record_latency(self, latency: float, size: int) -> None:
+        """Adapt the batch size: shrink quickly on slow batches, grow slowly on fast ones.
 
-    def _get_embeddings(self, texts: List[str], embedding_type: str = "query") -> torch.Tensor:
+        Only batches close to the current size count as slow: larger ones were sent
+        before the last decrease, which already accounted for them, and much smaller
+        ones say little about the current size.
         """
-        Get embeddings for a list of texts using the Infinity API.
+        with self._batch_size_lock:
+            if latency > self.target_batch_latency:
+                if self.batch_size // 2 <= size <= self.batch_size:
+                    self.batch_size = max(self.MIN_BATCH_SIZE, self.batch_size // 2)
+            elif latency < self.target_batch_latency / 2 and size >= self.batch_size:
+                self.batch_size = min(self.MAX_TEXTS, int(self.batch_size * 1.25) + 1)
+
+    def _post_embeddings(self, texts: List[str], deadline: Optional[Deadline] = None) -> np.ndarray:
+        """Embed one batch with a single request to the Infinity API."""
+        if deadline is not None and deadline.expired:
+            raise TimeoutError("Deadline passed before the embedding request was sent")
+        started = time.monotonic()
+        response = self.session.post(
+            self.embedding_endpoint,
+            json={
+                "model": self.model_name,
+                "input": texts,
+                "encoding_format": self.encoding_format
+            },
+            stream=self.encoding_format == "float",
+            timeout=remaining_time(deadline)
+        )
+        response.raise_for_status()
+        embeddings = read_embeddings(response, self.encoding_format)
+        self._record_latency(time.monotonic() - started, len(texts))
+        return embeddings
+
+    def _iter_batches(self, texts: List[str], deadline: Optional[Deadline] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """Embed texts in concurrent micro-batches, yielding (start, embeddings) as they finish."""
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            pending = {}
+            position = 0
+            while position < len(texts) or pending:
+                if deadline is not None and deadline.expired:
+                    # Stop sending batches; requests in flight end with their own timeout
+                    for future in pending:
+                        future.cancel()
+                    raise TimeoutError(f"Deadline passed with {len(texts) - position} texts not yet sent")
+                while position < len(texts) and len(pending) < self.max_concurrency:
+                    start, end = self._next_batch(texts, position)
+                    pending[executor.submit(self._post_embeddings, texts[start:end], deadline)] = start
+                    position = end
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+
+    def _get_embeddings(
+        self,
+        texts: List[str],
+        embedding_type: str = "query",
+        deadline: Optional[Deadline] = None
+    ) -> np.ndarray:
         """
-        MAX_TEXTS = 2048
-        if len(texts) > MAX_TEXTS:
-            import warnings
-            warnings.warn(f"Number of texts ({len(texts)}) exceeds maximum of {MAX_TEXTS}. List will be truncated.")
-            texts = texts[:MAX_TEXTS]
+        Get embeddings for a list of texts using the Infinity API.
 
+        Inputs larger than one batch are split into concurrent requests and the
+        results are reassembled in input order, so no text is dropped. With a
+        deadline, no batch is sent after it passes and TimeoutError is raised.
+        """
         # Format queries with instruction prefix
         formatted_texts = [
             self.instruction_prefix + text if embedding_type == "query" else text
             for text in texts
         ]
 
-        response = requests.post(
-            self.embedding_endpoint,
-            json={
-                "model": self.model_name,
-                "input": formatted_texts
-            }
-        )
-        
-        content_str = response.content.decode('utf-8')
-        content_json = json.loads(content_str)
-        return torch.tensor([item['embedding'] for item in content_json['data']])
+        start, end = self._next_batch(formatted_texts, 0)
+        if end == len(formatted_texts):
+            return self._post_embeddings(formatted_texts, deadline)
+
+        embeddings = None
+        for start, batch in self._iter_batches(formatted_texts, deadline):
+            if embeddings is None:
+                embeddings = np.empty((len(formatted_texts), batch.shape[1]), dtype=batch.dtype)
+            embeddings[start:start + len(batch)] = batch
+        return embeddings
@@ -1,11 +1,13 @@
 import requests
-import torch
-from typing import List, Optional
+import numpy as np
+from typing import Any, Dict, List, Literal, Optional, Union
 from dotenv import load_dotenv
 import os
 import warnings
 import logging
-from .base_reranker import BaseSemanticSearcher
+from opendeepsearch.deadline import Deadline, remaining_time
+from .base_reranker import BaseSemanticSearcher, EmbeddingProfile
+from .embedding_io import read_embeddings
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -15,13 +17,28 @@ class JinaReranker(BaseSemanticSearcher):
     Semantic searcher implementation using Jina AI's embedding API.
     """
 
-    def __init__(self, api_key: Optional[str] = None, model: str = "jina-embeddings-v3"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "jina-embeddings-v3",
+        scoring_backend: Literal["numpy", "torch"] = "numpy",
+        normalize_embeddings: bool = False,
+        embedding_type: Literal["base64", "float"] = "base64",
+        embedding_profile: Optional[Union[EmbeddingProfile, Dict[str, Any]]] = None
+    ):
         """
         Initialize the Jina reranker.
 
         Args:
             api_key: Jina AI API key. If None, will load from environment variable JINA_API_KEY
             model: Model name to use (default: "jina-embeddings-v3")
+            scoring_backend: "numpy" (default) or "torch" for similarity scoring
+            normalize_embeddings: L2-normalize embeddings before scoring
+            embedding_type: Transport encoding for embeddings. "base64" (default) is
+                decoded straight into a float32 array; "float" uses JSON lists
+            embedding_profile: Optional EmbeddingProfile (or dict of its fields). Its
+                dimensions are requested from the API (Matryoshka); precision is
+                applied client-side
         """
         if api_key is None:
             load_dotenv()
@@ -34,52 +51,71 @@ class JinaReranker(BaseSemanticSearcher):
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {api_key}'
         }
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
         self.model = model
+        self.tokenizer_name = f"jinaai/{model}"
+        self.scoring_backend = scoring_backend
+        self.normalize_embeddings = normalize_embeddings
+        self.embedding_type = embedding_type
+        self.embedding_profile = EmbeddingProfile.coerce(embedding_profile)
         self.logger = logging.getLogger(__name__)
         self.logger.info("JinaReranker initialized")
 
-    def _get_embeddings(self, texts: List[str]) -> torch.Tensor:
+    def _get_embeddings(self, texts: List[str], deadline: Optional[Deadline] = None) -> np.ndarray:
         """
         Get embeddings for a list of texts using Jina AI API.
 
         Args:
             texts: List of text strings to embed
+            deadline: Optional deadline bounding the request
 
         Returns:
-            torch.Tensor containing the embeddings
+            np.ndarray containing the embeddings
         """
         data = {
             "model": self.model,
             "task": "text-matching",
             "late_chunking": False,
-            "dimensions": 1024,
-            "embedding_type": "float",
+            "dimensions": (self.embedding_profile and self.embedding_profile.dimensions) or 1024,
+            "embedding_type": self.embedding_type,
             "input": texts
         }
 
+        if deadline is not None and deadline.expired:
+            raise TimeoutError("Deadline passed before the embedding request was sent")
         try:
-            response = requests.post(self.api_url, headers=self.headers, json=data)
+            response = self.session.post(
+                self.api_url,
+                json=data,
+                stream=self.embedding_type == "float",
+                timeout=remaining_time(deadline)
+            )
             response.raise_for_status()  # Raise exception for non-200 status codes
 
-            # Extract embeddings from response
-            embeddings_data = [item["embedding"] for item in response.json()["data"]]
-
-            # Convert to torch tensor
-            embeddings = torch.tensor(embeddings_data)
-
-            return embeddings
+            # Decode embeddings from the response into a float32 array
+            return read_embeddings(response, self.embedding_type)
 
+        except requests.exceptions.Timeout as e:
+            raise TimeoutError(f"Jina AI API request timed out: {str(e)}")
         except requests.exceptions.RequestException as e:
             raise RuntimeError(f"Error calling Jina AI API: {str(e)}")
 
-    def rerank(self, query, documents, max_results=10):
+    def rerank(self, query, documents, max_results=10, **kwargs):
         """
         Rerank documents based on their relevance to the query
+
+        The Jina rerank endpoint does its own selection, so the selection options of
+        BaseSemanticSearcher.rerank (passed as keyword arguments) are ignored. A
+        ``deadline`` keyword shortens the request timeout.
         """
         if not documents:
             self.logger.warning("No documents to rerank")
             return []
 
+        deadline = kwargs.get("deadline")
+        timeout = 30 if deadline is None else min(30, max(deadline.remaining(), 0.001))
+
         endpoint = "https://api.jina.ai/v1/rerank"
         payload = {
             "query": query,
@@ -89,11 +125,10 @@ class JinaReranker(BaseSemanticSearcher):
 
         try:
             self.logger.info(f"Sending rerank request for query: '{query[:50]}...' with {len(documents)} documents")
-            response = requests.post(
-                endpoint, 
-                headers=self.headers, 
+            response = self.session.post(
+                endpoint,
                 json=payload,
-                timeout=30  # Add timeout to prevent hanging
+                timeout=timeout  # Add timeout to prevent hanging
             )
             response.raise_for_status()
             result = response.json()
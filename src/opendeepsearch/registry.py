@@ -0,0 +1,110 @@
+"""
+Process-wide registry of OpenDeepSearchAgent instances.
+
+Building an agent creates a search client, a scraper, a reranker and their
+connection pools and caches. Tools and scripts that create many short-lived
+wrappers with the same configuration (one OpenDeepSearchTool per eval question,
+for example) acquire a shared agent from the registry instead, so every call
+after the first starts with warm connections and caches.
+"""
+
+import atexit
+import json
+import threading
+from typing import Any, Dict, Optional
+
+from opendeepsearch.ods_agent import OpenDeepSearchAgent
+
+
+def _config_key(config: Dict[str, Any]) -> str:
+    """Stable key for an agent configuration, including nested config dictionaries."""
+    return json.dumps(config, sort_keys=True, default=repr)
+
+
+class AgentRegistry:
+    """
+    Shares one OpenDeepSearchAgent per configuration, with reference counting.
+
+    ``acquire`` returns the agent for a configuration, creating it on first use,
+    and ``release`` gives it back. With ``keep_warm`` (the default) an agent whose
+    reference count drops to zero stays available for the next caller until
+    ``shutdown``; otherwise it is closed immediately.
+    """
+
+    def __init__(self, keep_warm: bool = True):
+        self.keep_warm = keep_warm
+        self._agents: Dict[str, OpenDeepSearchAgent] = {}
+        self._refcounts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, **config: Any) -> OpenDeepSearchAgent:
+        """
+        Get the shared agent for a configuration.
+
+        Args:
+            **config: Keyword arguments for OpenDeepSearchAgent
+
+        Returns:
+            The shared agent. Call ``release`` with it when done.
+        """
+        key = _config_key(config)
+        with self._lock:
+            agent = self._agents.get(key)
+            if agent is None:
+                agent = OpenDeepSearchAgent(**config)
+                self._agents[key] = agent
+                self._refcounts[key] = 0
+            self._refcounts[key] += 1
+            return agent
+
+    def release(self, agent: OpenDeepSearchAgent) -> None:
+        """Give back an agent obtained from ``acquire``."""
+        with self._lock:
+            key = self._key_of(agent)
+            if key is None:
+                return
+            self._refcounts[key] = max(0, self._refcounts[key] - 1)
+            if self._refcounts[key] == 0 and not self.keep_warm:
+                del self._agents[key], self._refcounts[key]
+            else:
+                return
+        agent.close()
+
+    def _key_of(self, agent: OpenDeepSearchAgent) -> Optional[str]:
+        for key, candidate in self._agents.items():
+            if candidate is agent:
+                return key
+        return None
+
+    def shutdown(self) -> None:
+        """
+        Close every agent in the registry, whether or not it is still referenced.
+
+        The process-wide Wikipedia fetcher the agents' scrapers share is closed too.
+        """
+        with self._lock:
+            agents = list(self._agents.values())
+            self._agents.clear()
+            self._refcounts.clear()
+        for agent in agents:
+            try:
+                agent.close()
+            except Exception as e:
+                print(f"Error closing agent: {str(e)}")
+        from opendeepsearch.context_scraping.wikipedia import close_wikipedia_fetcher
+        try:
+            close_wikipedia_fetcher()
+        except Exception as e:
+            print(f"Error closing Wikipedia fetcher: {str(e)}")
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+
+_registry = AgentRegistry()
+atexit.register(_registry.shutdown)
+
+
+def get_registry() -> AgentRegistry:
+    """Return the process-wide agent registry."""
+    return _registry
@@ -0,0 +1,340 @@
+"""
+On-disk BM25 inverted index for searching a local document collection.
+
+Documents (intranet pages, cached pages, articles from an offline Wikipedia
+store) are tokenised once at ingest time into an SQLite postings table.
+Queries read only the postings of their own terms, so search cost depends on
+how common the query terms are, not on the size of the collection.
+
+Build or extend an index:
+    python -m opendeepsearch.serp_search.local_index add ./search.db docs/ pages.jsonl
+    python -m opendeepsearch.serp_search.local_index add ./search.db --wikipedia-store ./wikipedia-en
+
+Search it:
+    python -m opendeepsearch.serp_search.local_index search ./search.db "query"
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+_TAG_PATTERN = re.compile(r"<(script|style)\b.*?</\1\s*>|<[^>]+>", re.DOTALL | re.IGNORECASE)
+_HTML_TITLE_PATTERN = re.compile(r"<title\b[^>]*>(.*?)</title\s*>", re.DOTALL | re.IGNORECASE)
+_WHITESPACE_PATTERN = re.compile(r"[ \t]+")
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "he",
+    "in", "is", "it", "its", "of", "on", "or", "that", "the", "to", "was", "were", "will",
+    "with", "what", "which", "who", "how", "when", "where", "why", "do", "does", "did",
+})
+
+_TEXT_EXTENSIONS = {".txt", ".md", ".rst"}
+_HTML_EXTENSIONS = {".html", ".htm"}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords"""
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def make_snippet(text: str, query_terms: Iterable[str], max_chars: int = 300) -> str:
+    """
+    Pick the run of consecutive sentences with the most query-term matches.
+
+    Args:
+        text: Document text
+        query_terms: Tokenised query
+        max_chars: Maximum snippet length
+
+    Returns:
+        The snippet, cut at max_chars
+    """
+    terms = set(query_terms)
+    sentences = [sentence.strip().lstrip("#").strip() for sentence in _SENTENCE_PATTERN.split(text)]
+    sentences = [sentence for sentence in sentences if sentence]
+    if not sentences:
+        return ""
+    best_score, best_start, best_end = -1, 0, 1
+    for start in range(len(sentences)):
+        length = score = 0
+        end = start
+        while end < len(sentences) and (end == start or length + len(sentences[end]) <= max_chars):
+            length += len(sentences[end]) + 1
+            score += sum(1 for token in _TOKEN_PATTERN.findall(sentences[end].lower()) if token in terms)
+            end += 1
+        if score > best_score:
+            best_score, best_start, best_end = score, start, end
+    snippet = " ".join(sentences[best_start:best_end])
+    return snippet if len(snippet) <= max_chars else snippet[:max_chars].rsplit(" ", 1)[0] + "..."
+
+
+@dataclass
+class SearchHit:
+    """A document matching a query"""
+    url: str
+    title: str
+    snippet: str
+    score: float
+    date: str = ""
+
+
+class LocalSearchIndex:
+    """
+    BM25 index stored in an SQLite file.
+
+    Safe to search from many threads; each thread reads through its own connection.
+    Collection statistics are re-read whenever the database changed, including
+    writes from other processes.
+
+    Attributes:
+        path (str): SQLite file
+        k1 (float): BM25 term-frequency saturation
+        b (float): BM25 length normalisation
+        title_weight (int): How many times title tokens are counted
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75, title_weight: int = 2):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._connections_lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._generation = 0  # Bumped on every write through this instance
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._write_lock:
+            db = self._connection()
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " id INTEGER PRIMARY KEY, url TEXT UNIQUE NOT NULL, title TEXT NOT NULL,"
+                " text TEXT NOT NULL, date TEXT NOT NULL DEFAULT '', length INTEGER NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS postings ("
+                " term TEXT NOT NULL, doc_id INTEGER NOT NULL, tf INTEGER NOT NULL,"
+                " PRIMARY KEY (term, doc_id)) WITHOUT ROWID;"
+                "CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);"
+            )
+            db.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        with self._connections_lock:
+            if db is None or db not in self._connections:
+                # Every connection is tracked so that close() reaches all threads' connections
+                db = sqlite3.connect(self.path, check_same_thread=False)
+                self._connections.append(db)
+                self._local.db = db
+                self._local.stats = None
+        return db
+
+    def _collection_stats(self) -> Tuple[int, float]:
+        """Number of documents and their average length, cached until the database changes"""
+        db = self._connection()
+        # data_version changes when another connection (in this or another process)
+        # commits; writes through this instance bump the generation instead
+        version = (db.execute("PRAGMA data_version").fetchone()[0], self._generation)
+        cached = self._local.stats
+        if cached is None or cached[0] != version:
+            count, total = db.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents").fetchone()
+            cached = (version, (count, total / count if count else 0.0))
+            self._local.stats = cached
+        return cached[1]
+
+    def __len__(self) -> int:
+        return self._collection_stats()[0]
+
+    def add_documents(self, documents: Iterable[Dict[str, Any]], batch_size: int = 500) -> int:
+        """
+        Add or replace documents.
+
+        Args:
+            documents: Dictionaries with "url" and "text" and optionally "title" and "date";
+                a document with a URL already in the index replaces it
+            batch_size: Documents written per transaction
+
+        Returns:
+            Number of documents added
+        """
+        added = 0
+        with self._write_lock:
+            db = self._connection()
+            for document in documents:
+                url, text = document.get("url"), document.get("text") or ""
+                if not url or not text.strip():
+                    continue
+                title = document.get("title") or url
+                counts = Counter(tokenize(text))
+                for token in tokenize(title):
+                    counts[token] += self.title_weight
+
+                row = db.execute("SELECT id FROM documents WHERE url = ?", (url,)).fetchone()
+                if row is not None:
+                    db.execute("DELETE FROM postings WHERE doc_id = ?", (row[0],))
+                    db.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+                doc_id = db.execute(
+                    "INSERT INTO documents (url, title, text, date, length) VALUES (?, ?, ?, ?, ?)",
+                    (url, title, text, document.get("date") or "", sum(counts.values()))
+                ).lastrowid
+                db.executemany(
+                    "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                    [(term, doc_id, tf) for term, tf in counts.items()]
+                )
+                added += 1
+                if added % batch_size == 0:
+                    db.commit()
+            db.commit()
+            self._generation += 1
+        return added
+
+    def search(self, query: str, num_results: int = 10, snippet_chars: int = 300) -> List[SearchHit]:
+        """
+        Rank documents for a query with BM25.
+
+        Ties are broken by insertion order, so results are deterministic.
+
+        Args:
+            query: Search query
+            num_results: Maximum number of hits
+            snippet_chars: Maximum snippet length
+
+        Returns:
+            Hits ordered by descending score
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        count, average_length = self._collection_stats()
+        if not count:
+            return []
+
+        db = self._connection()
+        scores: Dict[int, float] = {}
+        for term in terms:
+            postings = db.execute(
+                "SELECT p.doc_id, p.tf, d.length FROM postings p JOIN documents d ON d.id = p.doc_id WHERE p.term = ?",
+                (term,)
+            ).fetchall()
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf, length in postings:
+                norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:num_results]
+        hits = []
+        for doc_id, score in ranked:
+            url, title, text, date = db.execute(
+                "SELECT url, title, text, date FROM documents WHERE id = ?", (doc_id,)
+            ).fetchone()
+            hits.append(SearchHit(url=url, title=title, snippet=make_snippet(text, terms, snippet_chars), score=score, date=date))
+        return hits
+
+    def close(self) -> None:
+        """Close the connections opened by every thread; later calls open new ones"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for db in connections:
+            db.close()
+
+
+def _html_to_text(html: str) -> Tuple[str, str]:
+    title_match = _HTML_TITLE_PATTERN.search(html)
+    title = _TAG_PATTERN.sub("", title_match.group(1)).strip() if title_match else ""
+    text = _TAG_PATTERN.sub("\n", _HTML_TITLE_PATTERN.sub("", html))
+    text = "\n".join(line for line in (_WHITESPACE_PATTERN.sub(" ", line).strip() for line in text.splitlines()) if line)
+    return title, text
+
+
+def iter_files(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Read documents from text, Markdown and HTML files, directories of them, and JSONL files.
+
+    JSONL lines are dictionaries with "url", "text" and optionally "title" and "date".
+    Files are given file:// URLs.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                yield from iter_files(os.path.join(root, name) for name in sorted(names))
+            continue
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".jsonl":
+            with open(path, encoding="utf-8") as lines:
+                for line in lines:
+                    if line.strip():
+                        yield json.loads(line)
+        elif extension in _TEXT_EXTENSIONS or extension in _HTML_EXTENSIONS:
+            with open(path, encoding="utf-8", errors="replace") as file:
+                content = file.read()
+            if extension in _HTML_EXTENSIONS:
+                title, text = _html_to_text(content)
+            else:
+                title, text = "", content
+            yield {
+                "url": "file://" + os.path.abspath(path),
+                "title": title or os.path.splitext(os.path.basename(path))[0],
+                "text": text,
+            }
+
+
+def iter_wikipedia_store(path: str) -> Iterator[Dict[str, Any]]:
+    """Read the articles of an offline Wikipedia store as documents with wikipedia.org URLs"""
+    from opendeepsearch.context_scraping.wikipedia import render_sections
+    from opendeepsearch.context_scraping.wikipedia_store import LocalWikipediaStore
+
+    store = LocalWikipediaStore(path)
+    try:
+        for page in store.iter_pages():
+            yield {
+                "url": f"https://{store.language}.wikipedia.org/wiki/{page.title.replace(' ', '_')}",
+                "title": page.title,
+                "text": render_sections(page.sections),
+            }
+    finally:
+        store.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build or query a local BM25 search index.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Add documents to an index")
+    add.add_argument("index", help="SQLite index file (created if missing)")
+    add.add_argument("paths", nargs="*", help="Text/Markdown/HTML files, directories or JSONL files")
+    add.add_argument("--wikipedia-store", default=None, help="Directory of an offline Wikipedia store")
+
+    search = commands.add_parser("search", help="Search an index")
+    search.add_argument("index", help="SQLite index file")
+    search.add_argument("query", help="Search query")
+    search.add_argument("--num-results", type=int, default=10)
+
+    args = parser.parse_args()
+    index = LocalSearchIndex(args.index)
+    if args.command == "add":
+        added = index.add_documents(iter_files(args.paths))
+        if args.wikipedia_store:
+            added += index.add_documents(iter_wikipedia_store(args.wikipedia_store))
+        print(f"Added {added} documents; the index now holds {len(index)}")
+    else:
+        for hit in index.search(args.query, args.num_results):
+            print(f"{hit.score:.3f}  {hit.title}\n       {hit.url}\n       {hit.snippet}\n")
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
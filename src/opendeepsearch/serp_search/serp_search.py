@@ -19,6 +19,10 @@ class SearXNGException(SearchAPIException):
     """Custom exception for SearXNG related errors"""
     pass
 
+class LocalSearchException(SearchAPIException):
+    """Custom exception for local index related errors"""
+    pass
+
 @dataclass
 class SerperConfig:
     """Configuration for Serper API"""
@@ -52,6 +56,20 @@ class SearXNGConfig:
         api_key = os.getenv("SEARXNG_API_KEY")  # Optional
         return cls(instance_url=instance_url, api_key=api_key)
 
+@dataclass
+class LocalSearchConfig:
+    """Configuration for a local BM25 index"""
+    index_path: str
+    snippet_chars: int = 300
+
+    @classmethod
+    def from_env(cls) -> 'LocalSearchConfig':
+        """Create config from environment variables"""
+        index_path = os.getenv("LOCAL_SEARCH_INDEX")
+        if not index_path:
+            raise LocalSearchException("LOCAL_SEARCH_INDEX environment variable not set")
+        return cls(index_path=index_path)
+
 class SearchResult(Generic[T]):
     """Container for search results with error handling"""
     def __init__(self, data: Optional[T] = None, error: Optional[str] = None):
@@ -65,6 +83,8 @@ class SearchResult(Generic[T]):
 
 class SearchAPI(ABC):
     """Abstract base class for search APIs"""
+    session: Optional[requests.Session] = None
+
     @abstractmethod
     def get_sources(
         self,
@@ -75,6 +95,11 @@ class SearchAPI(ABC):
         """Get search results from the API"""
         pass
 
+    def close(self) -> None:
+        """Release pooled HTTP connections"""
+        if self.session is not None:
+            self.session.close()
+
 class SerperAPI(SearchAPI):
     def __init__(self, api_key: Optional[str] = None, config: Optional[SerperConfig] = None):
         if api_key:
@@ -86,6 +111,9 @@ class SerperAPI(SearchAPI):
             'X-API-KEY': self.config.api_key,
             'Content-Type': 'application/json'
         }
+        # Reuse connections (and TLS handshakes) across queries
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
 
     @staticmethod
     def extract_fields(items: List[Dict[str, Any]], fields: List[str]) -> List[Dict[str, Any]]:
@@ -121,9 +149,8 @@ class SerperAPI(SearchAPI):
                 "gl": search_location
             }
 
-            response = requests.post(
+            response = self.session.post(
                 self.config.api_url,
-                headers=self.headers,
                 json=payload,
                 timeout=self.config.timeout
             )
@@ -169,6 +196,8 @@ class SearXNGAPI(SearchAPI):
         self.headers = {'Content-Type': 'application/json'}
         if self.config.api_key:
             self.headers['X-API-Key'] = self.config.api_key
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
 
     def get_sources(
         self,
@@ -213,9 +242,8 @@ class SearXNGAPI(SearchAPI):
             if stored_location and stored_location != 'all':
                 params['language'] = stored_location
 
-            response = requests.get(
+            response = self.session.get(
                 search_url,
-                headers=self.headers,
                 params=params,
                 timeout=self.config.timeout
             )
@@ -261,20 +289,80 @@ class SearXNGAPI(SearchAPI):
             return SearchResult(error=f"Unexpected error with SearXNG: {str(e)}")
 
 
+class LocalSearchAPI(SearchAPI):
+    """Search provider backed by a local BM25 index (see serp_search.local_index)"""
+
+    def __init__(self, index_path: Optional[str] = None, config: Optional[LocalSearchConfig] = None):
+        from opendeepsearch.serp_search.local_index import LocalSearchIndex
+
+        if index_path:
+            self.config = LocalSearchConfig(index_path=index_path)
+        else:
+            self.config = config or LocalSearchConfig.from_env()
+        if not os.path.exists(self.config.index_path):
+            raise LocalSearchException(f"Local search index not found: {self.config.index_path}")
+        self.index = LocalSearchIndex(self.config.index_path)
+
+    def get_sources(
+        self,
+        query: str,
+        num_results: int = 10,
+        stored_location: Optional[str] = None
+    ) -> SearchResult[Dict[str, Any]]:
+        """
+        Search the local index.
+
+        Args:
+            query: Search query string
+            num_results: Number of results to return
+            stored_location: Ignored; the local index has no locations
+
+        Returns:
+            SearchResult in the same format as SerperAPI, with only organic results
+        """
+        if not query.strip():
+            return SearchResult(error="Query cannot be empty")
+
+        try:
+            hits = self.index.search(query, max(1, num_results), self.config.snippet_chars)
+            results = {
+                'organic': [
+                    {'title': hit.title, 'link': hit.url, 'snippet': hit.snippet, 'date': hit.date}
+                    for hit in hits
+                ],
+                'topStories': [],
+                'images': [],
+                'graph': None,
+                'answerBox': None,
+                'peopleAlsoAsk': None,
+                'relatedSearches': None
+            }
+            return SearchResult(data=results)
+
+        except Exception as e:
+            return SearchResult(error=f"Local search failed: {str(e)}")
+
+    def close(self) -> None:
+        """Close the index connections opened by every thread"""
+        self.index.close()
+
+
 def create_search_api(
     search_provider: str = "serper",
     serper_api_key: Optional[str] = None,
     searxng_instance_url: Optional[str] = None,
-    searxng_api_key: Optional[str] = None
+    searxng_api_key: Optional[str] = None,
+    local_index_path: Optional[str] = None
 ) -> SearchAPI:
     """
     Factory function to create the appropriate search API client.
 
     Args:
-        search_provider: The search provider to use ('serper' or 'searxng')
+        search_provider: The search provider to use ('serper', 'searxng' or 'local')
         serper_api_key: Optional API key for Serper
         searxng_instance_url: Optional SearXNG instance URL
         searxng_api_key: Optional API key for SearXNG instance
+        local_index_path: Optional path of the local index; defaults to LOCAL_SEARCH_INDEX
 
     Returns:
         An instance of a SearchAPI implementation
@@ -286,5 +374,7 @@ def create_search_api(
         return SerperAPI(api_key=serper_api_key)
     elif search_provider.lower() == "searxng":
         return SearXNGAPI(instance_url=searxng_instance_url, api_key=searxng_api_key)
+    elif search_provider.lower() == "local":
+        return LocalSearchAPI(index_path=local_index_path)
     else:
-        raise ValueError(f"Invalid search provider: {search_provider}. Must be 'serper' or 'searxng'")
\ No newline at end of file
+        raise ValueError(f"Invalid search provider: {search_provider}. Must be 'serper', 'searxng' or 'local'")
\ No newline at end of file
@@ -0,0 +1,141 @@
+import sys
+
+import numpy as np
+
+from opendeepsearch.ranking_models.base_reranker import BaseSemanticSearcher, EmbeddingProfile
+
+
+class StubSearcher(BaseSemanticSearcher):
+    def _get_embeddings(self, texts, deadline=None):
+        return np.ones((len(texts), 2), dtype=np.float32)
+
+
+class VectorSearcher(BaseSemanticSearcher):
+    """Embeds each text as a fixed vector"""
+
+    def __init__(self, vectors, **attributes):
+        self.vectors = vectors
+        for name, value in attributes.items():
+            setattr(self, name, value)
+
+    def _get_embeddings(self, texts, deadline=None):
+        return [self.vectors[text] for text in texts]
+
+
+VECTORS = {
+    "query": [1.0, 0.0],
+    "close": [0.9, 0.1],
+    "long": [3.0, 3.0],
+    "far": [0.0, 1.0],
+}
+
+
+def test_join_drops_word_aligned_overlap():
+    first = "Lagos is the largest city in Nigeria. It has a population of 15 million."
+    second = "It has a population of 15 million. The city is a port."
+    assert BaseSemanticSearcher._join_overlapping(first, second) == (
+        "Lagos is the largest city in Nigeria. It has a population of 15 million. The city is a port."
+    )
+
+
+def test_join_ignores_coincidental_character_overlap():
+    assert BaseSemanticSearcher._join_overlapping("The population is 1", "12,000 people.") == (
+        "The population is 1\n12,000 people."
+    )
+
+
+def test_join_requires_minimum_words():
+    assert BaseSemanticSearcher._join_overlapping("Read the docs", "docs first, then code") == (
+        "Read the docs\ndocs first, then code"
+    )
+    assert BaseSemanticSearcher._join_overlapping("Read the docs", "docs first", min_overlap_words=1) == (
+        "Read the docs first"
+    )
+
+
+def test_merge_uses_original_positions():
+    searcher = StubSearcher()
+    # The chunk between "b" and "c" was removed by deduplication
+    documents = ["a one two", "b three four", "c five six"]
+    selected = [(1, 0.9), (2, 0.8), (0, 0.7)]
+
+    merged = searcher._merge_adjacent(documents, selected, positions=[0, 1, 3])
+    assert merged == [
+        {"document": "a one two\nb three four", "score": 0.9},
+        {"document": "c five six", "score": 0.8},
+    ]
+
+    merged = searcher._merge_adjacent(documents, selected)
+    assert len(merged) == 1
+
+
+def test_numpy_scores_match_dot_products_and_softmax():
+    searcher = VectorSearcher(VECTORS)
+    documents = ["close", "long", "far"]
+
+    raw = searcher.calculate_scores(["query"], documents, normalize="none")
+    assert isinstance(raw, np.ndarray) and raw.dtype == np.float32
+    np.testing.assert_allclose(raw, [[0.9, 3.0, 0.0]], rtol=1e-6)
+
+    softmax = searcher.calculate_scores(["query"], documents)
+    np.testing.assert_allclose(softmax.sum(axis=-1), [1.0], rtol=1e-6)
+    assert np.argmax(softmax) == 1
+    assert "torch" not in sys.modules
+
+
+def test_normalized_embeddings_rank_by_cosine():
+    searcher = VectorSearcher(VECTORS, normalize_embeddings=True)
+    results = searcher.rerank("query", ["far", "long", "close"], top_k=3, normalize="none")
+    assert [result["document"] for result in results] == ["close", "long", "far"]
+    assert abs(results[0]["score"] - 0.9 / np.hypot(0.9, 0.1)) < 1e-6
+
+
+def test_top_k_returns_best_first_with_stable_ties():
+    searcher = StubSearcher()
+    scores = np.array([0.2, 0.9, 0.5, 0.9, 0.1], dtype=np.float32)
+    assert sorted(idx for idx, _ in searcher._top_k(scores, 3)) == [1, 2, 3]
+    assert [score for _, score in searcher._top_k(scores, 3)] == [scores[1], scores[3], scores[2]]
+    # Without partitioning, equal scores keep their input order
+    assert [idx for idx, _ in searcher._top_k(scores, 10)] == [1, 3, 2, 0, 4]
+
+
+def test_profile_truncates_and_quantizes():
+    embeddings = np.array([[3.0, 4.0, 12.0], [-1.0, 0.0, 0.0]], dtype=np.float32)
+
+    truncated = EmbeddingProfile(dimensions=2).apply(embeddings)
+    np.testing.assert_allclose(truncated, [[0.6, 0.8], [-1.0, 0.0]], rtol=1e-6)
+
+    int8 = EmbeddingProfile(dimensions=2, precision="int8").apply(embeddings)
+    assert int8.dtype == np.int8
+    np.testing.assert_array_equal(int8, [[76, 102], [-127, 0]])
+
+    binary = EmbeddingProfile(precision="binary").apply(embeddings)
+    assert binary.dtype == np.uint8
+    np.testing.assert_array_equal(np.unpackbits(binary, axis=-1, count=3), [[1, 1, 1], [0, 0, 0]])
+
+
+def test_quantized_profiles_keep_the_float_ranking():
+    rng = np.random.default_rng(0)
+    vectors = {f"doc {i}": rng.normal(size=64).tolist() for i in range(20)}
+    vectors["query"] = (np.array(vectors["doc 7"]) + 0.3 * rng.normal(size=64)).tolist()
+    documents = [f"doc {i}" for i in range(20)]
+
+    exact = VectorSearcher(vectors, normalize_embeddings=True).rerank("query", documents, top_k=1, normalize="none")
+    for precision in ("int8", "binary"):
+        profile = EmbeddingProfile(dimensions=64, precision=precision)
+        searcher = VectorSearcher(vectors, embedding_profile=profile)
+        results = searcher.rerank("query", documents, top_k=1, normalize="none")
+        assert results[0]["document"] == exact[0]["document"] == "doc 7"
+        assert -1.0 <= results[0]["score"] <= 1.0
+
+
+def test_binary_scores_are_hamming_similarities():
+    profile = EmbeddingProfile(dimensions=4, precision="binary")
+    searcher = VectorSearcher({
+        "query": [1.0, 1.0, 1.0, 1.0],
+        "same": [2.0, 1.0, 3.0, 1.0],
+        "half": [1.0, 1.0, -1.0, -1.0],
+        "opposite": [-1.0, -1.0, -1.0, -1.0],
+    }, embedding_profile=profile)
+    scores = searcher.calculate_scores(["query"], ["same", "half", "opposite"], normalize="none")
+    np.testing.assert_allclose(scores, [[1.0, 0.0, -1.0]])
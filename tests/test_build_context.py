@@ -0,0 +1,95 @@
+import pytest
+
+from opendeepsearch.context_building import build_context as bc
+
+
+@pytest.fixture(autouse=True)
+def word_token_counter(monkeypatch):
+    # litellm's tokenizer is not needed to test budgeting; count words instead
+    monkeypatch.setattr(bc, "count_tokens", lambda text, model: len(text.split()))
+
+
+def make_source(rank, scores):
+    return {
+        "title": f"Source {rank}",
+        "link": f"https://example.com/{rank}",
+        "snippet": f"snippet {rank}",
+        "html_chunks": [
+            {"document": f"chunk {rank}-{i} " + "word " * 10, "score": score}
+            for i, score in enumerate(scores)
+        ],
+    }
+
+
+def test_source_chunks_scales_negative_scores_within_source():
+    weights = [weight for _, weight in bc._source_chunks(make_source(0, [-1.0, -3.0, -5.0]))]
+    assert weights == [1.0, 0.5, 0.0]
+
+
+def test_source_chunks_without_scores_uses_position():
+    item = {"html": "first\nsecond\n\nthird"}
+    assert [weight for _, weight in bc._source_chunks(item)] == [1.0, 0.5, 1.0 / 3]
+
+
+def test_budget_keeps_best_chunk_of_top_source_with_negative_scores():
+    sources = {"organic": [make_source(rank, [-1.0 - rank, -8.0 - rank, -9.0 - rank]) for rank in range(5)]}
+    headers = sum(len(bc.format_result_header(item).split()) + 1 for item in sources["organic"])
+    # Room for the section labels, all headers and two chunks
+    result = bc.build_budgeted_context(sources, token_budget=headers + 40, model="test")
+
+    assert "chunk 0-0" in result.text
+    assert "chunk 4-0" not in result.text
+    assert result.tokens <= result.budget
+
+
+def test_budget_prefers_higher_ranked_source_for_equal_relevance():
+    sources = {"organic": [make_source(rank, [0.9, 0.1]) for rank in range(2)]}
+    headers = sum(len(bc.format_result_header(item).split()) + 1 for item in sources["organic"])
+    result = bc.build_budgeted_context(sources, token_budget=headers + 28, model="test")
+
+    assert "chunk 0-0" in result.text
+    assert "chunk 1-0" not in result.text
+    assert any(entry["kind"] == "chunk" for entry in result.dropped)
+
+
+def test_budget_trim_recounts_the_text_only_a_few_times(monkeypatch):
+    renders = []
+
+    def overcounting(text, model):
+        # Joined text costs more than its parts, forcing the trim loop to run
+        if text.startswith("SEARCH RESULTS:"):
+            renders.append(text)
+            return len(text.split()) + len(text.splitlines())
+        return len(text.split())
+
+    monkeypatch.setattr(bc, "count_tokens", overcounting)
+    sources = {"organic": [make_source(rank, [0.9 - i / 100 for i in range(10)]) for rank in range(10)]}
+    result = bc.build_budgeted_context(sources, token_budget=600, model="test")
+
+    assert result.tokens <= result.budget
+    assert len(renders) <= 3
+    assert "chunk 0-0" in result.text
+
+
+LOVELACE_GRAPH = {
+    "title": "Ada Lovelace",
+    "type": "English mathematician",
+    "description": "Augusta Ada King, Countess of Lovelace, was an English mathematician and writer.",
+    "attributes": {"Born": "10 December 1815, London", "Parents": "Lord Byron, Lady Byron"},
+}
+
+
+@pytest.mark.parametrize("result, query, expected", [
+    ({"answerBox": {"answer": "1815"}}, "when was ada lovelace born", True),
+    ({"answerBox": {"snippetHighlighted": ["10 December 1815"]}}, "ada lovelace birthday", True),
+    ({"answerBox": {"snippet": "Ada Lovelace was born in London."}}, "ada lovelace birthday", False),
+    ({"graph": LOVELACE_GRAPH}, "When was Ada Lovelace born?", True),
+    ({"graph": LOVELACE_GRAPH}, "Who were Ada Lovelace's parents", True),
+    # The entity matches but nothing in the graph answers the question
+    ({"graph": LOVELACE_GRAPH}, "What did Ada Lovelace write about the Analytical Engine?", False),
+    ({"graph": {"title": "Ada Lovelace", "description": "English mathematician"}}, "ada lovelace born", False),
+    ({"graph": LOVELACE_GRAPH}, "When was Lord Byron born?", False),
+    (None, "anything", False),
+])
+def test_has_confident_serp_answer(result, query, expected):
+    assert bc.has_confident_serp_answer(result, query) is expected
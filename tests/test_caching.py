@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from opendeepsearch.caching import AnswerCache, ContextCache, classify_freshness, normalize_query
+
+
+@pytest.mark.parametrize("first, second", [
+    ("What is 2+2?", "what is 2-2"),
+    ("C++ history", "C# history"),
+    ("node.js release date", "node js release date"),
+    ("what is -5 squared", "what is 5 squared"),
+])
+def test_normalize_query_keeps_meaningful_punctuation(first, second):
+    assert normalize_query(first) != normalize_query(second)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("What is 2+2?", "what is 2+2"),
+    ("  Who   founded\tRome?! ", "who founded rome"),
+    ("ＣＰＵ cache size.", "cpu cache size"),
+])
+def test_normalize_query_ignores_case_whitespace_and_trailing_punctuation(first, second):
+    assert normalize_query(first) == normalize_query(second)
+
+
+def test_classify_freshness():
+    assert classify_freshness("Bitcoin price today?") == "news"
+    assert classify_freshness("History of the Roman Empire") == "evergreen"
+    assert classify_freshness("best laptop for students") == "default"
+
+
+def test_answer_cache_exact_hits_do_not_collide():
+    cache = AnswerCache(semantic=False)
+    cache.store("What is 2+2?", "4")
+    assert cache.lookup("what is 2+2") == "4"
+    assert cache.lookup("What is 2-2?") is None
+    assert cache.stats.exact_hits == 1
+    assert cache.stats.misses == 1
+
+
+def test_answer_cache_namespaces_are_separate():
+    cache = AnswerCache(semantic=False)
+    cache.store("capital of france", "Paris", namespace="a")
+    assert cache.lookup("capital of france", namespace="b") is None
+
+
+def test_answer_cache_semantic_hit():
+    vectors = {"who wrote hamlet": [1.0, 0.0], "hamlet author": [0.99, 0.05], "weather in oslo": [0.0, 1.0]}
+    cache = AnswerCache(embed=lambda query: np.array(vectors[query]), similarity_threshold=0.9)
+    cache.store("who wrote hamlet", "Shakespeare")
+    assert cache.lookup("hamlet author") == "Shakespeare"
+    assert cache.lookup("weather in oslo") is None
+    assert cache.stats.semantic_hits == 1
+
+
+def test_answer_cache_expires_and_evicts(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("opendeepsearch.caching.time.time", lambda: now[0])
+    cache = AnswerCache(max_entries=2, semantic=False, ttls={"default": 10})
+    cache.store("a question", "a")
+    cache.store("b question", "b")
+    cache.store("c question", "c")
+    assert cache.lookup("a question") is None
+    assert cache.stats.evictions == 1
+    now[0] += 11
+    assert cache.lookup("b question") is None
+    assert cache.stats.expirations == 2
+
+
+def test_context_cache_persists_to_disk(tmp_path):
+    path = str(tmp_path / "contexts.db")
+    cache = ContextCache(path=path)
+    cache.put("key", "who founded rome", {"organic": [{"score": np.float32(0.5)}]}, "context")
+    cache.close()
+
+    reopened = ContextCache(path=path)
+    entry = reopened.get("key")
+    assert entry["context"] == "context"
+    assert entry["sources"]["organic"][0]["score"] == 0.5
+    assert reopened.get("missing") is None
+    reopened.close()
@@ -0,0 +1,51 @@
+from opendeepsearch.ranking_models.chunker import Chunker, TokenCounter
+
+
+class WordTokenizer:
+    """Stands in for a Hugging Face tokenizer: one token per word, recording each call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return {"input_ids": [text.split() for text in texts]}
+
+
+def make_counter(cache_size=100_000):
+    return TokenCounter("words", cache_size=cache_size, tokenizer=WordTokenizer())
+
+
+TEXT = "\n\n".join(
+    "\n".join(f"Paragraph {p} line {l} " + "word " * (3 + (p * l) % 7) for l in range(6))
+    for p in range(12)
+)
+
+
+def test_warmed_cache_serves_every_splitter_measurement():
+    counter = make_counter()
+    chunker = Chunker(chunk_size=30, chunk_overlap=10, length_function=counter, separators=["\n\n", "\n", " "])
+    expected = chunker.splitter.split_text(TEXT)
+
+    counter = make_counter()
+    chunker = Chunker(chunk_size=30, chunk_overlap=10, length_function=counter, separators=["\n\n", "\n", " "])
+    chunker._warm_token_cache([TEXT])
+    warm_calls = len(counter.tokenizer.calls)
+    assert warm_calls <= 1 + len(chunker.separators)
+
+    assert chunker.splitter.split_text(TEXT) == expected
+    assert len(counter.tokenizer.calls) == warm_calls
+
+
+def test_split_text_matches_unwarmed_splitter():
+    chunker = Chunker(chunk_size=30, chunk_overlap=10, length_function=make_counter())
+    reference = Chunker(chunk_size=30, chunk_overlap=10, length_function=lambda text: len(text.split()))
+    assert chunker.split_texts([TEXT, "short text"]) == [reference.split_text(TEXT), ["short text"]]
+
+
+def test_cache_evicts_least_recently_used():
+    counter = make_counter(cache_size=2)
+    counter.count_batch(["a", "b c"])
+    assert counter("a") == 1  # refreshes "a"
+    counter.count_batch(["d e f"])
+    assert list(counter._cache) == ["a", "d e f"]
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from opendeepsearch.ranking_models.base_reranker import BaseSemanticSearcher
+from opendeepsearch.ranking_models.cross_encoder import BaseCrossEncoder, InfinityCrossEncoder, create_cross_encoder
+
+
+class StubResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class RerankSession:
+    """Scores documents by length and, like Infinity, returns results best first"""
+
+    def __init__(self):
+        self.batches = []
+
+    def post(self, url, json, timeout):
+        documents = json["documents"]
+        self.batches.append(documents)
+        results = [{"index": i, "relevance_score": len(document)} for i, document in enumerate(documents)]
+        return StubResponse({"results": sorted(results, key=lambda item: -item["relevance_score"])})
+
+
+def test_infinity_scores_come_back_in_input_order_across_batches():
+    encoder = InfinityCrossEncoder(batch_size=2)
+    encoder.session = RerankSession()
+    documents = ["ccc", "a", "bb", "dddd", "e"]
+
+    assert encoder.score("q", documents) == [3.0, 1.0, 2.0, 4.0, 1.0]
+    assert [len(batch) for batch in encoder.session.batches] == [2, 2, 1]
+
+
+class KeywordCrossEncoder(BaseCrossEncoder):
+    """Scores documents by how often they contain "answer", recording what it was asked to score"""
+
+    def __init__(self):
+        self.scored = []
+
+    def score(self, query, documents):
+        self.scored.append(list(documents))
+        return [float(document.count("answer")) for document in documents]
+
+
+class IndexSearcher(BaseSemanticSearcher):
+    """Bi-encoder that prefers documents earlier in the list"""
+
+    def _get_embeddings(self, texts, deadline=None):
+        return np.array([[1.0 / (i + 1)] for i in range(len(texts))], dtype=np.float32)
+
+
+def test_cross_encoder_reorders_the_top_bi_encoder_candidates():
+    searcher = IndexSearcher()
+    searcher.cross_encoder = KeywordCrossEncoder()
+    searcher.cross_encoder_candidates = 3
+    documents = ["first", "second answer", "third answer answer", "fourth answer answer answer"]
+
+    results = searcher.rerank("query", documents, top_k=2, normalize="none")
+
+    # Only the three best bi-encoder candidates are cross-encoded; the fourth never competes
+    assert sorted(searcher.cross_encoder.scored[0]) == sorted(documents[:3])
+    assert results == [
+        {"document": "third answer answer", "score": 2.0},
+        {"document": "second answer", "score": 1.0},
+    ]
+
+
+def test_create_cross_encoder_rejects_unknown_names():
+    assert isinstance(create_cross_encoder("Infinity"), InfinityCrossEncoder)
+    with pytest.raises(ValueError):
+        create_cross_encoder("remote")
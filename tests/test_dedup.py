@@ -0,0 +1,55 @@
+import numpy as np
+
+from opendeepsearch.ranking_models.dedup import ChunkDeduplicator
+
+PRIME = (1 << 61) - 1
+
+ARTICLE = (
+    "The Amazon river flows through Peru, Colombia and Brazil before reaching the Atlantic Ocean. "
+    "It carries more water than any other river and drains a basin of about seven million square kilometres. "
+    "Its estuary is so wide that the river was long known to sailors as a freshwater sea."
+)
+OTHER = (
+    "Mount Kilimanjaro in Tanzania is the highest mountain in Africa. Its summit, Uhuru Peak, "
+    "rises to 5895 metres and is reached by several trekking routes from the surrounding national park."
+)
+
+
+def near_copy(text):
+    # Changes one word, as syndicated copies with a different byline or date do
+    return text.replace("seven million", "7 million")
+
+
+def test_permutations_match_exact_arithmetic():
+    deduplicator = ChunkDeduplicator(num_perm=16)
+    hashes = np.array([0, 1, 12345, (1 << 32) - 1], dtype=np.uint64)
+    expected = [
+        [(int(a) * int(h) + int(b)) % PRIME for h in hashes]
+        for a, b in zip(deduplicator._a, deduplicator._b)
+    ]
+    assert deduplicator._permute(hashes).tolist() == expected
+
+
+def test_signature_agreement_estimates_jaccard():
+    deduplicator = ChunkDeduplicator(num_perm=256, bands=16, shingle_size=1)
+    first = [f"w{i}" for i in range(100)]
+    second = [f"w{i}" for i in range(50, 150)]  # Jaccard similarity 50 / 150
+    agreement = np.mean(deduplicator._signature(first) == deduplicator._signature(second))
+    assert abs(agreement - 1 / 3) < 0.1
+
+
+def test_removes_near_duplicates_across_sources():
+    deduplicator = ChunkDeduplicator()
+    kept = deduplicator.deduplicate([[ARTICLE], [OTHER, near_copy(ARTICLE)]])
+    assert kept == [[ARTICLE], [OTHER]]
+
+
+def test_removes_duplicates_within_a_source():
+    deduplicator = ChunkDeduplicator()
+    chunks = [ARTICLE, OTHER, ARTICLE.upper(), near_copy(ARTICLE)]
+    assert deduplicator.kept_positions([chunks]) == [[0, 1]]
+
+
+def test_keeps_distinct_chunks_and_drops_empty_ones():
+    deduplicator = ChunkDeduplicator()
+    assert deduplicator.deduplicate([[ARTICLE, "  "], [], [OTHER]]) == [[ARTICLE], [], [OTHER]]
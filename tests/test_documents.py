@@ -0,0 +1,75 @@
+import asyncio
+import io
+
+import pytest
+
+from opendeepsearch.context_scraping.documents import (
+    DocumentExtractor,
+    detect_document_type,
+    extract_document,
+    url_extension
+)
+
+
+@pytest.mark.parametrize("url, content_type, head, expected", [
+    ("https://example.com/paper.pdf", "", b"", "pdf"),
+    ("https://arxiv.org/pdf/1706.03762", "application/pdf", b"", "pdf"),
+    ("https://example.com/download?id=7", "application/octet-stream", b"%PDF-1.7", "pdf"),
+    ("https://example.com/data", "application/json; charset=utf-8", b"{", "json"),
+    ("https://example.com/notes.txt", "", b"", "text"),
+    ("https://example.com/paper.pdf", "text/html", b"<html>", None),
+    ("https://example.com/page", "", b"", None),
+])
+def test_detect_document_type(url, content_type, head, expected):
+    assert detect_document_type(url, content_type, head) == expected
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://example.com/Paper.PDF?download=1", ".pdf"),
+    ("https://example.com/index.html", ".html"),
+    ("https://arxiv.org/pdf/1706.03762", ""),
+    ("https://example.com/v1.2/page", ""),
+    ("https://example.com/", ""),
+    ("https://example.com/archive.", ""),
+])
+def test_url_extension(url, expected):
+    assert url_extension(url) == expected
+
+
+def test_extract_json_flattens_nested_values():
+    data = b'{"name": "Ada", "tags": ["math", "code"], "meta": {"born": 1815, "empty": ""}}'
+    document = extract_document("json", data)
+    assert document.text.splitlines() == ["name: Ada", "tags[0]: math", "tags[1]: code", "meta.born: 1815"]
+
+
+def test_extract_invalid_json_falls_back_to_text():
+    assert extract_document("json", b'{"cut": "off').text == '{"cut": "off'
+
+
+def test_extract_pdf_respects_page_limit():
+    pypdf = pytest.importorskip("pypdf")
+    writer = pypdf.PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(width=72, height=72)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+
+    document = extract_document("pdf", buffer.getvalue(), max_pages=2)
+    assert document.pages == 2
+    assert document.truncated
+
+
+def test_extractor_runs_pdf_in_worker_process():
+    pypdf = pytest.importorskip("pypdf")
+    writer = pypdf.PdfWriter()
+    writer.add_blank_page(width=72, height=72)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+
+    extractor = DocumentExtractor(max_pages=5, max_workers=1)
+    try:
+        document = asyncio.run(extractor.extract("pdf", buffer.getvalue()))
+    finally:
+        extractor.close()
+    assert document.pages == 1
+    assert not document.truncated
@@ -0,0 +1,52 @@
+import base64
+import io
+import json
+
+import numpy as np
+import pytest
+
+from opendeepsearch.ranking_models.embedding_io import decode_base64_embeddings, read_embeddings
+
+
+class StubResponse:
+    def __init__(self, payload):
+        self.content = json.dumps(payload).encode("utf-8")
+        self.raw = io.BytesIO(self.content)
+
+
+def encode(vector):
+    return base64.b64encode(np.asarray(vector, dtype="<f4").tobytes()).decode("ascii")
+
+
+VECTORS = np.array([[0.5, -1.25, 3.0], [1e-3, 2.0, -0.0]], dtype=np.float32)
+
+
+def test_decode_base64_orders_by_index_without_copying():
+    items = [{"index": 1, "embedding": encode(VECTORS[1])}, {"index": 0, "embedding": encode(VECTORS[0])}]
+    embeddings = decode_base64_embeddings(items)
+
+    assert embeddings.shape == (2, 3)
+    assert embeddings.dtype == np.float32
+    np.testing.assert_array_equal(embeddings, VECTORS)
+    # Backed by the decoded bytes rather than a copy
+    assert not embeddings.flags.writeable
+
+
+def test_decode_base64_handles_empty_responses():
+    assert decode_base64_embeddings([]).shape == (0, 0)
+
+
+@pytest.mark.parametrize("encoding_format, encoded", [
+    ("base64", [encode(vector) for vector in VECTORS]),
+    ("float", VECTORS.tolist()),
+])
+def test_read_embeddings_decodes_both_encodings(encoding_format, encoded):
+    response = StubResponse({"data": [{"index": i, "embedding": value} for i, value in enumerate(encoded)]})
+    embeddings = read_embeddings(response, encoding_format)
+    assert embeddings.dtype == np.float32
+    np.testing.assert_array_equal(embeddings, VECTORS)
+
+
+def test_read_embeddings_rejects_unknown_encodings():
+    with pytest.raises(ValueError):
+        read_embeddings(StubResponse({"data": []}), "binary")
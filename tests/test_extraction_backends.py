@@ -0,0 +1,144 @@
+import json
+import re
+import sys
+
+import pytest
+
+from opendeepsearch.context_scraping.extraction_backends import (
+    HeuristicBackend,
+    LLMConfig,
+    PromptedLLMBackend,
+    TransformersBackend,
+    VLLMBackend,
+    create_extraction_backend
+)
+
+
+class WordTokenizer:
+    """Stands in for a Hugging Face tokenizer: one token per whitespace-separated word"""
+
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=True):
+        return f"<user> {messages[0]['content']} <assistant>"
+
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=False):
+        matches = list(re.finditer(r"\S+", text))
+        return {
+            "input_ids": [match.group(0) for match in matches],
+            "offset_mapping": [match.span() for match in matches],
+        }
+
+
+class EchoBackend(PromptedLLMBackend):
+    """Answers each prompt with JSON holding the page text it was given, recording every batch"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    @property
+    def tokenizer(self):
+        return WordTokenizer()
+
+    def _generate(self, prompts):
+        self.batches.append(prompts)
+        return [
+            json.dumps({"content": re.search(r"```html\n(.*)\n```", prompt, re.DOTALL).group(1)})
+            for prompt in prompts
+        ]
+
+
+def page(text):
+    return f"<html><body><p>{text}</p></body></html>"
+
+
+def test_pages_are_extracted_in_one_batched_generation():
+    backend = EchoBackend()
+    pages = backend.extract([page("first page"), page("second page"), page("third page")])
+
+    assert len(backend.batches) == 1
+    assert len(backend.batches[0]) == 3
+    assert ["first" in p.content for p in pages] == [True, False, False]
+    assert ["third" in p.content for p in pages] == [False, False, True]
+    assert all(p.prompt_tokens > 0 for p in pages)
+    assert backend.extract([]) == []
+    assert len(backend.batches) == 1
+
+
+def test_truncation_cuts_at_a_token_boundary():
+    backend = EchoBackend()
+    assert backend._truncate_to_tokens("one two  three four", 2) == ("one two", True)
+    assert backend._truncate_to_tokens("one two", 5) == ("one two", False)
+    assert backend._truncate_to_tokens("one two", 0) == ("", True)
+    # Text beyond the character bound (32 per token) is cut even when it is whitespace
+    text, truncated = backend._truncate_to_tokens("one" + " " * 100 + "two", 2)
+    assert truncated and text.strip() == "one"
+
+
+def test_prompt_budget_leaves_room_for_the_template_and_output():
+    config = LLMConfig(max_input_tokens=1000, max_model_len=60, max_tokens=20)
+    backend = EchoBackend(llm_config=config)
+    overhead = len(backend.tokenizer.encode(backend._create_prompt("")))
+    assert backend._html_token_budget() == 40 - overhead
+
+
+def test_long_pages_are_windowed_and_truncated_to_the_budget():
+    config = LLMConfig(max_input_tokens=40, main_content_window=False)
+    backend = EchoBackend(llm_config=config)
+    html = page(" ".join(f"word{i}" for i in range(500)))
+
+    prompt, extracted = backend._build_prompt(html)
+    assert extracted.truncated
+    assert extracted.dropped_chars > 0
+    assert extracted.prompt_tokens <= 40
+    assert "word499" not in prompt
+
+    short_prompt, short = backend._build_prompt(page("a short page"))
+    assert not short.truncated
+    assert "a short page" in short_prompt
+
+
+def test_main_content_window_drops_navigation_before_truncating():
+    navigation = "".join(f'<div><a href="/{i}">link {i}</a></div>' for i in range(50))
+    article = "<article>" + "<p>" + "Body text of the article. " * 20 + "</p>" + "</article>"
+    html = f"<html><body>{navigation}{article}</body></html>"
+
+    windowed = EchoBackend(llm_config=LLMConfig(max_input_tokens=10_000)).extract([html])[0]
+    unwindowed = EchoBackend(llm_config=LLMConfig(max_input_tokens=10_000, main_content_window=False)).extract([html])[0]
+    assert "link 7" not in windowed.content
+    assert "Body text" in windowed.content
+    assert "link 7" in unwindowed.content
+    assert windowed.prompt_tokens < unwindowed.prompt_tokens
+
+
+def test_create_extraction_backend_selects_by_name_without_loading_models():
+    config = LLMConfig(model_name="reader")
+    vllm = create_extraction_backend("vLLM", config)
+    transformers = create_extraction_backend("transformers", config, device="cuda", batch_size=2)
+    heuristic = create_extraction_backend("heuristic", min_line_chars=5)
+
+    assert isinstance(vllm, VLLMBackend) and vllm.llm_config is config
+    assert isinstance(transformers, TransformersBackend)
+    assert (transformers.device, transformers.batch_size) == ("cuda", 2)
+    assert isinstance(heuristic, HeuristicBackend) and heuristic.min_line_chars == 5
+    assert "vllm" not in sys.modules
+
+    with pytest.raises(ValueError):
+        create_extraction_backend("onnx")
+
+
+def test_heuristic_backend_keeps_headings_lists_and_body_text():
+    html = (
+        "<html><body><nav><a href='/'>Home</a></nav><article>"
+        "<h2>Results</h2><p>The trial enrolled 1,200 patients across 14 sites.</p>"
+        "<ul><li>Primary endpoint met at twelve months</li><li>short</li></ul>"
+        "</article></body></html>"
+    )
+    page = HeuristicBackend().extract([html])[0]
+    assert page.content == (
+        "## Results\n\nThe trial enrolled 1,200 patients across 14 sites.\n\n"
+        "- Primary endpoint met at twelve months"
+    )
+    assert "Home" not in page.content
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("crawl4ai")
+
+from opendeepsearch.context_scraping import fast_scraper
+from opendeepsearch.context_scraping.extraction_backends import ExtractedPage, ExtractionBackend, HeuristicBackend
+from opendeepsearch.context_scraping.fast_scraper import FastWebScraper
+
+
+class CrawlResult:
+    def __init__(self, html):
+        self.success = html is not None
+        self.html = html
+
+
+class StubCrawler:
+    """Serves pages from a dict; a missing page fails"""
+
+    PAGES = {"https://a": "<p>a</p>", "https://b": "<p>b</p>", "https://c": "<p>c</p>"}
+
+    def __init__(self, config=None):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def arun(self, url, config=None):
+        return CrawlResult(self.PAGES.get(url))
+
+
+class RecordingBackend(ExtractionBackend):
+    def __init__(self):
+        self.batches = []
+
+    def extract(self, htmls, instruction=None):
+        self.batches.append(htmls)
+        return [ExtractedPage(content=html.upper()) for html in htmls]
+
+
+def test_scrape_many_extracts_all_fetched_pages_in_one_batch(monkeypatch):
+    monkeypatch.setattr(fast_scraper, "AsyncWebCrawler", StubCrawler)
+    backend = RecordingBackend()
+    scraper = FastWebScraper(backend=backend)
+    try:
+        results = asyncio.run(scraper.scrape_many(["https://a", "https://missing", "https://b", "https://a"]))
+    finally:
+        scraper.close()
+
+    assert backend.batches == [["<p>a</p>", "<p>b</p>"]]
+    assert results["https://a"].content == "<P>A</P>"
+    assert results["https://b"].content == "<P>B</P>"
+    assert not results["https://missing"].success
+
+
+def test_backend_is_built_from_its_name_and_config():
+    scraper = FastWebScraper(backend="heuristic", backend_config={"min_line_chars": 5})
+    try:
+        assert isinstance(scraper.backend, HeuristicBackend)
+        assert scraper.backend.min_line_chars == 5
+    finally:
+        scraper.close()
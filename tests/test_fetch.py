@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from opendeepsearch.context_scraping.fetch import FetchLimits, fetch_page, probe_page, truncate_text
+
+web = pytest.importorskip("aiohttp.web")
+
+BODY = b"<html><body>" + b"x" * 10_000 + b"</body></html>"
+
+
+async def _slow(request):
+    response = web.StreamResponse(headers={"Content-Type": "text/html"})
+    await response.prepare(request)
+    for _ in range(50):
+        await response.write(b"<p>chunk</p>")
+        await asyncio.sleep(0.05)
+    return response
+
+
+async def _ranged(request):
+    # Answer range requests the way static file servers do
+    if "Range" in request.headers:
+        return web.Response(
+            body=b"%PDF-1.7\n"[:int(request.headers["Range"].split("-")[1]) + 1],
+            status=206,
+            headers={"Content-Type": "application/octet-stream", "Content-Range": "bytes 0-8/123456"}
+        )
+    return web.Response(body=b"%PDF-1.7\n", content_type="application/octet-stream")
+
+
+def _respond(**kwargs):
+    async def handler(request):
+        return web.Response(**kwargs)
+    return handler
+
+
+def _serve(check):
+    """Run check(base_url) against a local server"""
+    async def run():
+        app = web.Application()
+        app.router.add_get("/page", _respond(body=BODY, content_type="text/html"))
+        app.router.add_get("/image", _respond(body=b"\x89PNG", content_type="image/png"))
+        app.router.add_get("/missing", _respond(status=404))
+        app.router.add_get("/slow", _slow)
+        app.router.add_get("/ranged", _ranged)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            return await check(f"http://127.0.0.1:{port}")
+        finally:
+            await runner.cleanup()
+    return asyncio.run(run())
+
+
+def test_fetch_within_limits():
+    page = _serve(lambda base: fetch_page(base + "/page"))
+    assert page.success and not page.truncated
+    assert page.body == BODY
+
+
+def test_fetch_stops_at_max_bytes():
+    page = _serve(lambda base: fetch_page(base + "/page", FetchLimits(max_bytes=1000, chunk_size=256)))
+    assert page.success
+    assert len(page.body) == 1000
+    assert page.truncation_reason == "max_bytes"
+
+
+def test_fetch_stops_at_max_seconds():
+    page = _serve(lambda base: fetch_page(base + "/slow", FetchLimits(max_seconds=0.3)))
+    assert page.success
+    assert page.truncation_reason == "max_seconds"
+    assert 0 < len(page.body) < 50 * len(b"<p>chunk</p>")
+
+
+def test_fetch_rejects_disallowed_content_type():
+    page = _serve(lambda base: fetch_page(base + "/image"))
+    assert not page.success
+    assert "Unsupported content type" in page.error
+    assert page.body == b""
+
+
+def test_fetch_reports_http_errors():
+    page = _serve(lambda base: fetch_page(base + "/missing"))
+    assert page.error == "HTTP 404"
+
+
+def test_probe_reads_size_and_magic_bytes():
+    probe = _serve(lambda base: probe_page(base + "/ranged", head_bytes=5))
+    assert probe.success
+    assert probe.content_length == 123456
+    assert probe.head == b"%PDF-"
+
+
+def test_probe_uses_content_length_without_range_support():
+    probe = _serve(lambda base: probe_page(base + "/page", head_bytes=16))
+    assert probe.content_length == len(BODY)
+    assert probe.head == BODY[:16]
+
+
+def test_truncate_text_keeps_whole_characters():
+    text, truncated = truncate_text("naïve", 3)
+    assert truncated
+    assert text == "na"
@@ -0,0 +1,106 @@
+import time
+
+import numpy as np
+import pytest
+
+from opendeepsearch.deadline import Deadline
+from opendeepsearch.ranking_models.infinity_rerank import InfinitySemanticSearcher
+
+
+def make_searcher(batch_size=256):
+    return InfinitySemanticSearcher(batch_size=batch_size, target_batch_latency=1.0)
+
+
+def test_slow_batch_halves_current_size():
+    searcher = make_searcher()
+    searcher._record_latency(3.0, 256)
+    assert searcher.batch_size == 128
+    searcher._record_latency(3.0, 100)
+    assert searcher.batch_size == 64
+
+
+def test_in_flight_batches_from_before_a_decrease_do_not_cascade():
+    searcher = make_searcher()
+    for _ in range(4):
+        # Four concurrent batches sent at the old size all come back slow
+        searcher._record_latency(3.0, 256)
+    assert searcher.batch_size == 128
+
+
+def test_much_smaller_batches_are_ignored():
+    searcher = make_searcher()
+    searcher._record_latency(3.0, 12)
+    assert searcher.batch_size == 256
+
+
+def test_fast_full_batches_grow_size():
+    searcher = make_searcher(batch_size=100)
+    searcher._record_latency(0.1, 100)
+    assert searcher.batch_size == 126
+    searcher._record_latency(0.1, 40)
+    assert searcher.batch_size == 126
+    searcher._record_latency(3.0, 8)
+    assert searcher.batch_size == 126
+
+
+def test_next_batch_respects_size_and_token_limits():
+    searcher = make_searcher(batch_size=3)
+    texts = ["a" * 36] * 7  # ten estimated tokens each
+    assert searcher._next_batch(texts, 0) == (0, 3)
+    assert searcher._next_batch(texts, 6) == (6, 7)
+
+    searcher.max_batch_tokens = 25
+    assert searcher._next_batch(texts, 0) == (0, 2)
+    # A text over the token limit still goes out, alone
+    assert searcher._next_batch(["a" * 400, "b"], 0) == (0, 1)
+
+
+class EchoSearcher(InfinitySemanticSearcher):
+    """Embeds each text as its own length, recording the batch sizes sent"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    def _post_embeddings(self, texts, deadline=None):
+        self.batches.append(len(texts))
+        return np.array([[len(text)] for text in texts], dtype=np.float32)
+
+
+def test_large_inputs_are_split_and_reassembled_in_order():
+    searcher = EchoSearcher(batch_size=4, max_concurrency=3, instruction_prefix="")
+    texts = ["x" * length for length in range(1, 24)]
+    embeddings = searcher._get_embeddings(texts, embedding_type="document")
+
+    assert max(searcher.batches) <= 4
+    assert sum(searcher.batches) == len(texts)
+    np.testing.assert_array_equal(embeddings[:, 0], np.arange(1, 24))
+
+
+class SlowSearcher(InfinitySemanticSearcher):
+    """Answers every batch after a delay instead of calling the Infinity server"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sent = 0
+
+    def _post_embeddings(self, texts, deadline=None):
+        if deadline is not None and deadline.expired:
+            raise TimeoutError("Deadline passed before the embedding request was sent")
+        self.sent += 1
+        time.sleep(0.05)
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def test_embedding_stops_sending_batches_after_the_deadline():
+    searcher = SlowSearcher(batch_size=8, max_concurrency=1, target_batch_latency=10.0)
+    with pytest.raises(TimeoutError):
+        searcher.embed(["text"] * 80, deadline=Deadline.after(0.12))
+    assert searcher.sent < 10
+
+
+def test_rerank_passes_the_deadline_on():
+    searcher = SlowSearcher(batch_size=8, max_concurrency=1, target_batch_latency=10.0)
+    with pytest.raises(TimeoutError):
+        searcher.rerank("query", ["doc"] * 80, deadline=Deadline.after(0.0))
+    assert searcher.sent == 0
@@ -0,0 +1,111 @@
+import sqlite3
+import threading
+
+import pytest
+
+from opendeepsearch.serp_search.local_index import LocalSearchIndex, make_snippet, tokenize
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LocalSearchIndex(str(tmp_path / "search.db"))
+    yield index
+    index.close()
+
+
+DOCUMENTS = [
+    {"url": "https://a.example", "title": "Rivers", "text": "The Nile is a river. Rivers flow to the sea."},
+    {"url": "https://b.example", "title": "Nile delta", "text": "The Nile delta is fertile. The Nile floods every year."},
+    {"url": "https://c.example", "title": "Deserts", "text": "The Sahara is a desert. Deserts are dry."},
+]
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("What is the Nile's delta?") == ["nile", "s", "delta"]
+
+
+def test_bm25_ranks_by_term_frequency_and_title(index):
+    assert index.add_documents(DOCUMENTS) == 3
+    hits = index.search("nile")
+    assert [hit.url for hit in hits] == ["https://b.example", "https://a.example"]
+    assert hits[0].score > hits[1].score > 0
+
+
+def test_bm25_prefers_rare_terms(index):
+    index.add_documents(DOCUMENTS)
+    # "sahara" occurs in one document, "the" is a stopword and "nile" is common
+    assert index.search("the sahara nile")[0].url == "https://c.example"
+
+
+def test_search_edge_cases(index):
+    assert index.search("nile") == []
+    index.add_documents(DOCUMENTS)
+    assert index.search("what is the") == []
+    assert index.search("volcano") == []
+    assert len(index.search("nile desert", num_results=2)) == 2
+
+
+def test_ties_keep_insertion_order(index):
+    index.add_documents([
+        {"url": "https://first.example", "text": "identical text"},
+        {"url": "https://second.example", "text": "identical text"},
+    ])
+    assert [hit.url for hit in index.search("identical")] == ["https://first.example", "https://second.example"]
+
+
+def test_adding_a_known_url_replaces_it(index):
+    index.add_documents(DOCUMENTS)
+    index.add_documents([{"url": "https://c.example", "title": "Glaciers", "text": "Glaciers are ice."}])
+    assert len(index) == 3
+    assert index.search("sahara") == []
+    assert index.search("glaciers")[0].title == "Glaciers"
+
+
+def test_snippet_picks_sentences_with_most_matches():
+    text = "Intro sentence here. Cats sleep a lot. Cats and dogs play together. Unrelated ending."
+    assert make_snippet(text, ["cats", "dogs"], max_chars=60) == "Cats sleep a lot. Cats and dogs play together."
+
+
+def test_snippet_is_cut_at_a_word_boundary():
+    snippet = make_snippet("alpha " * 100, ["alpha"], max_chars=30)
+    assert snippet == "alpha alpha alpha alpha alpha..."
+    assert make_snippet("", ["alpha"]) == ""
+
+
+def test_hits_carry_snippets(index):
+    index.add_documents(DOCUMENTS)
+    assert index.search("floods")[0].snippet == "The Nile delta is fertile. The Nile floods every year."
+
+
+def test_close_closes_connections_of_every_thread(index):
+    connections = []
+
+    def search():
+        index.search("anything")
+        connections.append(index._local.db)
+
+    threads = [threading.Thread(target=search) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    index.close()
+    for db in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            db.execute("SELECT 1")
+    # The index stays usable after close; a new connection is opened
+    assert index.search("anything") == []
+
+
+def test_stats_follow_writes_from_another_connection(index, tmp_path):
+    index.add_documents([{"url": "https://a.example", "text": "alpha beta"}])
+    assert len(index) == 1
+
+    # A second instance stands in for another process writing to the same file
+    writer = LocalSearchIndex(str(tmp_path / "search.db"))
+    writer.add_documents([{"url": "https://b.example", "text": "gamma delta"}])
+    writer.close()
+
+    assert len(index) == 2
+    assert [hit.url for hit in index.search("gamma")] == ["https://b.example"]
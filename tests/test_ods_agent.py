@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+
+from opendeepsearch.context_building import build_context as bc
+from opendeepsearch.ods_agent import OpenDeepSearchAgent
+from opendeepsearch.serp_search.serp_search import SearchResult
+
+
+class CountingSearch:
+    def __init__(self):
+        self.calls = 0
+
+    def get_sources(self, query):
+        self.calls += 1
+        return SearchResult(data={"organic": [{"title": "T", "link": "https://t", "snippet": "word " * 50}]})
+
+    def close(self):
+        pass
+
+
+class PassThroughProcessor:
+    async def process_sources(self, sources, max_sources, query, pro_mode, deadline=None, report=None):
+        return sources.data
+
+    def close(self):
+        pass
+
+
+def make_agent(search, model="model-a", budget=None, source_processor_config=None, **kwargs):
+    return OpenDeepSearchAgent(
+        model=model,
+        context_token_budget=budget,
+        source_processor_config=source_processor_config,
+        search_api=search,
+        source_processor=PassThroughProcessor(),
+        **kwargs
+    )
+
+
+@pytest.fixture(autouse=True)
+def word_token_counter(monkeypatch):
+    monkeypatch.setattr(bc, "count_tokens", lambda text, model: len(text.split()))
+
+
+def test_constructor_uses_injected_clients():
+    search = CountingSearch()
+    agent = make_agent(search, context_cache_config={})
+    assert agent.serp_search is search
+    assert isinstance(agent.source_processor, PassThroughProcessor)
+    assert agent.context_cache is not None
+    assert agent.answer_cache is None
+
+
+def test_context_cache_key_ignores_model_budget_and_config_order():
+    search = CountingSearch()
+    first = make_agent(search, "model-a", 100, {"reranker": "jina", "top_results": 5})
+    second = make_agent(search, "model-b", 50, {"top_results": 5, "reranker": "jina"})
+    assert first._context_cache_key("q", 2, False) == second._context_cache_key("q", 2, False)
+    assert first._context_cache_key("q", 2, False) != first._context_cache_key("q", 2, True)
+
+
+def test_context_cache_reuses_sources_across_models_and_rebuilds_context(tmp_path):
+    search = CountingSearch()
+    # Two agents sharing one on-disk cache
+    cache_config = {"path": str(tmp_path / "context.db")}
+    large = make_agent(search, "model-a", 1000, context_cache_config=cache_config)
+    small = make_agent(search, "model-b", 30, context_cache_config=cache_config)
+
+    large_context = asyncio.run(large.search_and_build_context("q"))
+    small_context = asyncio.run(small.search_and_build_context("q"))
+
+    assert search.calls == 1
+    assert "word" in large_context
+    assert len(small_context.split()) <= 30
+
+
+class FailingFetchProcessor(PassThroughProcessor):
+    """Reports a timed-out fetch, as scrape_many does for "Deadline exceeded" pages"""
+
+    async def process_sources(self, sources, max_sources, query, pro_mode, deadline=None, report=None):
+        report.failed_links.append(sources.data["organic"][0]["link"])
+        return sources.data
+
+
+def test_degraded_context_is_not_cached():
+    search = CountingSearch()
+    agent = OpenDeepSearchAgent(
+        context_cache_config={}, search_api=search, source_processor=FailingFetchProcessor()
+    )
+    asyncio.run(agent.search_and_build_context("q"))
+    asyncio.run(agent.search_and_build_context("q"))
+    assert search.calls == 2
+
+
+class EnrichingProcessor(PassThroughProcessor):
+    async def process_sources(self, sources, max_sources, query, pro_mode, deadline=None, report=None):
+        for source in sources.data["organic"]:
+            source["html"] = "scraped page text"
+        return sources.data
+
+
+class RecordingAgent(OpenDeepSearchAgent):
+    """Answers with the context it was given instead of calling an LLM"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.contexts = []
+
+    async def _generate_answer(self, query, context, deadline=None):
+        self.contexts.append(context)
+        return f"answer {len(self.contexts)}"
+
+
+async def collect(agent, query):
+    return [revision async for revision in agent.ask_progressive(query)]
+
+
+def test_ask_progressive_yields_draft_then_final():
+    agent = RecordingAgent(search_api=CountingSearch(), source_processor=EnrichingProcessor())
+    revisions = asyncio.run(collect(agent, "q"))
+
+    assert [(revision.stage, revision.answer) for revision in revisions] == [("draft", "answer 1"), ("final", "answer 2")]
+    assert "scraped page text" not in revisions[0].context
+    assert "scraped page text" in revisions[1].context
+
+
+def test_ask_progressive_reuses_draft_when_processing_adds_nothing():
+    agent = RecordingAgent(search_api=CountingSearch(), source_processor=PassThroughProcessor())
+    revisions = asyncio.run(collect(agent, "q"))
+
+    assert [(revision.stage, revision.answer) for revision in revisions] == [("draft", "answer 1"), ("final", "answer 1")]
+    assert len(agent.contexts) == 1
+
+
+@pytest.mark.parametrize("budget", [None, 100])
+def test_build_context_tolerates_failed_results(budget):
+    agent = make_agent(CountingSearch(), budget=budget)
+    assert agent._build_context(SearchResult(error="Search timed out before the deadline")) == ""
+
+
+class FailingSearch(CountingSearch):
+    def get_sources(self, query):
+        self.calls += 1
+        return SearchResult(error="Search failed")
+
+
+@pytest.mark.parametrize("search, processor", [
+    (FailingSearch(), PassThroughProcessor()),
+    (CountingSearch(), FailingFetchProcessor()),
+])
+def test_answers_from_failed_or_degraded_retrieval_are_not_cached(search, processor):
+    agent = RecordingAgent(
+        answer_cache_config={"semantic": False}, search_api=search, source_processor=processor
+    )
+    assert asyncio.run(agent.ask("q")) == "answer 1"
+    assert asyncio.run(agent.ask("q")) == "answer 2"
+    assert [revision.answer for revision in asyncio.run(collect(agent, "q"))][-1] == "answer 3"
+
+
+def test_answers_from_complete_retrieval_are_cached():
+    agent = RecordingAgent(
+        answer_cache_config={"semantic": False},
+        search_api=CountingSearch(),
+        source_processor=EnrichingProcessor()
+    )
+    assert asyncio.run(agent.ask("q")) == "answer 1"
+    assert asyncio.run(agent.ask("q")) == "answer 1"
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("smolagents")
+
+from opendeepsearch import ods_tool
+from opendeepsearch.event_loop import BackgroundLoop, run_sync
+from opendeepsearch.registry import AgentRegistry
+
+
+class EchoAgent:
+    def __init__(self):
+        self.queries = []
+
+    async def ask(self, query, max_sources=2, pro_mode=False, time_budget=None):
+        self.queries.append(query)
+        return f"answer to {query}"
+
+    def close(self):
+        pass
+
+
+class RecordingRegistry(AgentRegistry):
+    """Hands out one EchoAgent and records which threads acquired it"""
+
+    def __init__(self):
+        super().__init__()
+        self.agent = EchoAgent()
+        self.threads = []
+
+    def acquire(self, **config):
+        self.threads.append(threading.current_thread())
+        return self.agent
+
+    def release(self, agent):
+        pass
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = RecordingRegistry()
+    monkeypatch.setattr(ods_tool, "get_registry", lambda: registry)
+    return registry
+
+
+async def double(value):
+    await asyncio.sleep(0)
+    return 2 * value
+
+
+def test_run_sync_runs_coroutines_from_many_threads():
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(run_sync(double(i)))) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == [2 * i for i in range(8)]
+
+
+def test_run_sync_works_inside_a_running_loop():
+    async def caller():
+        return run_sync(double(3))
+
+    assert asyncio.run(caller()) == 6
+
+
+def test_background_loop_times_out_and_refuses_reentry():
+    background = BackgroundLoop(max_workers=2)
+    try:
+        with pytest.raises(TimeoutError):
+            background.run(asyncio.sleep(1), timeout=0.05)
+
+        async def reenter():
+            coroutine = double(1)
+            try:
+                background.run(coroutine)
+            finally:
+                coroutine.close()
+
+        with pytest.raises(RuntimeError):
+            background.run(reenter())
+    finally:
+        background.stop()
+
+
+def test_aforward_sets_up_off_the_event_loop_once(registry):
+    tool = ods_tool.OpenDeepSearchTool()
+
+    async def search():
+        return await asyncio.gather(tool.aforward("a"), tool.aforward("b"))
+
+    assert asyncio.run(search()) == ["answer to a", "answer to b"]
+    assert len(registry.threads) == 1
+    assert registry.threads[0] is not threading.main_thread()
+
+
+def test_forward_dispatches_to_the_shared_loop(registry):
+    tool = ods_tool.OpenDeepSearchTool()
+    assert tool.forward("q") == "answer to q"
+    assert registry.agent.queries == ["q"]
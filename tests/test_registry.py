@@ -0,0 +1,67 @@
+from opendeepsearch.context_scraping import wikipedia
+from opendeepsearch.registry import AgentRegistry
+
+
+class ClosingClient:
+    """Stands in for the search client and source processor, counting close() calls"""
+
+    def __init__(self):
+        self.closed = 0
+
+    def close(self):
+        self.closed += 1
+
+
+SEARCH = ClosingClient()
+PROCESSOR = ClosingClient()
+
+
+def config(model="model-a", search_api=SEARCH):
+    return dict(model=model, search_api=search_api, source_processor=PROCESSOR)
+
+
+def test_acquire_shares_one_agent_per_configuration():
+    registry = AgentRegistry()
+    first = registry.acquire(**config())
+    second = registry.acquire(**config())
+    other = registry.acquire(**config(model="model-b"))
+
+    assert first is second
+    assert other is not first
+    assert len(registry) == 2
+
+
+def test_keep_warm_keeps_released_agents_until_shutdown(monkeypatch):
+    closed_fetchers = []
+    monkeypatch.setattr(wikipedia, "close_wikipedia_fetcher", lambda: closed_fetchers.append(True))
+    search = ClosingClient()
+    registry = AgentRegistry(keep_warm=True)
+    agent = registry.acquire(**config(search_api=search))
+    registry.release(agent)
+
+    assert len(registry) == 1
+    assert registry.acquire(**config(search_api=search)) is agent
+    assert search.closed == 0
+
+    registry.shutdown()
+    assert len(registry) == 0
+    assert search.closed == 1
+    assert closed_fetchers == [True]
+
+
+def test_without_keep_warm_the_last_release_closes_the_agent():
+    search = ClosingClient()
+    registry = AgentRegistry(keep_warm=False)
+    agent = registry.acquire(**config(search_api=search))
+    assert registry.acquire(**config(search_api=search)) is agent
+
+    registry.release(agent)
+    assert search.closed == 0
+    registry.release(agent)
+    assert search.closed == 1
+    assert len(registry) == 0
+
+    # Releasing an agent the registry no longer holds is a no-op
+    registry.release(agent)
+    assert search.closed == 1
+    assert registry.acquire(**config(search_api=search)) is not agent
@@ -0,0 +1,183 @@
+import pytest
+
+from opendeepsearch.context_scraping import wikipedia
+from opendeepsearch.context_scraping.wikipedia import WikipediaFetcher
+
+
+class ClosingStore:
+    language = "en"
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_close_releases_session_and_local_store():
+    store = ClosingStore()
+    fetcher = WikipediaFetcher(local_store=store)
+    closed = []
+    fetcher.session.close = lambda: closed.append(True)
+    fetcher.close()
+    assert closed == [True]
+    assert store.closed
+
+
+def test_close_wikipedia_fetcher_resets_the_shared_fetcher(monkeypatch):
+    monkeypatch.delenv("WIKIPEDIA_STORE_PATH", raising=False)
+    monkeypatch.setattr(wikipedia, "_fetcher", None)
+    shared = wikipedia.get_wikipedia_fetcher()
+    assert wikipedia.get_wikipedia_fetcher() is shared
+
+    wikipedia.close_wikipedia_fetcher()
+    assert wikipedia._fetcher is None
+    assert wikipedia.get_wikipedia_fetcher() is not shared
+    wikipedia.close_wikipedia_fetcher()
+
+
+@pytest.mark.parametrize("local_only, expected", [("true", True), ("1", True), ("", False), ("no", False)])
+def test_shared_fetcher_reads_store_settings_from_the_environment(monkeypatch, local_only, expected):
+    from opendeepsearch.context_scraping import wikipedia_store
+
+    class RecordingStore(ClosingStore):
+        def __init__(self, path):
+            super().__init__()
+            self.path = path
+
+    monkeypatch.setattr(wikipedia_store, "LocalWikipediaStore", RecordingStore)
+    monkeypatch.setattr(wikipedia, "_fetcher", None)
+    monkeypatch.setenv("WIKIPEDIA_STORE_PATH", "/data/enwiki")
+    monkeypatch.setenv("WIKIPEDIA_LOCAL_ONLY", local_only)
+
+    fetcher = wikipedia.get_wikipedia_fetcher()
+    try:
+        assert fetcher.local_store.path == "/data/enwiki"
+        assert fetcher.local_only is expected
+    finally:
+        wikipedia.close_wikipedia_fetcher()
+    assert fetcher.local_store.closed
+
+
+class StubResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"query": self.payload}
+
+
+class StubSession:
+    """Answers MediaWiki queries from a dict of articles, with "Galileo" redirecting to "Galileo Galilei\""""
+
+    ARTICLES = {
+        "Galileo Galilei": "Italian astronomer.\n\n== Career ==\nProfessor in Padua.",
+        "Pisa": "City in Tuscany.",
+    }
+    REDIRECTS = {"Galileo": "Galileo Galilei"}
+
+    def __init__(self):
+        self.queries = []
+
+    def get(self, url, params, timeout):
+        self.queries.append(params)
+        titles = params["titles"].split("|")
+        if params.get("prop") == "extracts":
+            title = titles[0]
+            return StubResponse({"pages": [{"title": title, "extract": self.ARTICLES[title]}]})
+        normalized = [{"from": title, "to": title.replace("_", " ")} for title in titles if "_" in title]
+        names = [title.replace("_", " ") for title in titles]
+        redirects = [{"from": name, "to": self.REDIRECTS[name]} for name in names if name in self.REDIRECTS]
+        pages = [
+            {"title": self.REDIRECTS.get(name, name)} if self.REDIRECTS.get(name, name) in self.ARTICLES
+            else {"title": name, "missing": True}
+            for name in names
+        ]
+        return StubResponse({"normalized": normalized, "redirects": redirects, "pages": pages})
+
+    def close(self):
+        pass
+
+
+def stub_fetcher(**kwargs):
+    fetcher = WikipediaFetcher(**kwargs)
+    fetcher.session = StubSession()
+    return fetcher
+
+
+def test_resolve_titles_batches_normalizes_and_follows_redirects():
+    fetcher = stub_fetcher()
+    titles = ["Galileo_Galilei", "Galileo", "Pisa"] + [f"Missing {i}" for i in range(97)]
+    resolved = fetcher.resolve_titles("en", titles)
+
+    assert len(fetcher.session.queries) == 2
+    assert all(len(query["titles"].split("|")) <= 50 for query in fetcher.session.queries)
+    assert resolved["Galileo_Galilei"] == "Galileo Galilei"
+    assert resolved["Galileo"] == "Galileo Galilei"
+    assert resolved["Pisa"] == "Pisa"
+    assert resolved["Missing 3"] is None
+
+
+def test_fetch_many_shares_redirected_articles_and_caches_them(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(wikipedia.time, "time", lambda: now[0])
+    fetcher = stub_fetcher(ttl=60)
+    urls = [
+        "https://en.wikipedia.org/wiki/Galileo_Galilei",
+        "https://en.wikipedia.org/wiki/Galileo",
+        "https://en.wikipedia.org/wiki/Nowhere",
+    ]
+
+    pages = fetcher.fetch_many(urls)
+    # One batched title query and one extract for the article both URLs point to
+    assert len(fetcher.session.queries) == 2
+    assert pages[urls[0]] is pages[urls[1]]
+    assert pages[urls[0]].title == "Galileo Galilei"
+    assert pages[urls[2]] is None
+
+    now[0] += 30
+    assert fetcher.fetch_many(urls) == pages
+    assert len(fetcher.session.queries) == 2
+
+    now[0] += 60
+    fetcher.fetch_many(urls)
+    assert len(fetcher.session.queries) == 4
+
+
+def test_get_content_keeps_the_lead_and_matching_sections():
+    fetcher = stub_fetcher()
+    url = "https://en.wikipedia.org/wiki/Galileo_Galilei"
+    assert fetcher.get_content(url) == "Italian astronomer.\n\n## Career\n\nProfessor in Padua."
+    assert fetcher.get_content(url, "padua professor", max_sections=2).endswith("Professor in Padua.")
+    assert fetcher.get_content(url, "telescope", max_sections=2) == "Italian astronomer."
+
+
+def section(title, text, level=2):
+    return wikipedia.WikipediaSection(title, level if title else 1, text)
+
+
+def ranked_titles(sections, query, max_sections, anchor=None):
+    return [ranked.title for ranked in wikipedia.rank_sections(sections, query, max_sections, anchor)]
+
+
+def test_rank_sections_scores_query_terms_and_keeps_document_order():
+    sections = [
+        section("", "Galileo was an astronomer."),
+        section("Early life", "Born in Pisa to a musician."),
+        section("Telescope", "He improved the telescope and observed the moons of Jupiter."),
+        section("Trial", "The Inquisition tried him in Rome."),
+        section("References", "Telescope telescope telescope Jupiter."),
+    ]
+
+    ranked = ranked_titles(sections, "telescope jupiter moons", 2)
+    assert ranked == ["", "Telescope"]
+
+    # The anchor section is kept even when it does not match the query
+    ranked = ranked_titles(sections, "telescope jupiter moons", 3, anchor="Trial")
+    assert ranked == ["", "Telescope", "Trial"]
+
+    # Back matter never comes back, and unmatched sections do not fill the quota
+    assert ranked_titles(sections, "references", 5) == [""]
@@ -0,0 +1,94 @@
+from opendeepsearch.context_scraping.wikipedia_store import LocalWikipediaStore, wikitext_to_text
+
+WIKITEXT = """{{Short description|Italian astronomer}}
+{{Infobox person
+| name = Galileo Galilei
+| birth_date = {{birth date|1564|2|15}}
+}}
+'''Galileo di Vincenzo Bonaiuti de' Galilei''' was an [[Italy|Italian]] [[astronomer]].<ref name="a">{{cite book|title=Galileo}}</ref>
+He was born in [[Pisa]].<ref>Drake 1978</ref> <!-- hidden note -->
+[[File:Galileo.jpg|thumb|Portrait by [[Justus Sustermans]]]]
+
+== Career ==
+* Professor at the [[University of Padua]]
+* Wrote the ''Dialogue''
+{| class="wikitable"
+! Year !! Work
+|-
+| 1610 || Sidereus Nuncius
+|}
+See [https://example.org the archive] for details.
+__NOTOC__
+[[Category:1564 births]]
+[[de:Galileo Galilei]]
+"""
+
+
+def test_wikitext_to_text_strips_markup():
+    text = wikitext_to_text(WIKITEXT)
+    assert text.startswith("Galileo di Vincenzo Bonaiuti de' Galilei was an Italian astronomer.")
+    assert "He was born in Pisa." in text
+    assert "== Career ==" in text
+    assert "Professor at the University of Padua" in text
+    assert "Wrote the Dialogue" in text
+    assert "See the archive for details." in text
+    for markup in ("{{", "}}", "[[", "]]", "<ref", "'''", "<!--", "wikitable", "Sustermans",
+                   "Category", "__NOTOC__", "de:Galileo", "Drake 1978", "birth_date"):
+        assert markup not in text
+
+
+DUMP = """<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/">
+  <page>
+    <title>Galileo Galilei</title><ns>0</ns>
+    <revision><text>{text}</text></revision>
+  </page>
+  <page>
+    <title>Galileo</title><ns>0</ns><redirect title="Galileo Galilei" />
+    <revision><text>#REDIRECT [[Galileo Galilei]]</text></revision>
+  </page>
+  <page>
+    <title>Talk:Galileo Galilei</title><ns>1</ns>
+    <revision><text>Discussion</text></revision>
+  </page>
+</mediawiki>
+"""
+
+
+def test_store_round_trip(tmp_path):
+    from xml.sax.saxutils import escape
+
+    dump = tmp_path / "dump.xml"
+    dump.write_text(DUMP.format(text=escape(WIKITEXT)), encoding="utf-8")
+    store = LocalWikipediaStore.build(str(dump), str(tmp_path / "store"), min_chars=50)
+    try:
+        page = store.get_page("galileo")
+        assert page is not None
+        assert page.title == "Galileo Galilei"
+        assert "Italian astronomer" in page.text
+        assert "Talk:Galileo Galilei" not in store
+    finally:
+        store.close()
+
+
+def test_fetcher_reads_articles_from_the_local_store(tmp_path):
+    from xml.sax.saxutils import escape
+
+    from opendeepsearch.context_scraping.wikipedia import WikipediaFetcher
+
+    dump = tmp_path / "dump.xml"
+    dump.write_text(DUMP.format(text=escape(WIKITEXT)), encoding="utf-8")
+    LocalWikipediaStore.build(str(dump), str(tmp_path / "store"), min_chars=50).close()
+
+    fetcher = WikipediaFetcher(local_store=LocalWikipediaStore(str(tmp_path / "store")), local_only=True)
+    fetcher.session.get = None  # Any API call would fail
+    try:
+        pages = fetcher.fetch_many([
+            "https://en.wikipedia.org/wiki/Galileo",
+            "https://en.wikipedia.org/wiki/Nowhere",
+        ])
+        assert pages["https://en.wikipedia.org/wiki/Galileo"].title == "Galileo Galilei"
+        assert pages["https://en.wikipedia.org/wiki/Nowhere"] is None
+        content = fetcher.get_content("https://en.wikipedia.org/wiki/Galileo", "padua professor", max_sections=2)
+        assert "University of Padua" in content
+    finally:
+        fetcher.close()